@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime, timedelta
+
+
+# ==========================================================
+#  Benchmark headless delle funzioni della dashboard
+#  Importa il modulo senza avviare server né simulatore e
+#  misura tempi e picchi di memoria su dataset sintetici
+# ==========================================================
+#
+#  Esempi:
+#    python benchmark/e_lithium_benchmark.py --sizes 365,3650,36500
+#    python benchmark/e_lithium_benchmark.py --baseline risultati/base.json --soglia 0.2
+#    python benchmark/e_lithium_benchmark.py --sizes 365 --budget-import-ms 1500
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_dir, "dashboard"))
+sys.path.insert(0, os.path.join(project_dir, "simulatore"))
+
+# Il modulo della dashboard non deve rigenerare il CSV durante il benchmark
+os.environ.setdefault("E_LITHIUM_SKIP_SIMULATORE", "1")
+
+DIMENSIONI_DEFAULT = [365, 3_650, 36_500, 365_000, 1_000_000, 10_000_000]
+RISULTATI_DIR = os.path.join(project_dir, "benchmark", "risultati")
+
+# Oltre un secolo di dati giornalieri si passa a rilevazioni ad alta frequenza
+# distribuite su 10 anni (i timestamp pandas non superano l'anno 2262)
+MAX_GIORNI_GIORNALIERI = 36_500
+ARCO_ALTA_FREQUENZA = timedelta(days=3_650)
+
+
+def crea_dataset(num_righe, seed=42):
+    """Dataset sintetico prodotto da generate_dataset del simulatore"""
+    import numpy as np
+    from e_lithium_simulatore import generate_dataset
+
+    np.random.seed(seed)
+    passo = timedelta(days=1)
+    if num_righe > MAX_GIORNI_GIORNALIERI:
+        passo = ARCO_ALTA_FREQUENZA / num_righe
+    return generate_dataset(num_days=num_righe, data_inizio=datetime(2015, 1, 1), passo=passo)
+
+
+# Import a freddo in un interprete separato: stampa il report di avvio del modulo in JSON
+SCRIPT_IMPORT = (
+    "import sys, json; sys.path.insert(0, sys.argv[1]); "
+    "import e_lithium_dashboard as d; print(json.dumps(d.get_report_avvio()))"
+)
+
+
+def misura_import_a_freddo(ripetizioni):
+    """Tempo di import del modulo della dashboard in processi nuovi (come un worker appena avviato)"""
+    ambiente = dict(os.environ, E_LITHIUM_SKIP_SIMULATORE="1", E_LITHIUM_PRERISCALDAMENTO="0")
+    tempi, report = [], None
+    for _ in range(ripetizioni):
+        inizio = time.perf_counter()
+        uscita = subprocess.run([sys.executable, "-c", SCRIPT_IMPORT, os.path.join(project_dir, "dashboard")],
+                                capture_output=True, text=True, check=True, env=ambiente)
+        tempi.append((time.perf_counter() - inizio) * 1000)
+        report = json.loads(uscita.stdout.strip().splitlines()[-1])
+    tempi.sort()
+    return {
+        "processo_min_ms": round(tempi[0], 3),
+        "processo_mediana_ms": round(tempi[len(tempi) // 2], 3),
+        "import_ms": report["import_ms"],
+        "fasi": report["fasi"],
+    }
+
+
+def casi_benchmark(dash):
+    """Funzioni misurate: (nome, funzione che riceve il DataFrame)"""
+    return [
+        ("calcola_kpi", lambda df: dash.calcola_kpi(df)),
+        ("genera_insights_automatici", lambda df: dash.genera_insights_automatici(df)),
+        ("genera_report_narrativo", lambda df: dash.genera_report_narrativo(df)),
+        ("create_gaussian_distribution", lambda df: dash.create_gaussian_distribution(
+            df, "litio_estratto_kg", "Produzione")),
+        ("create_lognormal_distribution", lambda df: dash.create_lognormal_distribution(
+            df, "profitto_eur", "Profitto")),
+        ("create_poisson_distribution", lambda df: dash.create_poisson_distribution(
+            df, "guasti", "Guasti")),
+        ("update_dashboard_graphs", lambda df: dash.update_dashboard_graphs(None, None, None, None)),
+        ("kde_binned", lambda df: dash.kde_binned(df["litio_estratto_kg"].to_numpy())),
+        ("update_heatmap_correlazioni", lambda df: dash.update_heatmap_correlazioni(
+            None, None, None, None, "spearman")),
+        ("update_correlazione_ritardata", lambda df: dash.update_correlazione_ritardata(
+            None, None, None, None, "polveri_ug_m3", "guasti", 30)),
+        ("update_whatif", lambda df: dash.update_whatif(10, 5, 5, [0, 12])),
+        ("update_whatif_sensibilita", lambda df: dash.update_whatif_sensibilita(10, 5, 5, [0, 12])),
+        ("update_whatif_obiettivo", lambda df: dash.update_whatif_obiettivo(
+            "margine_medio", 35, 10, 5, 5, [0, 12])),
+        ("update_confronto_scenari", lambda df: dash.update_confronto_scenari(
+            ["A", "B"], "delta_profitto", [0, 12], 1400,
+            [{"nome": "A", "leve": [10, 5, 5]}, {"nome": "B", "leve": [-10, 0, 20]}])),
+        ("update_ambiente", lambda df: dash.update_ambiente("all", 1400)),
+        ("update_spc", lambda df: dash.update_spc("all", 1400)),
+        ("get_previsioni", lambda df: dash.get_previsioni()),
+        ("update_rischio_guasti", lambda df: dash.update_rischio_guasti(30, 1400)),
+        ("intervalli_kpi", lambda df: dash.intervalli_kpi(df)),
+        ("valuta_adattamenti", lambda df: dash.valuta_adattamenti(df, dash.DISTRIBUZIONI_DASHBOARD)),
+        ("update_summary_profit_trend", lambda df: dash.update_summary_profit_trend(
+            "tab-summary", {"filter": "all"})),
+    ]
+
+
+def misura(funzione, df, ripetizioni, prima_di_ogni_chiamata=None):
+    """Tempo della prima chiamata, minimo e mediana delle successive, picco di memoria.
+
+    `prima_di_ogni_chiamata` (fuori dal tempo misurato) svuota le cache dei risultati:
+    senza, le ripetizioni misurerebbero solo la lettura dalla cache.
+    """
+    prepara = prima_di_ogni_chiamata or (lambda: None)
+    tempi = []
+    for _ in range(ripetizioni + 1):
+        prepara()
+        inizio = time.perf_counter()
+        funzione(df)
+        tempi.append((time.perf_counter() - inizio) * 1000)
+
+    # Il picco di memoria è misurato in una chiamata separata: tracemalloc rallenta
+    prepara()
+    tracemalloc.start()
+    funzione(df)
+    _, picco = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    successivi = sorted(tempi[1:])
+    return {
+        "primo_ms": round(tempi[0], 3),
+        "min_ms": round(successivi[0], 3),
+        "mediana_ms": round(successivi[len(successivi) // 2], 3),
+        "picco_mb": round(picco / 2**20, 3),
+    }
+
+
+def esegui_benchmark(dimensioni, ripetizioni, filtro_casi=None):
+    import e_lithium_dashboard as dash
+
+    risultati = {}
+    for num_righe in dimensioni:
+        print(f"[Benchmark] Generazione dataset da {num_righe:,} righe...")
+        df = crea_dataset(num_righe)
+        dash.imposta_dataset(df)
+        risultati[str(num_righe)] = {}
+        for nome, funzione in casi_benchmark(dash):
+            if filtro_casi and nome not in filtro_casi:
+                continue
+            misure = misura(funzione, df, ripetizioni, dash.svuota_cache_per_versione)
+            risultati[str(num_righe)][nome] = misure
+            print(f"  {nome:<32} mediana {misure['mediana_ms']:>10.2f} ms | "
+                  f"primo {misure['primo_ms']:>10.2f} ms | picco {misure['picco_mb']:>9.1f} MB")
+        del df
+    return risultati
+
+
+def confronta_con_baseline(risultati, baseline, soglia, tolleranza_ms):
+    """Elenco delle regressioni: mediana oltre baseline * (1 + soglia) e oltre la tolleranza assoluta"""
+    regressioni = []
+    for dimensione, casi in risultati.items():
+        for nome, misure in casi.items():
+            riferimento = baseline.get("risultati", {}).get(dimensione, {}).get(nome)
+            if not riferimento:
+                continue
+            prima, dopo = riferimento["mediana_ms"], misure["mediana_ms"]
+            if dopo > prima * (1 + soglia) and dopo - prima > tolleranza_ms:
+                regressioni.append((dimensione, nome, prima, dopo))
+    return regressioni
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark headless della dashboard E-Lithium")
+    parser.add_argument("--sizes", default=",".join(str(n) for n in DIMENSIONI_DEFAULT),
+                        help="dimensioni dei dataset separate da virgola")
+    parser.add_argument("--ripetizioni", type=int, default=3, help="ripetizioni dopo la prima chiamata")
+    parser.add_argument("--casi", default="", help="funzioni da misurare separate da virgola (default: tutte)")
+    parser.add_argument("--output", default=None, help="file JSON dei risultati")
+    parser.add_argument("--baseline", default=None, help="JSON di un'esecuzione precedente da confrontare")
+    parser.add_argument("--soglia", type=float, default=0.25,
+                        help="regressione massima tollerata (0.25 = +25%% sulla mediana)")
+    parser.add_argument("--tolleranza-ms", type=float, default=2.0,
+                        help="differenza assoluta minima per considerare una regressione")
+    parser.add_argument("--budget-import-ms", type=float, default=None,
+                        help="tempo massimo di import a freddo del modulo (mediana dei processi)")
+    args = parser.parse_args()
+
+    dimensioni = [int(n) for n in args.sizes.split(",") if n.strip()]
+    filtro_casi = {c.strip() for c in args.casi.split(",") if c.strip()}
+
+    print("[Benchmark] Import a freddo del modulo della dashboard...")
+    avvio = misura_import_a_freddo(max(1, args.ripetizioni))
+    print(f"  {'import a freddo':<32} mediana {avvio['processo_mediana_ms']:>10.2f} ms | "
+          f"modulo {avvio['import_ms']:>10.2f} ms")
+    for voce in avvio["fasi"]:
+        print(f"    {voce['fase']:<30} {voce['ms']:>10.2f} ms")
+
+    risultati = esegui_benchmark(dimensioni, max(1, args.ripetizioni), filtro_casi)
+
+    import numpy as np
+    import pandas as pd
+    report = {
+        "meta": {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "piattaforma": platform.platform(),
+            "ripetizioni": args.ripetizioni,
+        },
+        "avvio": avvio,
+        "risultati": risultati,
+    }
+
+    output = args.output or os.path.join(
+        RISULTATI_DIR, f"benchmark_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[Benchmark] Risultati salvati in: {output}")
+
+    fallito = False
+    if args.budget_import_ms is not None and avvio["processo_mediana_ms"] > args.budget_import_ms:
+        print(f"[Benchmark] Import a freddo oltre il budget: {avvio['processo_mediana_ms']:.0f} ms "
+              f"> {args.budget_import_ms:.0f} ms")
+        fallito = True
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressioni = confronta_con_baseline(risultati, baseline, args.soglia, args.tolleranza_ms)
+        if regressioni:
+            print(f"[Benchmark] {len(regressioni)} regressioni oltre il {args.soglia:.0%}:")
+            for dimensione, nome, prima, dopo in regressioni:
+                print(f"  {nome} @ {int(dimensione):,} righe: {prima:.2f} ms -> {dopo:.2f} ms "
+                      f"({(dopo / prima - 1):+.0%})")
+            fallito = True
+        else:
+            print("[Benchmark] Nessuna regressione rispetto alla baseline")
+
+    if fallito:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+import http.cookiejar
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+# ==========================================================
+#  Test di carico HTTP della dashboard E-Lithium
+#  Avvia l'app su localhost e riproduce sessioni realistiche
+#  verso /_dash-update-component con molti utenti simultanei
+# ==========================================================
+#
+#  Esempi:
+#    python benchmark/e_lithium_loadtest.py --utenti 20 --durata 60
+#    python benchmark/e_lithium_loadtest.py --gunicorn-workers 2 --gunicorn-threads 8
+#    python benchmark/e_lithium_loadtest.py --url http://127.0.0.1:8050 --utenti 50
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+dashboard_dir = os.path.join(project_dir, "dashboard")
+RISULTATI_DIR = os.path.join(project_dir, "benchmark", "risultati")
+
+TAB = ["tab-summary", "tab-dashboard", "tab-ambiente", "tab-spc", "tab-about", "tab-whatif", "tab-source"]
+FILTRI_RAPIDI = ["7d", "30d", "best", "alerts", "all"]
+
+
+class ClientDash:
+    """Sessione di un utente simulato: cookie propri e richieste alle callback Dash"""
+
+    def __init__(self, base_url, timeout, registro):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.registro = registro
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        self.dipendenze = {}
+
+    def get(self, percorso):
+        with self.opener.open(self.base_url + percorso, timeout=self.timeout) as risposta:
+            return risposta.read()
+
+    def carica_pagina(self):
+        """Pagina iniziale, layout e grafo delle callback (come fa il browser)"""
+        inizio = time.perf_counter()
+        self.get("/")
+        self.get("/_dash-layout")
+        dipendenze = json.loads(self.get("/_dash-dependencies"))
+        self.registro.registra("page_load", time.perf_counter() - inizio, 200, 0)
+        for dipendenza in dipendenze:
+            self.dipendenze[dipendenza["output"]] = dipendenza
+
+    def _dipendenza(self, output_contiene):
+        for output, dipendenza in self.dipendenze.items():
+            if output_contiene in output:
+                return dipendenza
+        raise KeyError(f"Callback con output '{output_contiene}' non trovata")
+
+    def callback(self, nome, output_contiene, valori, cambiati):
+        """Invia una richiesta /_dash-update-component costruita dal grafo delle dipendenze"""
+        dipendenza = self._dipendenza(output_contiene)
+        output = dipendenza["output"]
+        if output.startswith(".."):
+            outputs = [dict(zip(("id", "property"), o.rsplit(".", 1)))
+                       for o in output.strip(".").split("...")]
+        else:
+            outputs = dict(zip(("id", "property"), output.rsplit(".", 1)))
+
+        def valorizza(elementi):
+            return [{"id": e["id"], "property": e["property"],
+                     "value": valori.get(f"{e['id']}.{e['property']}")} for e in elementi]
+
+        corpo = json.dumps({
+            "output": output,
+            "outputs": outputs,
+            "inputs": valorizza(dipendenza["inputs"]),
+            "state": valorizza(dipendenza.get("state", [])),
+            "changedPropIds": cambiati,
+        }).encode()
+        richiesta = urllib.request.Request(
+            self.base_url + "/_dash-update-component", data=corpo,
+            headers={"Content-Type": "application/json", "Accept-Encoding": "gzip, br"})
+
+        inizio = time.perf_counter()
+        try:
+            with self.opener.open(richiesta, timeout=self.timeout) as risposta:
+                dati = risposta.read()
+                stato = risposta.status
+        except urllib.error.HTTPError as errore:
+            dati, stato = b"", errore.code
+        except (urllib.error.URLError, socket.timeout, ConnectionError):
+            dati, stato = b"", 0
+        self.registro.registra(nome, time.perf_counter() - inizio, stato, len(dati))
+
+
+class RegistroLatenze:
+    """Latenze, esiti e byte ricevuti per callback (thread-safe)"""
+
+    def __init__(self):
+        self.latenze = defaultdict(list)
+        self.stati = defaultdict(lambda: defaultdict(int))
+        self.byte = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def registra(self, nome, durata, stato, byte):
+        with self._lock:
+            self.latenze[nome].append(durata)
+            self.stati[nome][stato] += 1
+            self.byte[nome] += byte
+
+    def report(self, durata_test):
+        report = {}
+        for nome, latenze in sorted(self.latenze.items()):
+            ordinate = sorted(latenze)
+            report[nome] = {
+                "richieste": len(ordinate),
+                "rps": round(len(ordinate) / durata_test, 2),
+                "p50_ms": round(_percentile(ordinate, 50) * 1000, 1),
+                "p95_ms": round(_percentile(ordinate, 95) * 1000, 1),
+                "p99_ms": round(_percentile(ordinate, 99) * 1000, 1),
+                "max_ms": round(ordinate[-1] * 1000, 1),
+                "kb_medi": round(self.byte[nome] / len(ordinate) / 1024, 1),
+                "esiti": {str(k): v for k, v in sorted(self.stati[nome].items())},
+            }
+        return report
+
+
+def _percentile(ordinati, p):
+    """Percentile con interpolazione lineare su una lista già ordinata"""
+    if not ordinati:
+        return 0.0
+    posizione = (len(ordinati) - 1) * p / 100
+    basso = int(posizione)
+    alto = min(basso + 1, len(ordinati) - 1)
+    return ordinati[basso] + (ordinati[alto] - ordinati[basso]) * (posizione - basso)
+
+
+# === AZIONI DELLE SESSIONI SIMULATE ===
+def azione_cambio_tab(client, rnd):
+    tab = rnd.choice(TAB)
+    valori = {"tabs.value": tab, "quick-filter-selection.data": {"filter": "all"}}
+    client.callback("render_tab_content", "tab-content.children", valori, ["tabs.value"])
+    if tab == "tab-summary":
+        client.callback("update_summary_profit_trend", "summary-profit-trend.figure", valori, ["tabs.value"])
+
+
+def azione_filtro_rapido(client, rnd):
+    valori = {"tabs.value": "tab-summary", "quick-filter-selection.data": {"filter": rnd.choice(FILTRI_RAPIDI)}}
+    cambiati = ["quick-filter-selection.data"]
+    # Le due callback del summary partono in parallelo sullo stesso trigger, come nel browser
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        pool.submit(client.callback, "render_tab_content", "tab-content.children", valori, cambiati)
+        pool.submit(client.callback, "update_summary_profit_trend", "summary-profit-trend.figure", valori, cambiati)
+
+
+def azione_trascinamento_slider(client, rnd, passi=5, intervallo=0.03):
+    """Raffica di richieste ravvicinate sugli slider purezza/profitto (trascinamento)"""
+    minimo = rnd.uniform(0, 15000)
+    with ThreadPoolExecutor(max_workers=passi) as pool:
+        for passo in range(passi):
+            valori = {
+                "date-range.start_date": None,
+                "date-range.end_date": None,
+                "purezza-range.value": [0, 100],
+                "profitto-range.value": [minimo + passo * 1500, 1e9],
+            }
+            pool.submit(client.callback, "update_dashboard_graphs", "dist-produzione-gauss.figure",
+                        valori, ["profitto-range.value"])
+            time.sleep(intervallo)
+
+
+def azione_whatif(client, rnd):
+    inizio = rnd.randint(0, 6)
+    valori = {
+        "slider-prod.value": rnd.choice(range(-50, 51, 5)),
+        "slider-prezzo.value": rnd.choice(range(-30, 31, 5)),
+        "slider-costi.value": rnd.choice(range(-50, 51, 5)),
+        "whatif-date-range.value": [inizio, rnd.randint(inizio + 1, 12)],
+    }
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        pool.submit(client.callback, "update_whatif", "whatif-profitto.figure", valori, ["slider-prod.value"])
+        pool.submit(client.callback, "update_whatif_date_info", "whatif-date-info.children",
+                    valori, ["whatif-date-range.value"])
+
+
+AZIONI = [
+    (azione_cambio_tab, 3),
+    (azione_filtro_rapido, 3),
+    (azione_trascinamento_slider, 2),
+    (azione_whatif, 2),
+]
+
+
+def utente_simulato(indice, base_url, fine, pausa, timeout, registro):
+    """Ciclo di una sessione: caricamento pagina e azioni casuali fino allo scadere del test"""
+    rnd = random.Random(indice)
+    client = ClientDash(base_url, timeout, registro)
+    try:
+        client.carica_pagina()
+    except Exception as errore:
+        registro.registra("page_load", 0.0, 0, 0)
+        print(f"[LoadTest] Utente {indice}: caricamento fallito ({errore})")
+        return
+    funzioni, pesi = zip(*AZIONI)
+    while time.time() < fine:
+        rnd.choices(funzioni, weights=pesi)[0](client, rnd)
+        time.sleep(rnd.uniform(0.5, 1.5) * pausa)
+
+
+# === AVVIO DEL SERVER ===
+def porta_libera():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def prepara_csv_sintetico(num_righe):
+    """Genera un CSV sintetico con il simulatore (per test su dataset più grandi)"""
+    sys.path.insert(0, os.path.join(project_dir, "simulatore"))
+    from e_lithium_simulatore import generate_dataset
+    from datetime import timedelta
+    passo = timedelta(days=1) if num_righe <= 36_500 else timedelta(days=3_650) / num_righe
+    percorso = os.path.join(tempfile.mkdtemp(prefix="e_lithium_"), "e_lithium_data.csv")
+    generate_dataset(num_days=num_righe, data_inizio=datetime(2015, 1, 1), passo=passo).to_csv(percorso, index=False)
+    return percorso
+
+
+def avvia_server(args, porta):
+    env = dict(os.environ)
+    if args.righe:
+        env["E_LITHIUM_CSV"] = prepara_csv_sintetico(args.righe)
+    if args.gunicorn_workers:
+        comando = ["gunicorn", "--chdir", dashboard_dir, "e_lithium_dashboard:server",
+                   "-b", f"127.0.0.1:{porta}", "-w", str(args.gunicorn_workers),
+                   "--threads", str(args.gunicorn_threads), "--log-level", "warning"]
+    else:
+        codice = ("import sys; sys.path.insert(0, sys.argv[1]); import e_lithium_dashboard as d; "
+                  "d.app.run(host='127.0.0.1', port=int(sys.argv[2]), debug=False, threaded=True)")
+        comando = [sys.executable, "-c", codice, dashboard_dir, str(porta)]
+    processo = subprocess.Popen(comando, cwd=project_dir, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    base_url = f"http://127.0.0.1:{porta}"
+    scadenza = time.time() + args.timeout_avvio
+    while time.time() < scadenza:
+        if processo.poll() is not None:
+            raise RuntimeError(f"Il server è terminato durante l'avvio (codice {processo.returncode})")
+        try:
+            urllib.request.urlopen(base_url + "/", timeout=2).read()
+            return processo, base_url
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.5)
+    processo.terminate()
+    raise RuntimeError("Timeout in attesa dell'avvio del server")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test di carico HTTP della dashboard E-Lithium")
+    parser.add_argument("--url", default=None, help="server già avviato (altrimenti viene avviato in locale)")
+    parser.add_argument("--utenti", type=int, default=10, help="utenti simulati simultanei")
+    parser.add_argument("--durata", type=float, default=30, help="durata del test in secondi")
+    parser.add_argument("--pausa-ms", type=float, default=300, help="pausa media tra due azioni")
+    parser.add_argument("--timeout", type=float, default=30, help="timeout delle richieste in secondi")
+    parser.add_argument("--righe", type=int, default=0, help="dataset sintetico di N righe (default: simulatore)")
+    parser.add_argument("--gunicorn-workers", type=int, default=0, help="avvia con gunicorn e N worker")
+    parser.add_argument("--gunicorn-threads", type=int, default=4, help="thread per worker gunicorn")
+    parser.add_argument("--timeout-avvio", type=float, default=120, help="attesa massima per l'avvio del server")
+    parser.add_argument("--output", default=None, help="file JSON dei risultati")
+    args = parser.parse_args()
+
+    processo = None
+    base_url = args.url
+    if base_url is None:
+        print("[LoadTest] Avvio del server locale...")
+        processo, base_url = avvia_server(args, porta_libera())
+    print(f"[LoadTest] {args.utenti} utenti per {args.durata:.0f}s contro {base_url}")
+
+    registro = RegistroLatenze()
+    inizio = time.time()
+    fine = inizio + args.durata
+    try:
+        with ThreadPoolExecutor(max_workers=args.utenti) as pool:
+            for indice in range(args.utenti):
+                pool.submit(utente_simulato, indice, base_url, fine, args.pausa_ms / 1000, args.timeout, registro)
+                time.sleep(min(0.1, args.durata / max(args.utenti, 1) / 10))  # rampa di avvio
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait(timeout=10)
+    durata_effettiva = time.time() - inizio
+
+    report = registro.report(durata_effettiva)
+    print(f"\n{'callback':<30}{'req':>7}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'kB':>8}  esiti")
+    for nome, r in report.items():
+        print(f"{nome:<30}{r['richieste']:>7}{r['rps']:>8.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}"
+              f"{r['p99_ms']:>9.1f}{r['kb_medi']:>8.1f}  {r['esiti']}")
+    totale = sum(r["richieste"] for r in report.values())
+    print(f"\n[LoadTest] {totale} richieste in {durata_effettiva:.1f}s ({totale / durata_effettiva:.1f} req/s)")
+    print("[LoadTest] Esito 204 = callback senza aggiornamenti (PreventUpdate)")
+
+    output = args.output or os.path.join(
+        RISULTATI_DIR, f"loadtest_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "utenti": args.utenti,
+                "durata_s": round(durata_effettiva, 1),
+                "gunicorn_workers": args.gunicorn_workers,
+                "gunicorn_threads": args.gunicorn_threads if args.gunicorn_workers else None,
+                "righe": args.righe or None,
+            },
+            "risultati": report,
+        }, f, indent=2)
+    print(f"[LoadTest] Risultati salvati in: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import numpy as np
+
+
+# ==========================================================
+#  Bontà di adattamento delle distribuzioni teoriche:
+#  parametri e test (Kolmogorov-Smirnov, Anderson-Darling,
+#  chi quadro per la Poisson) calcolati in blocco per tutte
+#  le colonne dei grafici delle distribuzioni
+# ==========================================================
+#  I parametri sono quelli disegnati nei grafici (media e deviazione
+#  standard, log-normale con loc = 0, lambda = media) e sono stimati
+#  su tutte le righe. KS e AD lavorano sui valori ordinati: oltre
+#  RIGHE_MASSIME_TEST righe si usa un sottocampione fisso, perché
+#  il costo dell'ordinamento cresce con le righe mentre con campioni
+#  così grandi i test rifiutano anche scostamenti trascurabili.
+
+DISTRIBUZIONI = ("normale", "lognormale", "poisson")
+RIGHE_MASSIME_TEST = 50_000
+MIN_RIGHE_PARALLELO = 200_000  # sotto questa soglia i thread costano più del calcolo
+ATTESI_MINIMI_CHI2 = 5
+ALFA = 0.05
+
+
+def _valori(colonna, distribuzione):
+    valori = np.asarray(colonna, dtype=np.float64)
+    valori = valori[~np.isnan(valori)]
+    if distribuzione == "lognormale":
+        valori = valori[valori > 0]
+    return valori
+
+
+def _sottocampione(valori, righe_massime, seme=0):
+    if len(valori) <= righe_massime:
+        return valori
+    return np.random.default_rng(seme).choice(valori, righe_massime, replace=False)
+
+
+def _ks_ad_normale(z):
+    """KS e Anderson-Darling di valori standardizzati con parametri stimati: (D, p_KS, A2, p_AD)"""
+    from scipy import stats
+    n = len(z)
+    z = np.sort(z)
+    cdf = stats.norm.cdf(z)
+    posizioni = np.arange(1, n + 1)
+    d = max(np.max(posizioni / n - cdf), np.max(cdf - (posizioni - 1) / n))
+    # Distribuzione esatta di D per n righe (come scipy.stats.kstest), costo indipendente da n
+    p_ks = float(stats.kstwo.sf(d, n))
+
+    # A2 = -n - 1/n sum (2i - 1) [ln F(x_i) + ln(1 - F(x_{n+1-i}))]
+    log_cdf = stats.norm.logcdf(z)
+    log_sf = stats.norm.logsf(z)[::-1]
+    a2 = -n - np.sum((2 * posizioni - 1) * (log_cdf + log_sf)) / n
+    # p-value per media e varianza stimate (D'Agostino e Stephens, 1986)
+    a2_corretto = a2 * (1 + 0.75 / n + 2.25 / n ** 2)
+    if a2_corretto >= 0.6:
+        p_ad = np.exp(1.2937 - 5.709 * a2_corretto + 0.0186 * a2_corretto ** 2)
+    elif a2_corretto >= 0.34:
+        p_ad = np.exp(0.9177 - 4.279 * a2_corretto - 1.38 * a2_corretto ** 2)
+    elif a2_corretto >= 0.2:
+        p_ad = 1 - np.exp(-8.318 + 42.796 * a2_corretto - 59.938 * a2_corretto ** 2)
+    else:
+        p_ad = 1 - np.exp(-13.436 + 101.14 * a2_corretto - 223.73 * a2_corretto ** 2)
+    return float(d), p_ks, float(a2), float(np.clip(p_ad, 0.0, 1.0))
+
+
+def _chi2_poisson(conteggi, lam):
+    """Chi quadro dei conteggi contro la Poisson(lam), con le classi di coda unite finché attese >= 5.
+
+    Se restano meno di tre classi si usa l'indice di dispersione sum (x - lam)^2 / lam,
+    distribuito come un chi quadro con n - 1 gradi di libertà.
+    """
+    from scipy import stats
+    n = len(conteggi)
+    osservati = np.bincount(conteggi.astype(np.int64))
+    attesi = n * stats.poisson.pmf(np.arange(len(osservati)), lam)
+    attesi[-1] = n * stats.poisson.sf(len(osservati) - 2, lam)  # ultima classe: k >= massimo osservato
+    # Unione delle classi dalla coda verso il centro
+    while len(attesi) > 2 and attesi[-1] < ATTESI_MINIMI_CHI2:
+        attesi[-2] += attesi[-1]
+        osservati[-2] += osservati[-1]
+        attesi, osservati = attesi[:-1], osservati[:-1]
+    gradi = len(attesi) - 2  # classi - 1 - parametro stimato
+    if gradi < 1:
+        # Eventi troppo rari per due classi libere: test chi quadro dell'indice di dispersione
+        gradi = n - 1
+        statistica = float(np.sum((conteggi - lam) ** 2) / lam) if lam > 0 else float("nan")
+        p = 2 * min(stats.chi2.sf(statistica, gradi), stats.chi2.cdf(statistica, gradi))
+        return statistica, float(min(p, 1.0)), gradi
+    statistica = float(np.sum((osservati - attesi) ** 2 / attesi))
+    return statistica, float(stats.chi2.sf(statistica, gradi)), gradi
+
+
+def adattamento(colonna, distribuzione, righe_massime=RIGHE_MASSIME_TEST):
+    """Parametri e test di una colonna per la distribuzione indicata (None se i dati non bastano)"""
+    valori = _valori(colonna, distribuzione)
+    if len(valori) < 3:
+        return None
+    risultato = {"distribuzione": distribuzione, "righe": len(valori)}
+    if distribuzione == "poisson":
+        lam = float(valori.mean())
+        statistica, p, gradi = _chi2_poisson(np.round(valori), lam)
+        risultato.update(parametri={"lambda": lam, "varianza": float(valori.var())},
+                         test={"chi2": (statistica, p)}, gradi_chi2=gradi)
+        return risultato
+
+    logaritmi = np.log(valori) if distribuzione == "lognormale" else valori
+    media, deviazione = float(logaritmi.mean()), float(logaritmi.std())
+    if distribuzione == "lognormale":
+        risultato["parametri"] = {"forma": deviazione, "scala": float(np.exp(media))}
+    else:
+        risultato["parametri"] = {"media": media, "deviazione": deviazione}
+    if deviazione == 0:
+        risultato["test"] = {}
+        return risultato
+    campione = _sottocampione(logaritmi, righe_massime)
+    d, p_ks, a2, p_ad = _ks_ad_normale((campione - media) / deviazione)
+    risultato["test"] = {"ks": (d, p_ks), "ad": (a2, p_ad)}
+    risultato["righe_test"] = len(campione)
+    return risultato
+
+
+def valuta_adattamenti(df, specifiche, parallelo=None):
+    """Adattamenti di tutte le coppie (colonna, distribuzione) presenti nel DataFrame.
+
+    Con `parallelo=None` le colonne sono valutate in thread solo per DataFrame
+    grandi (ordinamenti e funzioni di scipy rilasciano il GIL).
+    """
+    specifiche = [(colonna, distribuzione) for colonna, distribuzione in specifiche if colonna in df]
+    if parallelo is None:
+        parallelo = len(df) >= MIN_RIGHE_PARALLELO
+    lavori = [(df[colonna].to_numpy(), distribuzione) for colonna, distribuzione in specifiche]
+    if parallelo and len(lavori) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=len(lavori)) as pool:
+            risultati = list(pool.map(lambda lavoro: adattamento(*lavoro), lavori))
+    else:
+        risultati = [adattamento(*lavoro) for lavoro in lavori]
+    return dict(zip(specifiche, risultati))
+
+
+def descrizione_test(risultato, alfa=ALFA):
+    """Righe della legenda con i p-value dei test (✓ se non si rifiuta l'adattamento)"""
+    if not risultato or not risultato.get("test"):
+        return []
+    nomi = {"ks": "KS", "ad": "AD", "chi2": "χ²"}
+    righe = []
+    for test, (_, p) in risultato["test"].items():
+        if np.isnan(p):
+            continue
+        righe.append(f"{nomi[test]} p = {p:.3f} {'✓' if p >= alfa else '✗'}")
+    return righe
@@ -0,0 +1,82 @@
+import numpy as np
+
+
+# ==========================================================
+#  Intervalli di confidenza bootstrap dei KPI: medie e trend
+#  (seconda metà contro prima metà) da un'unica matrice di
+#  indici ricampionati, con un budget di elementi fisso
+# ==========================================================
+#  Il ricampionamento è stratificato sulle due metà del periodo,
+#  come il trend di `calcola_kpi`: la stessa matrice dà la media
+#  di ogni metà e quindi media complessiva e variazione percentuale.
+#  Il costo è proporzionale a campioni x righe: il numero di campioni
+#  scende con le righe e, oltre il budget, ogni campione usa m < n
+#  righe (bootstrap m su n) con la dispersione riscalata di sqrt(m/n).
+
+# KPI: (chiave di calcola_kpi, colonna)
+COLONNE_KPI = (
+    ("produzione", "litio_estratto_kg"),
+    ("purezza", "purezza_%"),
+    ("profitto", "profitto_eur"),
+    ("margine", "margine_%"),
+)
+
+CAMPIONI_MASSIMI = 2000
+CAMPIONI_MINIMI = 200
+BUDGET_ELEMENTI = 1_000_000  # campioni x righe: ~50 ms per i quattro KPI
+LIVELLO = 0.95
+
+
+def dimensione_ricampionamento(righe, budget=BUDGET_ELEMENTI):
+    """(campioni, righe per campione) entro il budget di elementi"""
+    campioni = int(np.clip(budget // max(righe, 1), CAMPIONI_MINIMI, CAMPIONI_MASSIMI))
+    return campioni, min(righe, budget // campioni)
+
+
+def _variazione(prima, dopo, valore_assoluto):
+    base = np.abs(prima) if valore_assoluto else prima
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(prima != 0, (dopo - prima) / np.where(prima != 0, base, 1) * 100, 0.0)
+
+
+def intervalli_kpi(df, livello=LIVELLO, budget=BUDGET_ELEMENTI, seme=0):
+    """Intervalli percentili {"avg_<kpi>": (inf, sup), "trend_<kpi>": (inf, sup)} e numero di campioni"""
+    n = len(df)
+    colonne = [colonna for _, colonna in COLONNE_KPI]
+    if n < 4:
+        return None
+    valori = df[colonne].to_numpy(dtype=np.float64)
+    colonne_contigue = np.ascontiguousarray(valori.T)  # letture casuali su una colonna alla volta
+    meta = n // 2
+    campioni, m = dimensione_ricampionamento(n, budget)
+    m_prima = max(round(m * meta / n), 1)
+    m_dopo = max(m - m_prima, 1)
+
+    # Un'unica estrazione: le prime colonne ricampionano la prima metà, le altre la seconda
+    rng = np.random.default_rng(seme)
+    minimi = np.repeat([0, meta], [m_prima, m_dopo])
+    massimi = np.repeat([meta, n], [m_prima, m_dopo])
+    indici = rng.integers(minimi, massimi, size=(campioni, m_prima + m_dopo))
+
+    medie_prima = np.empty((campioni, len(colonne)))
+    medie_dopo = np.empty((campioni, len(colonne)))
+    for c, colonna in enumerate(colonne_contigue):
+        ricampionati = colonna[indici]
+        medie_prima[:, c] = ricampionati[:, :m_prima].mean(axis=1)
+        medie_dopo[:, c] = ricampionati[:, m_prima:].mean(axis=1)
+
+    # Bootstrap m su n: le deviazioni dalla stima del campione completo scalano con sqrt(m/n)
+    stima_prima = valori[:meta].mean(axis=0)
+    stima_dopo = valori[meta:].mean(axis=0)
+    medie_prima = stima_prima + (medie_prima - stima_prima) * np.sqrt(m_prima / meta)
+    medie_dopo = stima_dopo + (medie_dopo - stima_dopo) * np.sqrt(m_dopo / (n - meta))
+    medie = (medie_prima * meta + medie_dopo * (n - meta)) / n
+
+    coda = (1 - livello) / 2 * 100
+    risultato = {"campioni": campioni, "livello": livello}
+    for c, (chiave, _) in enumerate(COLONNE_KPI):
+        trend = _variazione(medie_prima[:, c], medie_dopo[:, c], valore_assoluto=chiave == "profitto")
+        for nome, distribuzione in ((f"avg_{chiave}", medie[:, c]), (f"trend_{chiave}", trend)):
+            inferiore, superiore = np.percentile(distribuzione, [coda, 100 - coda])
+            risultato[nome] = (float(inferiore), float(superiore))
+    return risultato
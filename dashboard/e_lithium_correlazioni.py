@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+
+# ==========================================================
+#  Correlazioni tra tutte le variabili simulate
+#  Pearson e Spearman con un unico prodotto matriciale,
+#  correlazione ritardata (lead/lag) calcolata con la FFT
+# ==========================================================
+
+ETICHETTE = {
+    "temperatura_C": "Temperatura (°C)",
+    "umidita_%": "Umidità (%)",
+    "CO2_ppm": "CO2 (ppm)",
+    "polveri_ug_m3": "Polveri (µg/m³)",
+    "livello_falda_m": "Livello falda (m)",
+    "litio_estratto_kg": "Litio estratto (kg)",
+    "purezza_%": "Purezza (%)",
+    "energia_kWh": "Energia (kWh)",
+    "guasti": "Guasti",
+    "prezzo_litio_eur_kg": "Prezzo litio (€/kg)",
+    "costi_eur": "Costi (€)",
+    "ricavi_eur": "Ricavi (€)",
+    "profitto_eur": "Profitto (€)",
+    "efficienza_kWh_kg": "Efficienza (kWh/kg)",
+    "margine_%": "Margine (%)",
+    "costo_unitario_eur_kg": "Costo unitario (€/kg)",
+}
+
+METODI = {"pearson": "Pearson", "spearman": "Spearman"}
+
+
+def etichetta(colonna):
+    return ETICHETTE.get(colonna, colonna)
+
+
+def colonne_numeriche(df):
+    """Tutte le colonne numeriche del dataset, nell'ordine del CSV"""
+    return list(df.select_dtypes("number").columns)
+
+
+def correlazione_pearson(valori):
+    """Matrice di Pearson di una matrice righe x variabili con un solo prodotto matriciale"""
+    centrati = valori - valori.mean(axis=0)
+    covarianza = centrati.T @ centrati
+    norme = np.sqrt(np.diag(covarianza))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correlazioni = covarianza / np.outer(norme, norme)
+    # Le variabili costanti restano NaN, la diagonale delle altre è esattamente 1
+    np.fill_diagonal(correlazioni, np.where(norme > 0, 1.0, np.nan))
+    return np.clip(correlazioni, -1.0, 1.0)
+
+
+def correlazione_spearman(valori):
+    """Spearman: Pearson sui ranghi (media dei ranghi in caso di parità, es. guasti)"""
+    from scipy.stats import rankdata
+    return correlazione_pearson(rankdata(valori, axis=0))
+
+
+def matrice_correlazione(df, metodo="pearson", colonne=None):
+    """DataFrame di correlazione sulle colonne indicate (default: tutte le numeriche).
+
+    Le righe con valori mancanti vengono escluse per tutte le coppie (listwise).
+    """
+    colonne = colonne or colonne_numeriche(df)
+    valori = df[colonne].to_numpy(dtype=np.float64)
+    completi = ~np.isnan(valori).any(axis=1)
+    if not completi.all():
+        valori = valori[completi]
+    if len(valori) < 2:
+        return pd.DataFrame(np.nan, index=colonne, columns=colonne)
+    calcolo = correlazione_spearman if metodo == "spearman" else correlazione_pearson
+    return pd.DataFrame(calcolo(valori), index=colonne, columns=colonne)
+
+
+def serie_giornaliere(df, colonne, colonna_data="data"):
+    """Medie giornaliere su calendario continuo (NaN nei giorni senza righe).
+
+    Restituisce (primo giorno, matrice giorni x colonne): i ritardi della
+    correlazione ritardata sono così in giorni anche con dati filtrati o infragiornalieri.
+    """
+    if not df[colonna_data].is_monotonic_increasing:
+        df = df.sort_values(colonna_data, kind="stable")
+    giorni = df[colonna_data].to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+    if len(giorni) == 0:
+        return None, np.empty((0, len(colonne)))
+    inizi = np.concatenate(([0], np.flatnonzero(np.diff(giorni.astype(np.int64))) + 1))
+    conteggi = np.diff(np.append(inizi, len(giorni)))
+    medie = np.add.reduceat(df[colonne].to_numpy(dtype=np.float64), inizi, axis=0) / conteggi[:, None]
+
+    posizioni = (giorni[inizi] - giorni[0]).astype(np.int64)
+    calendario = np.full((posizioni[-1] + 1, len(colonne)), np.nan)
+    calendario[posizioni] = medie
+    return pd.Timestamp(giorni[0]), calendario
+
+
+def correlazione_ritardata(x, y, ritardo_max):
+    """Correlazione r(k) = corr(x[t], y[t+k]) per k in [-ritardo_max, ritardo_max].
+
+    k > 0 significa che x anticipa y di k passi. Numeratore e numero di coppie
+    valide sono calcolati con la FFT (O(n log n) per tutti i ritardi insieme);
+    i valori mancanti (NaN) sono esclusi dalle coppie.
+    Restituisce (ritardi, correlazioni, coppie).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    ritardo_max = int(max(0, min(ritardo_max, n - 1)))
+    ritardi = np.arange(-ritardo_max, ritardo_max + 1)
+    validi_x, validi_y = ~np.isnan(x), ~np.isnan(y)
+    if n < 2 or validi_x.sum() < 2 or validi_y.sum() < 2:
+        return ritardi, np.full(len(ritardi), np.nan), np.zeros(len(ritardi), dtype=np.int64)
+
+    x0 = np.where(validi_x, x - np.nanmean(x), 0.0)
+    y0 = np.where(validi_y, y - np.nanmean(y), 0.0)
+    dimensione = 1 << (2 * n - 1).bit_length()
+
+    def incrociata(a, b):
+        # c[k] = somma_t a[t] * b[t + k]; i ritardi negativi finiscono in coda
+        return np.fft.irfft(np.conj(np.fft.rfft(a, dimensione)) * np.fft.rfft(b, dimensione), dimensione)
+
+    numeratore = incrociata(x0, y0)[ritardi % dimensione]
+    coppie = np.rint(incrociata(validi_x.astype(np.float64), validi_y.astype(np.float64))[ritardi % dimensione])
+    scala = np.sqrt(np.mean(x0[validi_x] ** 2) * np.mean(y0[validi_y] ** 2))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correlazioni = np.where(coppie >= 2, numeratore / (coppie * scala), np.nan)
+    return ritardi, np.clip(correlazioni, -1.0, 1.0), coppie.astype(np.int64)
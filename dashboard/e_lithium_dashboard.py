@@ -1,41 +1,293 @@
+import time
+_INIZIO_IMPORT = time.perf_counter()
+
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 import dash_bootstrap_components as dbc
 import os
 import numpy as np
-import subprocess
 import sys
+import functools
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
+import flask
+import plotly.io as pio
 from dash.dependencies import Input, Output, State, ALL, MATCH
-from dash import Dash, html, dcc, callback
-from scipy import stats
-from scipy.stats import gaussian_kde
+from dash.exceptions import PreventUpdate, MissingCallbackContextException
+from dash import Dash, html, dcc, callback, ctx, no_update
+# scipy.stats è importato solo dove serve (e precaricato in background)
 
 
 # Dashboard Interattiva E-Lithium S.p.A.
 # Sistema di monitoraggio e analisi dei dati di produzione
 # Visualizzazione real-time delle metriche aziendali
 
+# === TEMPI DI AVVIO ===
+# Ogni fase dell'import viene cronometrata; oltre il budget (ms) viene stampato un avviso.
+# E_LITHIUM_STARTUP_REPORT=1 stampa sempre il report, visibile anche su /_e-lithium/avvio
+IMPORT_BUDGET_MS = float(os.environ.get("E_LITHIUM_IMPORT_BUDGET_MS", "2000"))
+REPORT_AVVIO = os.environ.get("E_LITHIUM_STARTUP_REPORT") == "1"
+
+_fasi_avvio = []  # (fase, ms)
+_fasi_background = {}  # lavori differiti: fase -> ms
+_ultimo_segno = [_INIZIO_IMPORT]
+
+
+def segna_fase_avvio(nome):
+    """Registra la durata della fase di avvio conclusa ora (dal segno precedente)"""
+    adesso = time.perf_counter()
+    _fasi_avvio.append((nome, (adesso - _ultimo_segno[0]) * 1000))
+    _ultimo_segno[0] = adesso
+
+
+def get_report_avvio():
+    """Tempi di import per fase e dei lavori differiti in background"""
+    totale = sum(ms for _, ms in _fasi_avvio)
+    return {
+        "fasi": [{"fase": nome, "ms": round(ms, 1)} for nome, ms in _fasi_avvio],
+        "import_ms": round(totale, 1),
+        "budget_ms": IMPORT_BUDGET_MS,
+        "oltre_budget": totale > IMPORT_BUDGET_MS,
+        "background": {nome: round(ms, 1) for nome, ms in _fasi_background.items()},
+    }
+
+
+def stampa_report_avvio():
+    report = get_report_avvio()
+    print(f"[Avvio] Import completato in {report['import_ms']:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    for voce in report["fasi"]:
+        print(f"[Avvio]   {voce['fase']:<22} {voce['ms']:>8.1f} ms")
+    for nome, ms in report["background"].items():
+        print(f"[Avvio]   {nome:<22} {ms:>8.1f} ms (background)")
+
+
+segna_fase_avvio("librerie")
+
 # Configurazione del percorso assoluto
 project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-csv_path = os.path.join(project_dir, "data", "e_lithium_data.csv")
-simulatore_path = os.path.join(project_dir, "simulatore", "e_lithium_simulatore.py")
+# E_LITHIUM_CSV permette di servire un dataset esterno (es. test di carico su dati sintetici)
+csv_path = os.environ.get("E_LITHIUM_CSV") or os.path.join(project_dir, "data", "e_lithium_data.csv")
+simulatore_dir = os.path.join(project_dir, "simulatore")
+
+# I moduli di supporto si trovano nella stessa cartella della dashboard
+dashboard_dir = os.path.dirname(os.path.abspath(__file__))
+if dashboard_dir not in sys.path:
+    sys.path.insert(0, dashboard_dir)
+
+from e_lithium_metriche import registro, strumenta_callback, fase, registra_righe, registra_payload
+from e_lithium_profilazione import profila
+from e_lithium_serie import punti_disegnabili, finestra_da_relayout, filtra_finestra, traccia_temporale
+from e_lithium_piramide import PiramideAggregazioni, GREZZI, DESCRIZIONI_LIVELLI, interseca_intervalli
+from e_lithium_sensori import ArchivioSensori, SOGLIE_AMBIENTALI, stato_valore
+from e_lithium_spc import MonitorSPC, CARTE as CARTE_SPC
+from e_lithium_whatif import (
+    applica_scenario, ricavi_scenario, costi_scenario, margine, SommeCumulate, sensibilita, PARAMETRI as LEVE_WHATIF,
+    LEVE as DESCRIZIONI_LEVE, OBIETTIVI, risolvi_obiettivo, risolvi_margine_medio,
+    risultati_giornalieri, MAX_SCENARI_SALVATI, IndicePeriodi
+)
+from e_lithium_guasti import RischioGuasti
+from e_lithium_bootstrap import intervalli_kpi
+from e_lithium_adattamento import valuta_adattamenti, descrizione_test
+from e_lithium_kde import kde_binned, kde_logaritmica
+from e_lithium_varianza import confronta_righe, EFFETTI as EFFETTI_VARIANZA
+from e_lithium_previsioni import PrevisoreHolt, SERIE_PREVISTE, ORIZZONTI, serie_da_livello_giornaliero
+from e_lithium_correlazioni import (
+    METODI as METODI_CORRELAZIONE, etichetta, colonne_numeriche, matrice_correlazione,
+    serie_giornaliere, correlazione_ritardata
+)
 
-# Avvia il simulatore per generare i dati aggiornati (solo una volta, non in debug reload)
-if os.environ.get("WERKZEUG_RUN_MAIN") != "true":
+segna_fase_avvio("moduli di supporto")
+
+# === DATI E LAVORI DIFFERITI ===
+# Il simulatore gira nel processo, in un thread avviato a fine import: l'app esiste
+# subito e load_data() attende i dati solo se vengono richiesti prima che siano pronti.
+# Con più worker gunicorn lo esegue solo il primo: un lock sul file marcatore accanto al
+# CSV serializza i worker, che trovano l'avvio corrente già registrato e leggono soltanto.
+# Non viene avviato nel processo figlio del reloader di debug (lo ha già fatto il padre),
+# con E_LITHIUM_SKIP_SIMULATORE=1 (benchmark) né con un CSV esterno (E_LITHIUM_CSV).
+# E_LITHIUM_PRERISCALDAMENTO=0 disattiva il precaricamento in background dei moduli pesanti.
+ESEGUI_SIMULATORE = (os.environ.get("WERKZEUG_RUN_MAIN") != "true"
+                     and os.environ.get("E_LITHIUM_SKIP_SIMULATORE") != "1"
+                     and not os.environ.get("E_LITHIUM_CSV"))
+PRERISCALDAMENTO = os.environ.get("E_LITHIUM_PRERISCALDAMENTO", "1") != "0"
+MODULI_PESANTI = ("scipy.stats", "scipy.signal")
+# Avvio del server: il processo stesso se eseguito come script, altrimenti il master gunicorn
+# (comune a tutti i worker, anche a quelli riavviati dopo max_requests)
+ID_AVVIO = str(os.getpid() if __name__ == "__main__" else os.getppid())
+
+try:
+    import fcntl
+except ImportError:  # Windows: un solo processo di sviluppo, nessun lock necessario
+    fcntl = None
+
+_dati_pronti = threading.Event()
+if not ESEGUI_SIMULATORE:
+    _dati_pronti.set()
+
+
+def genera_csv():
+    """Genera i dati aggiornati con il simulatore e sostituisce il CSV in modo atomico"""
     print("[Dashboard] Avviamento del simulatore per generare i dati...")
+    if simulatore_dir not in sys.path:
+        sys.path.insert(0, simulatore_dir)
+    from e_lithium_simulatore import generate_dataset
+
+    df = generate_dataset()
+    # Scrittura su file temporaneo e rename: gli altri worker non leggono mai un CSV parziale
+    temporaneo = f"{csv_path}.{os.getpid()}.tmp"
+    df.to_csv(temporaneo, index=False)
+    os.replace(temporaneo, csv_path)
+    print("[Dashboard] Simulatore completato con successo!")
+
+
+def esegui_simulatore():
+    """Esegue il simulatore una sola volta per avvio del server, qualunque sia il numero di worker"""
+    inizio = time.perf_counter()
     try:
-        subprocess.run([sys.executable, simulatore_path], check=True, cwd=project_dir)
-        print("[Dashboard] Simulatore completato con successo!")
+        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        with open(f"{csv_path}.avvio", "a+", encoding="utf-8") as marcatore:
+            if fcntl is not None:
+                fcntl.flock(marcatore, fcntl.LOCK_EX)  # attende il worker che sta generando i dati
+            marcatore.seek(0)
+            if marcatore.read().strip() == ID_AVVIO and os.path.exists(csv_path):
+                print("[Dashboard] Dati già generati da un altro worker: sola lettura")
+                return
+            genera_csv()
+            marcatore.seek(0)
+            marcatore.truncate()
+            marcatore.write(ID_AVVIO)
     except Exception as e:
         print(f"[Dashboard] Errore nell'avvio del simulatore: {str(e)}")
+    finally:
+        _fasi_background["simulatore"] = (time.perf_counter() - inizio) * 1000
+        _dati_pronti.set()
+
+
+def precarica_moduli():
+    """Importa i moduli di analisi pesanti prima che li chieda una callback"""
+    import importlib
+    for modulo in MODULI_PESANTI:
+        inizio = time.perf_counter()
+        try:
+            importlib.import_module(modulo)
+        except Exception as e:
+            print(f"[Dashboard] Errore nel precaricamento di {modulo}: {str(e)}")
+        _fasi_background[f"import {modulo}"] = (time.perf_counter() - inizio) * 1000
+
+
+def avvia_lavori_differiti():
+    """Thread in background: prima i dati, poi il precaricamento dei moduli"""
+    def lavori():
+        if ESEGUI_SIMULATORE:
+            esegui_simulatore()
+        if PRERISCALDAMENTO:
+            precarica_moduli()
+
+    if ESEGUI_SIMULATORE or PRERISCALDAMENTO:
+        threading.Thread(target=lavori, daemon=True, name="e-lithium-avvio").start()
+
+
+def attendi_dati():
+    """Blocca finché il simulatore non ha scritto il CSV"""
+    _dati_pronti.wait()
+
+# Versione del dataset: cambia ogni volta che il simulatore riscrive il CSV
+def get_dataset_version():
+    """Restituisce un identificativo economico della versione del CSV (mtime, dimensione)"""
+    if _dataset_cache["in_memoria"]:
+        return _dataset_cache["versione"]
+    attendi_dati()
+    st = os.stat(csv_path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+_dataset_cache = {"versione": None, "df": None, "in_memoria": False}
+_dataset_lock = threading.Lock()
+
+
+def imposta_dataset(df):
+    """Sostituisce il CSV con un DataFrame in memoria (benchmark e test di carico)"""
+    if not pd.api.types.is_datetime64_any_dtype(df["data"]):
+        df["data"] = pd.to_datetime(df["data"])
+    with _dataset_lock:
+        _dataset_cache["versione"] = ("memoria", id(df), len(df), time.perf_counter_ns())
+        _dataset_cache["df"] = df
+        _dataset_cache["in_memoria"] = True
+
 
 # Funzione per caricare i dati aggiornati da CSV
 def load_data():
-    df = pd.read_csv(csv_path)
-    df["data"] = pd.to_datetime(df["data"])
-    return df
+    """Carica il CSV una sola volta per versione (il DataFrame è condiviso: sola lettura)"""
+    versione = get_dataset_version()
+    with _dataset_lock:
+        if _dataset_cache["versione"] != versione:
+            df = pd.read_csv(csv_path)
+            df["data"] = pd.to_datetime(df["data"])
+            _dataset_cache["versione"] = versione
+            _dataset_cache["df"] = df
+        return _dataset_cache["df"]
+
+
+_cache_registrate = []
+
+
+def cache_per_versione(maxsize=32):
+    """Decoratore: memorizza i risultati per versione del dataset e argomenti della funzione.
+
+    Al cambio di versione le voci precedenti vengono invalidate. Il calcolo avviene
+    sotto un lock per chiave: callback concorrenti sullo stesso trigger lo eseguono
+    una volta sola, mentre argomenti diversi vengono calcolati in parallelo.
+    """
+    def decoratore(func):
+        cache = OrderedDict()
+        lock = threading.Lock()  # protegge cache e lock_chiavi, mai durante il calcolo
+        lock_chiavi = {}
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            versione = get_dataset_version()
+            chiave = (versione, args)
+            with lock:
+                if chiave in cache:
+                    cache.move_to_end(chiave)
+                    return cache[chiave]
+                lock_chiave = lock_chiavi.setdefault(chiave, threading.Lock())
+            with lock_chiave:
+                with lock:
+                    # Calcolato da un'altra richiesta mentre si attendeva il lock
+                    if chiave in cache:
+                        cache.move_to_end(chiave)
+                        return cache[chiave]
+                try:
+                    risultato = func(*args)
+                    with lock:
+                        for vecchia in [k for k in cache if k[0] != versione]:
+                            del cache[vecchia]
+                        cache[chiave] = risultato
+                        while len(cache) > maxsize:
+                            cache.popitem(last=False)
+                    return risultato
+                finally:
+                    with lock:
+                        lock_chiavi.pop(chiave, None)
+
+        wrapper.cache_clear = cache.clear
+        _cache_registrate.append(cache)
+        return wrapper
+    return decoratore
+
+
+def svuota_cache_per_versione():
+    """Svuota tutte le cache per versione (benchmark: ogni ripetizione ricalcola davvero).
+
+    I motori incrementali (SPC, previsioni, guasti) conservano lo stato e al prossimo
+    accesso ripetono solo l'allineamento, come dopo una nuova versione del dataset.
+    """
+    for cache in _cache_registrate:
+        cache.clear()
+    for stato in (_monitor_spc, _previsioni, _rischio_guasti_stato):
+        stato["versione"] = None
 
 # Inizializzazione dell'applicazione interattiva con supporto mobile
 app = Dash(
@@ -48,6 +300,148 @@ app = Dash(
 app.title = "E-Lithium S.p.A"
 app.config.suppress_callback_exceptions = True 
 
+# Server WSGI esposto per gunicorn (es. gunicorn --chdir dashboard e_lithium_dashboard:server)
+server = app.server
+
+
+# === PAYLOAD DELLE RISPOSTE ===
+# Serializzazione JSON veloce (orjson gestisce nativamente gli array NumPy),
+# precisione configurabile delle tracce e compressione brotli/gzip delle risposte
+PRECISIONE_FIGURE = int(os.environ.get("E_LITHIUM_PRECISIONE_FIGURE", "6"))  # cifre significative, 0 = piena
+LOG_PAYLOAD = os.environ.get("E_LITHIUM_LOG_PAYLOAD", "0") == "1"
+
+try:
+    import orjson  # noqa: F401
+    pio.json.config.default_engine = "orjson"
+except ImportError:
+    print("[Dashboard] orjson non installato: serializzazione JSON standard")
+
+if os.environ.get("E_LITHIUM_COMPRESSIONE", "1") == "1":
+    try:
+        from flask_compress import Compress
+        try:
+            import brotli  # noqa: F401
+            app.server.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+        except ImportError:
+            app.server.config["COMPRESS_ALGORITHM"] = ["gzip"]
+        app.server.config["COMPRESS_MIMETYPES"] = ["application/json", "text/html", "text/css",
+                                                   "application/javascript", "text/plain"]
+        Compress(app.server)
+    except ImportError:
+        print("[Dashboard] flask-compress non installato: risposte non compresse")
+
+
+def arrotonda_cifre_significative(valori, cifre):
+    """Arrotonda un array numerico al numero di cifre significative indicato"""
+    valori = np.asarray(valori, dtype=float)
+    validi = np.isfinite(valori) & (valori != 0)
+    esponenti = np.zeros_like(valori)
+    esponenti[validi] = np.floor(np.log10(np.abs(valori[validi])))
+    scala = 10.0 ** (cifre - 1 - esponenti)
+    return np.where(validi, np.round(valori * scala) / scala, valori)
+
+
+# Tracce che il browser aggrega dai campioni grezzi: arrotondarli cambierebbe classi e conteggi
+TRACCE_CAMPIONI = frozenset({"histogram", "histogram2d", "histogram2dcontour", "box", "violin"})
+
+
+def ottimizza_figura(fig, cifre=None):
+    """Riduce la precisione delle coordinate (x, y, z) delle tracce prima dell'invio al browser.
+
+    customdata e testi restano a precisione piena: i valori mostrati nei tooltip
+    devono coincidere con quelli delle tabelle e delle esportazioni. Le tracce di
+    TRACCE_CAMPIONI non vengono toccate.
+    """
+    cifre = PRECISIONE_FIGURE if cifre is None else cifre
+    if cifre <= 0:
+        return fig
+    for trace in fig.data:
+        if trace.type in TRACCE_CAMPIONI:
+            continue
+        for attributo in ("x", "y", "z"):
+            valori = trace[attributo] if attributo in trace else None
+            if valori is None:
+                continue
+            array = np.asarray(valori)
+            if array.dtype.kind == "f" and array.size > 0:
+                trace[attributo] = arrotonda_cifre_significative(array, cifre)
+    return fig
+
+
+# Byte inviati per callback (JSON generato e risposta effettivamente trasmessa)
+_statistiche_payload = {}
+_statistiche_payload_lock = threading.Lock()
+
+
+@app.server.after_request
+def misura_payload_json(response):
+    """Misura la dimensione del JSON prodotto dalle callback (prima della compressione)"""
+    if flask.request.path.endswith("/_dash-update-component"):
+        corpo = flask.request.get_json(silent=True) or {}
+        flask.g.payload_output = corpo.get("output", "?")
+        flask.g.payload_json = response.calculate_content_length() or 0
+    return response
+
+
+def registra_payload_inviato(sender, response, **extra):
+    """Registra i byte trasmessi dopo l'eventuale compressione"""
+    output = flask.g.get("payload_output")
+    if output is None:
+        return
+    byte_json = flask.g.get("payload_json", 0)
+    byte_inviati = response.calculate_content_length() or 0
+    with _statistiche_payload_lock:
+        voce = _statistiche_payload.setdefault(output, {"richieste": 0, "byte_json": 0, "byte_inviati": 0})
+        voce["richieste"] += 1
+        voce["byte_json"] += byte_json
+        voce["byte_inviati"] += byte_inviati
+    callback_info = app.callback_map.get(output, {}).get("callback")
+    registra_payload(getattr(callback_info, "__name__", output), byte_json, byte_inviati)
+    if LOG_PAYLOAD:
+        print(f"[Payload] {output}: JSON {byte_json / 1024:.1f} kB, "
+              f"inviati {byte_inviati / 1024:.1f} kB ({response.headers.get('Content-Encoding', 'identity')})")
+
+
+flask.request_finished.connect(registra_payload_inviato, app.server)
+
+
+def get_statistiche_payload():
+    """Copia delle statistiche di payload cumulative per callback"""
+    with _statistiche_payload_lock:
+        return {output: dict(voce) for output, voce in _statistiche_payload.items()}
+
+
+@app.server.route("/_e-lithium/payload")
+def payload_endpoint():
+    """Report JSON dei byte inviati per callback (medie per richiesta incluse)"""
+    report = {}
+    for output, voce in get_statistiche_payload().items():
+        n = max(voce["richieste"], 1)
+        report[output] = dict(voce, media_json=voce["byte_json"] / n, media_inviati=voce["byte_inviati"] / n)
+    return flask.jsonify(report)
+
+
+# === METRICHE DELLE CALLBACK ===
+# Tempi (totale, CPU, fasi), righe elaborate e payload per callback su /metrics
+strumenta = strumenta_callback(interruzioni=(PreventUpdate,))
+
+
+@app.server.route("/metrics")
+def metrics_endpoint():
+    """Endpoint Prometheus (formato testuale) con le metriche del processo"""
+    return flask.Response(registro.esporta_prometheus(),
+                          mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.server.route("/_e-lithium/avvio")
+def avvio_endpoint():
+    """Report JSON dei tempi di avvio del processo"""
+    return flask.jsonify(get_report_avvio())
+
+
+segna_fase_avvio("app")
+
+
 # Mappa dei mesi in italiano per riferimenti dinamici
 ITALIAN_MONTHS = {
     1: "Gennaio",
@@ -151,7 +545,21 @@ def calcola_kpi(df):
     }
 
 
-def create_kpi_card(title, value, trend, color, trend_value):
+def testo_incertezza(intervalli, kpi, formato):
+    """Intervallo di confidenza bootstrap della media e del trend per la card KPI"""
+    if not intervalli:
+        return None
+    inferiore, superiore = intervalli[f"avg_{kpi}"]
+    trend_inferiore, trend_superiore = intervalli[f"trend_{kpi}"]
+    significativo = trend_inferiore > 0 or trend_superiore < 0
+    return [
+        f"IC {intervalli['livello']:.0%}: {formato.format(inferiore)} – {formato.format(superiore)}",
+        html.Br(),
+        f"Trend {trend_inferiore:+.1f}% / {trend_superiore:+.1f}%" + ("" if significativo else " (non significativo)")
+    ]
+
+
+def create_kpi_card(title, value, trend, color, trend_value, incertezza=None):
     """Creazione delle card KPI con indicatori visivi per trend e performance - Responsive Mobile"""
     trend_color = "success" if trend_value >= 0 else "danger"
     trend_icon = "↑" if trend_value >= 0 else "↓"
@@ -196,7 +604,13 @@ def create_kpi_card(title, value, trend, color, trend_value):
                     "textAlign": "center",
                     "fontSize": "clamp(0.65rem, 2vw, 0.8rem)",
                     "marginTop": "0.15rem"
-                })
+                }),
+                html.Small(incertezza, className="d-block", style={
+                    "color": "rgba(255, 255, 255, 0.8)",
+                    "textAlign": "center",
+                    "fontSize": "clamp(0.6rem, 1.8vw, 0.75rem)",
+                    "marginTop": "0.35rem"
+                }) if incertezza else None
             ], style={"width": "100%", "padding": "0.5rem"})
         ], style={"padding": "0.75rem"})
     ], color=color, inverse=True, className="h-100 mb-3")
@@ -304,10 +718,23 @@ def genera_insights_automatici(df):
     return insights
 
 
-def genera_report_narrativo(df):
+def scomposizione_report(df, giorni=30):
+    """Scomposizione della variazione di profitto tra gli ultimi giorni del report e i precedenti"""
+    giorni = min(len(df), giorni)
+    if giorni == 0 or len(df) < giorni * 2:
+        return None
+    somme = SommeCumulate(df)
+    n = len(somme)
+    scomposizione = confronta_righe(somme, ([n - 2 * giorni], [n - giorni]), ([n - giorni], [n]))
+    return {nome: float(valori[0]) for nome, valori in scomposizione.items()}
+
+
+def genera_report_narrativo(df, scomposizione=None):
     """Genera un report narrativo che racconta la storia dei dati"""
     if len(df) < 2:
         return "Dati insufficienti per generare un report completo."
+    if scomposizione is None:
+        scomposizione = scomposizione_report(df)
     
     # Adatta il periodo in base ai dati disponibili
     num_giorni = len(df)
@@ -369,6 +796,16 @@ def genera_report_narrativo(df):
     else:
         report += "."
     
+    if scomposizione is not None:
+        effetti = [(nome, scomposizione[chiave]) for chiave, nome in EFFETTI_VARIANZA
+                   if chiave != "altro" or abs(scomposizione[chiave]) >= 1]
+        principale = max(effetti, key=lambda effetto: abs(effetto[1]))
+        report += f"""
+    
+    La variazione di profitto di **€{scomposizione['variazione']:+,.0f}** si scompone in: """
+        report += ", ".join(f"{nome.lower()} **€{valore:+,.0f}**" for nome, valore in effetti)
+        report += f""". L'effetto principale è quello {"dei" if principale[0] == "Costi unitari" else "del"} **{principale[0].lower()}**."""
+    
     report += f"""
     
     ⚙️ **Efficienza Operativa**
@@ -390,7 +827,7 @@ def get_status_indicator(value, thresholds):
         return ("🔴", "danger", "Critico")
 
 
-def create_kpi_card_with_semaphore(title, value, trend, color, trend_value, status_indicator):
+def create_kpi_card_with_semaphore(title, value, trend, color, trend_value, status_indicator, incertezza=None):
     """Card KPI con indicatore a semaforo e tooltip"""
     emoji, badge_color, status_text = status_indicator
     
@@ -454,7 +891,13 @@ def create_kpi_card_with_semaphore(title, value, trend, color, trend_value, stat
                     "textAlign": "center",
                     "fontSize": "clamp(0.65rem, 2vw, 0.8rem)",
                     "marginTop": "0.15rem"
-                })
+                }),
+                html.Small(incertezza, className="d-block", style={
+                    "color": "rgba(255, 255, 255, 0.8)",
+                    "textAlign": "center",
+                    "fontSize": "clamp(0.6rem, 1.8vw, 0.75rem)",
+                    "marginTop": "0.35rem"
+                }) if incertezza else None
             ], style={"width": "100%", "padding": "0.5rem"})
         ], style={"padding": "0.75rem"})
     ], color=color, inverse=True, className="h-100 mb-3")
@@ -486,6 +929,18 @@ app.layout = dbc.Container([
                 style={'backgroundColor': '#2B3E50', 'color': '#fff', 'border': '1px solid #4E5D6C'},
                 selected_style={'backgroundColor': '#4E5D6C', 'color': '#fff', 'border': '1px solid #4E5D6C'}
             ),
+            dcc.Tab(
+                label="🌡️ Monitoraggio Ambientale",
+                value="tab-ambiente",
+                style={'backgroundColor': '#2B3E50', 'color': '#fff', 'border': '1px solid #4E5D6C'},
+                selected_style={'backgroundColor': '#4E5D6C', 'color': '#fff', 'border': '1px solid #4E5D6C'}
+            ),
+            dcc.Tab(
+                label="📉 Controllo Statistico",
+                value="tab-spc",
+                style={'backgroundColor': '#2B3E50', 'color': '#fff', 'border': '1px solid #4E5D6C'},
+                selected_style={'backgroundColor': '#4E5D6C', 'color': '#fff', 'border': '1px solid #4E5D6C'}
+            ),
             dcc.Tab(
                 label="🏭 Scheda Aziendale",
                 value="tab-about",
@@ -518,6 +973,10 @@ app.layout = dbc.Container([
     dcc.Store(id="profitto-slider", data=[0, 100000]),
     dcc.Store(id="quick-filter-selection", data={"filter": "all"}),
     dcc.Store(id="welcome-shown", storage_type='session', data=False),
+    # Larghezza della finestra in pixel: limita i punti inviati per le serie lunghe
+    dcc.Store(id="viewport-width"),
+    # Scenari What-If salvati (nome e leve) nel browser; i risultati restano in cache sul server
+    dcc.Store(id="scenari-salvati", storage_type="local", data=[]),
     
     # Modal di Benvenuto
     dbc.Modal([
@@ -659,6 +1118,16 @@ app.layout = dbc.Container([
     """)
 ], fluid=True, className="d-flex flex-column min-vh-100", style={"paddingBottom": "0"})
 
+segna_fase_avvio("layout")
+
+
+# Larghezza della finestra letta nel browser a ogni cambio di tab (nessuna richiesta al server)
+app.clientside_callback(
+    "function(tab) { return window.innerWidth; }",
+    Output("viewport-width", "data"),
+    Input("tabs", "value")
+)
+
 
 # Gestione degli eventi e aggiornamento dinamico dei componenti
 @app.callback(
@@ -679,48 +1148,25 @@ def redirect_to_dashboard(n_clicks):
      Input("quick-filter-selection", "data")],
     prevent_initial_call=False
 )
+@strumenta
+@profila
 def render_tab_content(tab, filter_selection):
     """Renderizza il contenuto del tab selezionato e gestisce i filtri del summary"""
-    df_full = load_data()
-    
-    # Se siamo nel tab summary, applico il filtro selezionato
+    # Tutti i tab sono serviti dalla cache: il CSV viene letto solo al cambio di versione
     if tab == "tab-summary":
-        df_filtered = df_full.copy()
-        active_filter = "all"
-        
-        if filter_selection and "filter" in filter_selection:
-            filter_type = filter_selection["filter"]
-            active_filter = filter_type
-            
-            if filter_type == "7d":
-                max_date = df_full["data"].max()
-                start_date = max_date - timedelta(days=6)
-                df_filtered = df_full[df_full["data"] >= start_date]
-            elif filter_type == "30d":
-                max_date = df_full["data"].max()
-                start_date = max_date - timedelta(days=29)
-                df_filtered = df_full[df_full["data"] >= start_date]
-            elif filter_type == "best":
-                # Filtra per migliori performance (profitto > media + 0.5*std)
-                media_profitto = df_full["profitto_eur"].mean()
-                std_profitto = df_full["profitto_eur"].std()
-                df_filtered = df_full[df_full["profitto_eur"] > (media_profitto + 0.5 * std_profitto)]
-            elif filter_type == "alerts":
-                # Filtra per criticità (profitto < media - 0.5*std o purezza < 97)
-                media_profitto = df_full["profitto_eur"].mean()
-                std_profitto = df_full["profitto_eur"].std()
-                df_filtered = df_full[(df_full["profitto_eur"] < (media_profitto - 0.5 * std_profitto)) | 
-                                      (df_full["purezza_%"] < 97)]
-        
-        return create_executive_summary_tab(df_filtered, active_filter)
+        return get_summary_tab(get_quick_filter_type(filter_selection))
     elif tab == "tab-dashboard":
-        return create_dashboard_tab(df_full, df_full)
+        return get_dashboard_tab()
+    elif tab == "tab-ambiente":
+        return get_ambiente_tab()
+    elif tab == "tab-spc":
+        return get_spc_tab()
     elif tab == "tab-about":
-        return create_about_tab()
+        return get_about_tab(get_current_month_year_it())
     elif tab == "tab-whatif":
-        return create_whatif_tab(df_full)
+        return get_whatif_tab()
     elif tab == "tab-source":
-        return create_source_tab()
+        return get_source_tab()
     
     return html.Div("Tab non trovato")
 
@@ -747,12 +1193,385 @@ def update_filter_selection(n_clicks_list):
     return {"filter": "all"}
 
 
+# === PIRAMIDE DELLE AGGREGAZIONI ===
+# Aggregati giornalieri, settimanali, mensili e trimestrali per versione del dataset:
+# i grafici temporali scelgono il livello in base all'intervallo visibile
+@cache_per_versione(maxsize=1)
+def get_piramide():
+    """Piramide delle aggregazioni del dataset corrente (sola lettura)"""
+    return PiramideAggregazioni(load_data(), derivate={
+        # Ricavi ricalcolati dal what-if: prodotto riga per riga, non ricavabile dalle somme
+        "litio_x_prezzo": lambda df: df["litio_estratto_kg"] * df["prezzo_litio_eur_kg"],
+    })
+
+
+# === SENSORI AMBIENTALI ===
+# Archivio colonnare float32 delle serie dei sensori, costruito una volta per versione
+PERIODI_AMBIENTE = {"7d": ("7 giorni", 7), "30d": ("30 giorni", 30), "90d": ("90 giorni", 90), "all": ("Tutto", None)}
+
+
+@cache_per_versione(maxsize=1)
+def get_archivio_sensori():
+    """Serie dei sensori ambientali del dataset corrente"""
+    return ArchivioSensori.da_dataframe(load_data())
+
+
+# === CONTROLLO STATISTICO DI PROCESSO ===
+# Le carte di controllo sono calcolate una volta per versione del dataset; se la nuova
+# versione accoda righe a quella precedente vengono elaborate solo le righe nuove
+PERIODI_SPC = {"90d": ("90 giorni", 90), "365d": ("1 anno", 365), "all": ("Tutto", None)}
+_monitor_spc = {"versione": None, "monitor": None}
+_monitor_spc_lock = threading.Lock()
+
+
+def get_monitor_spc():
+    """Carte SPC (X̄/R, EWMA, CUSUM, c) aggiornate alla versione corrente del dataset"""
+    versione = get_dataset_version()
+    with _monitor_spc_lock:
+        if _monitor_spc["versione"] != versione:
+            df = load_data()
+            monitor = _monitor_spc["monitor"]
+            if monitor is not None and monitor.estende(df):
+                monitor.aggiungi_righe(df.iloc[len(monitor):])
+            else:
+                monitor = MonitorSPC.da_dataframe(df)
+            _monitor_spc.update(versione=versione, monitor=monitor)
+        return _monitor_spc["monitor"]
+
+
+# === PREVISIONI ===
+# Holt smorzato sulle serie giornaliere della piramide: lo stato del modello sopravvive
+# ai cambi di versione, così i giorni nuovi proseguono la ricorsione senza ripartire
+_previsore = PrevisoreHolt()
+_previsioni = {"versione": None, "risultato": None}
+_previsioni_lock = threading.Lock()
+
+
+def get_previsioni():
+    """Previsioni fino all'orizzonte più lungo: (date, previsione, inferiore, superiore)"""
+    versione = get_dataset_version()
+    with _previsioni_lock:
+        if _previsioni["versione"] != versione:
+            primo_giorno, valori = serie_da_livello_giornaliero(get_piramide().livelli.get("D", pd.DataFrame()))
+            _previsore.aggiorna(primo_giorno, valori)
+            risultato = _previsore.prevedi(max(ORIZZONTI)) if len(_previsore) >= 2 else None
+            _previsioni.update(versione=versione, risultato=risultato)
+        return _previsioni["risultato"]
+
+
+# === MANUTENZIONE PREDITTIVA ===
+# Regressione di Poisson dei guasti: a ogni nuova versione del dataset le righe accodate
+# vengono solo valutate; il modello viene stimato di nuovo quando lo storico cresce del 5%
+_rischio_guasti = RischioGuasti()
+_rischio_guasti_stato = {"versione": None}
+_rischio_guasti_lock = threading.Lock()
+
+
+def get_rischio_guasti():
+    """Modello dei guasti e tassi attesi aggiornati alla versione corrente del dataset"""
+    versione = get_dataset_version()
+    with _rischio_guasti_lock:
+        if _rischio_guasti_stato["versione"] != versione:
+            _rischio_guasti.aggiorna(load_data())
+            _rischio_guasti_stato["versione"] = versione
+        return _rischio_guasti
+
+
+@cache_per_versione(maxsize=1)
+def get_guasti_giornalieri():
+    """Guasti osservati e attesi dal modello per giorno di calendario"""
+    return get_rischio_guasti().giornaliero()
+
+
+# === FILTRI RAPIDI DEL RIEPILOGO ===
+# Descrizione del periodo mostrata nel grafico trend per ogni filtro rapido
+QUICK_FILTER_DESCRIZIONI = {
+    "all": "Ultimi 30 Giorni",
+    "7d": "Ultimi 7 Giorni",
+    "30d": "Ultimi 30 Giorni",
+    "best": "Migliori Performance",
+    "alerts": "Alert Criticità"
+}
+
+
+# Filtri sugli ultimi giorni: intervallo di date (gli altri selezionano righe per condizione)
+GIORNI_FILTRO_RAPIDO = {"7d": 6, "30d": 29}
+
+
+def get_quick_filter_type(filter_selection):
+    """Estrae il tipo di filtro rapido dallo Store (default: tutti i dati)"""
+    if filter_selection and filter_selection.get("filter") in QUICK_FILTER_DESCRIZIONI:
+        return filter_selection["filter"]
+    return "all"
+
+
+def calcola_maschera_filtro_rapido(df_full, filter_type):
+    """Maschera booleana del filtro rapido (None = nessun filtro)"""
+    if filter_type in GIORNI_FILTRO_RAPIDO:
+        start_date = df_full["data"].max() - timedelta(days=GIORNI_FILTRO_RAPIDO[filter_type])
+        return (df_full["data"] >= start_date).values
+
+    if filter_type in ("best", "alerts"):
+        # Soglie su media e deviazione standard del profitto, calcolate una sola volta
+        profitto = df_full["profitto_eur"]
+        media_profitto = profitto.mean()
+        std_profitto = profitto.std()
+        if filter_type == "best":
+            # Migliori performance: profitto > media + 0.5*std
+            return (profitto > (media_profitto + 0.5 * std_profitto)).values
+        # Criticità: profitto < media - 0.5*std o purezza < 97
+        return ((profitto < (media_profitto - 0.5 * std_profitto)) |
+                (df_full["purezza_%"] < 97)).values
+
+    return None
+
+
+@cache_per_versione(maxsize=len(QUICK_FILTER_DESCRIZIONI))
+def get_quick_filter_view(filter_type):
+    """Vista filtrata condivisa tra le callback del summary (sola lettura)"""
+    df_full = load_data()
+    maschera = calcola_maschera_filtro_rapido(df_full, filter_type)
+    return df_full if maschera is None else df_full[maschera]
+
+
+@cache_per_versione(maxsize=len(QUICK_FILTER_DESCRIZIONI))
+def get_intervalli_kpi(filter_type):
+    """Intervalli di confidenza bootstrap dei KPI nella vista del filtro rapido"""
+    return intervalli_kpi(get_quick_filter_view(filter_type))
+
+
+@cache_per_versione(maxsize=len(QUICK_FILTER_DESCRIZIONI))
+def get_statistiche_profitto(filter_type):
+    """Numero di righe, media e massimo del profitto nella vista del filtro rapido"""
+    profitto = get_quick_filter_view(filter_type)["profitto_eur"]
+    return {"righe": len(profitto), "media": profitto.mean(), "massimo": profitto.max()}
+
+
+def intervallo_filtro_rapido(filter_type):
+    """Intervallo di date del filtro rapido (None = tutto il dataset)"""
+    if filter_type not in GIORNI_FILTRO_RAPIDO:
+        return None
+    data_max = get_piramide().data_max
+    return (data_max - timedelta(days=GIORNI_FILTRO_RAPIDO[filter_type]), data_max)
+
+
+def seleziona_trend_profitti(filter_type, finestra, punti_max):
+    """Livello di dettaglio e righe del trend profitti per la finestra visibile.
+
+    I filtri per intervallo di date usano la piramide delle aggregazioni; quelli
+    per condizione (best, alerts) restano sulle righe filtrate, ridotte con LTTB.
+    """
+    finestra = finestra if isinstance(finestra, tuple) else None
+    if filter_type in ("best", "alerts"):
+        return GREZZI, filtra_finestra(get_quick_filter_view(filter_type), finestra)
+    intervallo = interseca_intervalli(intervallo_filtro_rapido(filter_type), finestra) or (None, None)
+    return get_piramide().seleziona(intervallo[0], intervallo[1], punti_max)
+
+
+# === FILTRI DEL TAB DASHBOARD ===
+# L'impronta normalizzata dei filtri è la chiave delle cache per combinazione di filtri
+def impronta_filtri_dashboard(start_date, end_date, purezza_range, profitto_range):
+    """Chiave hashable dei filtri del tab Dashboard"""
+    def intervallo(valori):
+        if isinstance(valori, (list, tuple)) and len(valori) == 2:
+            return (float(valori[0]), float(valori[1]))
+        return None
+    return (start_date or None, end_date or None, intervallo(purezza_range), intervallo(profitto_range))
+
+
+@cache_per_versione(maxsize=4)
+def get_vista_dashboard(impronta):
+    """Righe che soddisfano i filtri del tab Dashboard (sola lettura)"""
+    start_date, end_date, purezza_range, profitto_range = impronta
+    df = load_data()
+    if start_date:
+        df = df[df["data"] >= pd.to_datetime(start_date)]
+    if end_date:
+        df = df[df["data"] <= pd.to_datetime(end_date)]
+    if purezza_range:
+        df = df[(df["purezza_%"] >= purezza_range[0]) & (df["purezza_%"] <= purezza_range[1])]
+    if profitto_range:
+        df = df[(df["profitto_eur"] >= profitto_range[0]) & (df["profitto_eur"] <= profitto_range[1])]
+    return df
+
+
+# Distribuzioni teoriche disegnate nel tab Dashboard: (colonna, distribuzione)
+DISTRIBUZIONI_DASHBOARD = (
+    ("litio_estratto_kg", "normale"),
+    ("purezza_%", "normale"),
+    ("margine_%", "normale"),
+    ("costi_eur", "normale"),
+    ("profitto_eur", "lognormale"),
+    ("prezzo_litio_eur_kg", "lognormale"),
+    ("guasti", "poisson"),
+)
+
+
+@cache_per_versione(maxsize=4)
+def get_adattamenti(impronta):
+    """Parametri e test di adattamento di tutte le distribuzioni per combinazione di filtri"""
+    return valuta_adattamenti(get_vista_dashboard(impronta), DISTRIBUZIONI_DASHBOARD)
+
+
+@cache_per_versione(maxsize=4)
+def get_kde_distribuzioni(impronta):
+    """KDE su griglia delle colonne con fit Normale o Log-Normale, per combinazione di filtri"""
+    df = get_vista_dashboard(impronta)
+    return {
+        colonna: (kde_logaritmica if distribuzione == "lognormale" else kde_binned)(df[colonna].to_numpy())
+        for colonna, distribuzione in DISTRIBUZIONI_DASHBOARD
+        if distribuzione != "poisson" and colonna in df
+    }
+
+
+@cache_per_versione(maxsize=16)
+def get_matrice_correlazione(impronta, metodo):
+    """Matrice di correlazione (Pearson o Spearman) di tutte le variabili numeriche filtrate"""
+    return matrice_correlazione(get_vista_dashboard(impronta), metodo)
+
+
+@cache_per_versione(maxsize=4)
+def get_serie_giornaliere(impronta):
+    """Medie giornaliere delle variabili filtrate su calendario continuo"""
+    df = get_vista_dashboard(impronta)
+    colonne = colonne_numeriche(df)
+    primo_giorno, calendario = serie_giornaliere(df, colonne)
+    return primo_giorno, calendario, colonne
+
+
+@cache_per_versione(maxsize=32)
+def get_correlazione_ritardata(impronta, variabile_x, variabile_y, ritardo_max):
+    """Correlazione ritardata tra due variabili sulle medie giornaliere filtrate"""
+    _, calendario, colonne = get_serie_giornaliere(impronta)
+    return correlazione_ritardata(calendario[:, colonne.index(variabile_x)],
+                                  calendario[:, colonne.index(variabile_y)], ritardo_max)
+
+
+# === SIMULAZIONE WHAT-IF ===
+NUM_MARKER_WHATIF = 13  # marker dello slider del periodo (inizio + 12 mesi)
+
+
+@cache_per_versione(maxsize=1)
+def get_somme_cumulate():
+    """Somme cumulate per i totali di periodo degli scenari What-If"""
+    return SommeCumulate(load_data())
+
+
+@cache_per_versione(maxsize=1)
+def get_indice_periodi():
+    """Marker dello slider del periodo What-If con date e offset di riga, uno per versione"""
+    return IndicePeriodi(get_somme_cumulate().date, NUM_MARKER_WHATIF)
+
+
+def intervallo_whatif(date_range_indices):
+    """Date (inizio, fine) corrispondenti alle posizioni dello slider del periodo What-If"""
+    return get_indice_periodi().intervallo(date_range_indices)
+
+
+@cache_per_versione(maxsize=64)
+def get_totali_periodo(intervallo):
+    """Somme del periodo (None = tutto lo storico) come scalari"""
+    inizio, fine = intervallo or (pd.NaT, pd.NaT)
+    totali = get_somme_cumulate().totali([inizio], [fine])
+    return {nome: valori[0] for nome, valori in totali.items()}
+
+
+@cache_per_versione(maxsize=256)
+def get_sensibilita(intervallo, scenario):
+    """Tornado ed elasticità delle leve What-If per periodo e scenario corrente"""
+    return sensibilita(get_totali_periodo(intervallo), scenario)
+
+
+METRICHE_SCENARIO = ("profitto", "margine", "delta_profitto")
+
+
+def get_giornaliero():
+    """Livello giornaliero della piramide (vuoto se il dataset non ha righe)"""
+    return get_piramide().livelli.get("D", pd.DataFrame(columns=[
+        "data", "litio_x_prezzo_sum", "litio_estratto_kg_sum", "costi_eur_sum"]))
+
+
+def scenario_salvato(nome, leve):
+    """Scenario da salvare nello store del browser, con i risultati giornalieri e la versione dei dati da cui derivano"""
+    # La versione è letta prima del calcolo: se il CSV cambia nel frattempo lo scenario risulta solo più vecchio
+    versione = str(get_dataset_version())
+    risultati = risultati_giornalieri(get_giornaliero(), leve)
+    return {"nome": nome, "leve": [float(v) for v in leve], "versione": versione,
+            "risultati": {metrica: risultati[metrica].tolist() for metrica in METRICHE_SCENARIO}}
+
+
+def scenario_aggiornato(scenario, versione, giorni):
+    """Vero se i risultati salvati derivano dalla versione corrente dei dati (gli scenari del vecchio formato non ne hanno)"""
+    risultati = scenario.get("risultati") or {}
+    return scenario.get("versione") == versione and \
+        all(len(risultati.get(metrica, ())) == giorni for metrica in METRICHE_SCENARIO)
+
+
+@cache_per_versione(maxsize=256)
+def get_soluzioni_obiettivo(intervallo, scenario, obiettivo, valore):
+    """Valori delle leve che raggiungono l'obiettivo nel periodo (una soluzione per leva)"""
+    if obiettivo != "margine_medio":
+        return risolvi_obiettivo(get_totali_periodo(intervallo), scenario, obiettivo, valore)
+    # Media dei margini giornalieri: somme per giorno dal livello giornaliero della piramide
+    giorni = get_piramide().righe("D", *(intervallo or (None, None)))
+    return risolvi_margine_medio(giorni["litio_x_prezzo_sum"].to_numpy(), giorni["litio_estratto_kg_sum"].to_numpy(),
+                                 giorni["costi_eur_sum"].to_numpy(), scenario, valore)
+
+
+# === CACHE DEI TAB ===
+# Gli alberi di componenti non dipendono dalla sessione: vengono costruiti una volta
+# per processo (tab statici) o per versione del dataset e riutilizzati da tutte le sessioni
+@cache_per_versione(maxsize=len(QUICK_FILTER_DESCRIZIONI))
+def get_summary_tab(filter_type):
+    """Tab Executive Summary per il filtro rapido indicato"""
+    return create_executive_summary_tab(get_quick_filter_view(filter_type), filter_type)
+
+
+@cache_per_versione(maxsize=1)
+def get_dashboard_tab():
+    """Tab Dashboard Operativa (filtri inizializzati sull'intero dataset)"""
+    df_full = load_data()
+    return create_dashboard_tab(df_full, df_full, get_intervalli_kpi("all"))
+
+
+@cache_per_versione(maxsize=1)
+def get_ambiente_tab():
+    """Tab Monitoraggio Ambientale (un grafico per sensore presente nel dataset)"""
+    return create_ambiente_tab(get_archivio_sensori().colonne)
+
+
+@functools.lru_cache(maxsize=1)
+def get_spc_tab():
+    """Tab Controllo Statistico, statico (i grafici arrivano dalla callback)"""
+    return create_spc_tab()
+
+
+@cache_per_versione(maxsize=1)
+def get_whatif_tab():
+    """Tab Simulazione What-If (marker del periodo calcolati sul dataset)"""
+    return create_whatif_tab(get_indice_periodi())
+
+
+@cache_per_versione(maxsize=2)
+def get_about_tab(mese_anno):
+    """Tab Info Aziendali, ricostruito solo al cambio di mese o di dataset"""
+    return create_about_tab(mese_anno)
+
+
+@functools.lru_cache(maxsize=1)
+def get_source_tab():
+    """Tab Codice Sorgente, completamente statico"""
+    return create_source_tab()
+
+
 def create_executive_summary_tab(df, active_filter="all"):
     """Tab Executive Summary - Vista semplificata per management non tecnico"""
     if len(df) < 2:
         return html.Div("Dati insufficienti")
     
     kpi = calcola_kpi(df)
+    intervalli = get_intervalli_kpi(active_filter)
+    scomposizione = scomposizione_report(df)
     
     # Calcola indicatori a semaforo
     prod_indicator = get_status_indicator(kpi['avg_produzione'], {
@@ -819,7 +1638,8 @@ def create_executive_summary_tab(df, active_filter="all"):
                 f"{kpi['trend_produzione']:+.1f}%",
                 "primary",
                 kpi['trend_produzione'],
-                prod_indicator
+                prod_indicator,
+                testo_incertezza(intervalli, "produzione", "{:,.0f} kg")
             ), xs=12, sm=6, md=3, className="mb-3"),
             dbc.Col(create_kpi_card_with_semaphore(
                 "Purezza Media",
@@ -827,7 +1647,8 @@ def create_executive_summary_tab(df, active_filter="all"):
                 f"{kpi['trend_purezza']:+.1f}%",
                 "success",
                 kpi['trend_purezza'],
-                purezza_indicator
+                purezza_indicator,
+                testo_incertezza(intervalli, "purezza", "{:.2f}%")
             ), xs=12, sm=6, md=3, className="mb-3"),
             dbc.Col(create_kpi_card_with_semaphore(
                 "Profitto Medio",
@@ -835,7 +1656,8 @@ def create_executive_summary_tab(df, active_filter="all"):
                 f"{kpi['trend_profitto']:+.1f}%",
                 "info",
                 kpi['trend_profitto'],
-                profitto_indicator
+                profitto_indicator,
+                testo_incertezza(intervalli, "profitto", "€ {:,.0f}")
             ), xs=12, sm=6, md=3, className="mb-3"),
             dbc.Col(create_kpi_card_with_semaphore(
                 "Margine Medio",
@@ -843,7 +1665,8 @@ def create_executive_summary_tab(df, active_filter="all"):
                 f"{kpi['trend_margine']:+.1f}%",
                 "warning",
                 kpi['trend_margine'],
-                margine_indicator
+                margine_indicator,
+                testo_incertezza(intervalli, "margine", "{:.2f}%")
             ), xs=12, sm=6, md=3, className="mb-3"),
         ], className="mb-4"),
         
@@ -862,17 +1685,80 @@ def create_executive_summary_tab(df, active_filter="all"):
             dbc.Col(dcc.Graph(id="summary-profit-trend", config={'responsive': True}), xs=12, className="mb-3"),
         ]),
         
+        # Previsioni delle serie principali
+        create_previsioni_card(),
+        
         # Report narrativo
         dbc.Card([
             dbc.CardHeader(html.H4("📄 Report Esecutivo", className="mb-0")),
             dbc.CardBody([
-                dcc.Markdown(genera_report_narrativo(df), className="mb-0")
+                dcc.Markdown(genera_report_narrativo(df, scomposizione), className="mb-0")
             ])
         ], className="mb-4"),
+        
+        # Scomposizione della variazione di profitto
+        create_varianza_card(scomposizione),
     ])
 
 
-def create_dashboard_tab(df, df_full):
+def create_varianza_card(scomposizione, giorni=30):
+    """Grafico a cascata della variazione di profitto tra i due periodi del report"""
+    if scomposizione is None:
+        return html.Div()
+    return dbc.Card([
+        dbc.CardHeader(html.H4("🧮 Scomposizione del Profitto", className="mb-0")),
+        dbc.CardBody([
+            html.P(
+                f"Da cosa dipende la differenza di profitto tra gli ultimi {giorni} giorni e i {giorni} precedenti: "
+                "quantità venduta (al margine unitario precedente), prezzo medio di vendita e costo per kg.",
+                className="text-muted", style={"fontSize": "0.9rem"}
+            ),
+            dcc.Graph(figure=create_varianza_figure(scomposizione), config={'responsive': True})
+        ])
+    ], className="mb-4")
+
+
+def create_previsioni_card():
+    """Tabella delle previsioni ai vari orizzonti con intervallo all'80%"""
+    previsioni = get_previsioni()
+    if previsioni is None:
+        return html.Div()
+    date, previsione, inferiore, superiore = previsioni
+    
+    def formatta(valore, unita):
+        return f"{valore:,.2f} {unita}" if unita == "€/kg" else f"{valore:,.0f} {unita}"
+    
+    righe = []
+    for s, (_, _, nome, unita) in enumerate(SERIE_PREVISTE):
+        celle = [html.Td(nome, className="fw-bold")]
+        for orizzonte in ORIZZONTI:
+            h = orizzonte - 1
+            celle.append(html.Td([
+                html.Div(formatta(previsione[h, s], unita)),
+                html.Small(f"{formatta(inferiore[h, s], '')} – {formatta(superiore[h, s], '')}",
+                           className="text-muted")
+            ]))
+        righe.append(html.Tr(celle))
+    
+    return dbc.Card([
+        dbc.CardHeader(html.H4("🔮 Previsioni", className="mb-0")),
+        dbc.CardBody([
+            html.P(
+                "Valori giornalieri attesi secondo il trend recente (metodo di Holt), con l'intervallo "
+                "in cui il valore cade 8 volte su 10. Le previsioni usano sempre lo storico completo.",
+                className="text-muted", style={"fontSize": "0.9rem"}
+            ),
+            dbc.Table([
+                html.Thead(html.Tr([html.Th("Serie")] + [
+                    html.Th(f"Tra {orizzonte} giorni ({date[orizzonte - 1]:%d/%m})") for orizzonte in ORIZZONTI
+                ])),
+                html.Tbody(righe)
+            ], bordered=False, hover=True, responsive=True, className="mb-0")
+        ])
+    ], className="mb-4")
+
+
+def create_dashboard_tab(df, df_full, intervalli=None):
     """Tab Dashboard principale con filtri e KPI dinamici"""
     kpi = calcola_kpi(df)
     
@@ -893,6 +1779,10 @@ def create_dashboard_tab(df, df_full):
     min_date_str = min_date.strftime("%Y-%m-%d")
     max_date_str = max_date.strftime("%Y-%m-%d")
     
+    # Variabili disponibili per la correlazione ritardata
+    colonne = colonne_numeriche(df_full)
+    opzioni_variabili = [{"label": etichetta(c), "value": c} for c in colonne]
+    
     return html.Div([
         # Sezione di controllo per filtrare i dati per periodo e parametri - Responsive
         dbc.Card([
@@ -930,8 +1820,9 @@ def create_dashboard_tab(df, df_full):
                             max=df_full["purezza_%"].max(),
                             step=0.001,
                             value=purezza_range,
-                            marks={i: f"{i:.2f}" for i in np.linspace(df_full["purezza_%"].min(), df_full["purezza_%"].max(), 5)},
-                            tooltip={"placement": "bottom", "always_visible": False}
+                            marks={float(i): f"{i:.2f}" for i in np.linspace(df_full["purezza_%"].min(), df_full["purezza_%"].max(), 5)},
+                            tooltip={"placement": "bottom", "always_visible": False},
+                            updatemode="mouseup"
                         )
                     ], xs=12, md=4, className="mb-3"),
                     dbc.Col([
@@ -948,8 +1839,9 @@ def create_dashboard_tab(df, df_full):
                             min=df_full["profitto_eur"].min(),
                             max=df_full["profitto_eur"].max(),
                             value=profitto_range,
-                            marks={i: f"€{i/1000:.1f}k" for i in np.linspace(df_full["profitto_eur"].min(), df_full["profitto_eur"].max(), 5)},
-                            tooltip={"placement": "bottom", "always_visible": False}
+                            marks={float(i): f"€{i/1000:.1f}k" for i in np.linspace(df_full["profitto_eur"].min(), df_full["profitto_eur"].max(), 5)},
+                            tooltip={"placement": "bottom", "always_visible": False},
+                            updatemode="mouseup"
                         )
                     ], xs=12, md=4, className="mb-3"),
                 ])
@@ -963,28 +1855,32 @@ def create_dashboard_tab(df, df_full):
                 f"{kpi['avg_produzione']:,.0f} kg/giorno",
                 f"{kpi['trend_produzione']:+.1f}%",
                 "primary",
-                kpi['trend_produzione']
+                kpi['trend_produzione'],
+                testo_incertezza(intervalli, "produzione", "{:,.0f} kg")
             ), xs=12, sm=6, md=3, className="mb-3"),
             dbc.Col(create_kpi_card(
                 "✨ Purezza Media",
                 f"{kpi['avg_purezza']:.2f}%",
                 f"{kpi['trend_purezza']:+.1f}%",
                 "success",
-                kpi['trend_purezza']
+                kpi['trend_purezza'],
+                testo_incertezza(intervalli, "purezza", "{:.2f}%")
             ), xs=12, sm=6, md=3, className="mb-3"),
             dbc.Col(create_kpi_card(
                 "💰 Profitto Medio",
                 f"€ {kpi['avg_profitto']:,.0f}",
                 f"{kpi['trend_profitto']:+.1f}%",
                 "info",
-                kpi['trend_profitto']
+                kpi['trend_profitto'],
+                testo_incertezza(intervalli, "profitto", "€ {:,.0f}")
             ), xs=12, sm=6, md=3, className="mb-3"),
             dbc.Col(create_kpi_card(
                 "📊 Margine Medio",
                 f"{kpi['avg_margine']:.2f}%",
                 f"{kpi['trend_margine']:+.1f}%",
                 "warning",
-                kpi['trend_margine']
+                kpi['trend_margine'],
+                testo_incertezza(intervalli, "margine", "{:.2f}%")
             ), xs=12, sm=6, md=3, className="mb-3"),
         ], className="mb-4"),
 
@@ -994,6 +1890,14 @@ def create_dashboard_tab(df, df_full):
             "paddingBottom": "10px",
             "fontSize": "clamp(1.2rem, 4vw, 1.75rem)"
         }),
+        dbc.Checklist(
+            id="kde-overlay",
+            options=[{"label": "Mostra la densità empirica (KDE) sulle distribuzioni Gaussiane e Log-Normali",
+                      "value": "kde"}],
+            value=[],
+            switch=True,
+            className="mb-3 d-flex justify-content-center"
+        ),
         
         dbc.Row([
             dbc.Col(dcc.Graph(id="dist-produzione-gauss", config={'responsive': True}, style={'height': '500px'}), xs=12, lg=6, className="mb-4"),
@@ -1028,19 +1932,76 @@ def create_dashboard_tab(df, df_full):
             dbc.Col(dcc.Graph(id="dist-guasti-poisson", config={'responsive': True}), xs=12, className="mb-3"),
         ], className="mb-4"),
 
+        # Manutenzione predittiva: modello dei guasti su tutto lo storico
+        html.H3("🔧 Rischio Guasti (Manutenzione Predittiva)", className="mt-5 mb-3 text-center", style={
+            "borderBottom": "3px solid #AB63FA", 
+            "paddingBottom": "10px",
+            "fontSize": "clamp(1.2rem, 4vw, 1.75rem)"
+        }),
+        html.P(
+            "Guasti attesi secondo un modello che li lega a condizioni ambientali e produzione "
+            "(regressione di Poisson su tutto lo storico, indipendente dai filtri).",
+            className="text-muted text-center", style={"fontSize": "0.9rem"}
+        ),
+        dbc.Row([
+            dbc.Col([
+                html.Label("Orizzonte di previsione (giorni):", className="fw-bold"),
+                dcc.Slider(id="guasti-orizzonte", min=7, max=90, step=1, value=30,
+                           marks={7: "7", 30: "30", 60: "60", 90: "90"},
+                           updatemode="mouseup")
+            ], xs=12, md=6, className="mb-3"),
+        ]),
+        dbc.Row([
+            dbc.Col(dcc.Graph(id="guasti-rischio", config={'responsive': True}), xs=12, lg=8, className="mb-3"),
+            dbc.Col(html.Div(id="guasti-riepilogo"), xs=12, lg=4, className="mb-3"),
+        ], className="mb-4"),
+
         # Mappa di calore della matrice di correlazione - Responsive
         html.H4("🔗 Matrice di Correlazione", className="mt-4 mb-3", style={
             "fontSize": "clamp(1.1rem, 3.5vw, 1.5rem)"
         }),
+        dbc.RadioItems(
+            id="correlazione-metodo",
+            options=[{"label": nome, "value": codice} for codice, nome in METODI_CORRELAZIONE.items()],
+            value="pearson",
+            inline=True,
+            className="mb-2"
+        ),
         dbc.Row([
             dbc.Col(dcc.Graph(id="heatmap-correlazioni", config={'responsive': True}), xs=12, className="mb-3"),
         ], className="mb-4"),
+
+        # Correlazione ritardata: una variabile anticipa l'altra di N giorni?
+        html.H4("⏱️ Correlazione Ritardata (Lead/Lag)", className="mt-4 mb-3", style={
+            "fontSize": "clamp(1.1rem, 3.5vw, 1.5rem)"
+        }),
+        dbc.Row([
+            dbc.Col([
+                html.Label("Variabile che anticipa:", className="fw-bold"),
+                dbc.Select(id="lag-variabile-x", options=opzioni_variabili,
+                           value="polveri_ug_m3" if "polveri_ug_m3" in colonne else colonne[0])
+            ], xs=12, md=4, className="mb-3"),
+            dbc.Col([
+                html.Label("Variabile ritardata:", className="fw-bold"),
+                dbc.Select(id="lag-variabile-y", options=opzioni_variabili,
+                           value="guasti" if "guasti" in colonne else colonne[-1])
+            ], xs=12, md=4, className="mb-3"),
+            dbc.Col([
+                html.Label("Ritardo massimo (giorni):", className="fw-bold"),
+                dcc.Slider(id="lag-max", min=7, max=90, step=1, value=30,
+                           marks={7: "7", 30: "30", 60: "60", 90: "90"},
+                           updatemode="mouseup")
+            ], xs=12, md=4, className="mb-3"),
+        ]),
+        dbc.Row([
+            dbc.Col(dcc.Graph(id="grafico-correlazione-ritardata", config={'responsive': True}), xs=12, className="mb-3"),
+        ], className="mb-4"),
     ])
 
 
-def create_about_tab():
+def create_about_tab(mese_anno=None):
     """Tab Info Aziendali"""
-    last_update_text = f"Ultimo aggiornamento: {get_current_month_year_it()}"
+    last_update_text = f"Ultimo aggiornamento: {mese_anno or get_current_month_year_it()}"
     return dbc.Container([
         html.H2("Chi è E-Lithium S.p.A.", className="mt-4"),
         html.P("""
@@ -1085,22 +2046,111 @@ def create_about_tab():
     ])
 
 
-def create_whatif_tab(df):
+def create_ambiente_tab(colonne):
+    """Tab Monitoraggio Ambientale: serie dei sensori con fasce di soglia"""
+    return html.Div([
+        html.H3("🌡️ Monitoraggio Ambientale della Miniera", className="mt-3 mb-2 text-center", style={
+            "fontSize": "clamp(1.2rem, 4vw, 1.75rem)"
+        }),
+        html.P(
+            "Condizioni rilevate dai sensori: fascia ottimale in verde, fascia di attenzione in giallo, "
+            "valori critici in rosso. Lo zoom su un grafico carica il dettaglio della finestra visibile.",
+            className="text-center text-muted mb-3"
+        ),
+        dbc.RadioItems(
+            id="ambiente-periodo",
+            options=[{"label": nome, "value": codice} for codice, (nome, _) in PERIODI_AMBIENTE.items()],
+            value="all",
+            inline=True,
+            className="mb-3 text-center"
+        ),
+        dbc.Row(id="ambiente-kpi", className="mb-4"),
+        *[
+            dbc.Row([
+                dbc.Col(dcc.Graph(id={"type": "grafico-ambiente", "index": colonna},
+                                  config={'responsive': True}), xs=12, className="mb-3"),
+            ])
+            for colonna in colonne
+        ],
+    ])
+
+
+def create_ambiente_kpi_card(colonna, statistiche):
+    """Card del sensore: ultimo valore, media del periodo e quota di tempo critica"""
+    soglie = SOGLIE_AMBIENTALI[colonna]
+    stato = stato_valore(colonna, statistiche["ultimo"])
+    colore = {"ottimale": "success", "attenzione": "warning", "critico": "danger"}[stato]
+    return dbc.Card([
+        dbc.CardBody([
+            html.H6(soglie["nome"], className="mb-2 fw-bold text-center"),
+            html.H4(f"{statistiche['ultimo']:.1f} {soglie['unita']}", className="mb-1 text-center",
+                    style={"fontWeight": "700"}),
+            html.Div(dbc.Badge(stato.capitalize(), color=colore), className="text-center mb-2"),
+            html.Small(f"Media {statistiche['media']:.1f} | min {statistiche['minimo']:.1f} | "
+                       f"max {statistiche['massimo']:.1f}", className="d-block text-center text-muted"),
+            html.Small(f"Fuori soglia: {statistiche['quota_critica']:.1%} del tempo",
+                       className="d-block text-center text-muted"),
+        ])
+    ], color=colore, outline=True, className="h-100")
+
+
+def create_spc_tab():
+    """Tab Controllo Statistico: carte di controllo della purezza e dei guasti"""
+    grafico = lambda id_grafico: dcc.Graph(id=id_grafico, config={'responsive': True})
+    return html.Div([
+        html.H3("📉 Controllo Statistico di Processo", className="mt-3 mb-2 text-center", style={
+            "fontSize": "clamp(1.2rem, 4vw, 1.75rem)"
+        }),
+        html.P(
+            "Carte di controllo della purezza (medie e escursioni su sottogruppi di 5 giorni, EWMA e CUSUM) "
+            "e dei guasti settimanali (carta c). I limiti sono stimati sul primo periodo di produzione; "
+            "i punti fuori controllo sono evidenziati in rosso.",
+            className="text-center text-muted mb-3"
+        ),
+        dbc.RadioItems(
+            id="spc-periodo",
+            options=[{"label": nome, "value": codice} for codice, (nome, _) in PERIODI_SPC.items()],
+            value="all",
+            inline=True,
+            className="mb-3 text-center"
+        ),
+        dbc.Row(id="spc-allarmi", className="mb-4"),
+        dbc.Row([
+            dbc.Col(grafico("grafico-spc-xbar"), xs=12, lg=6, className="mb-3"),
+            dbc.Col(grafico("grafico-spc-r"), xs=12, lg=6, className="mb-3"),
+        ]),
+        dbc.Row([
+            dbc.Col(grafico("grafico-spc-ewma"), xs=12, lg=6, className="mb-3"),
+            dbc.Col(grafico("grafico-spc-cusum"), xs=12, lg=6, className="mb-3"),
+        ]),
+        dbc.Row([
+            dbc.Col(grafico("grafico-spc-c"), xs=12, className="mb-3"),
+        ]),
+    ])
+
+
+def create_spc_allarme_card(carta, riepilogo):
+    """Card della carta di controllo: allarmi nel periodo e data dell'ultimo"""
+    allarmi = riepilogo["allarmi"]
+    colore = "danger" if allarmi else "success"
+    ultimo = riepilogo["ultimo_allarme"]
+    return dbc.Card([
+        dbc.CardBody([
+            html.H6(CARTE_SPC[carta], className="mb-2 fw-bold text-center"),
+            html.H4(f"{allarmi}", className="mb-1 text-center", style={"fontWeight": "700"}),
+            html.Div(dbc.Badge("Fuori controllo" if allarmi else "In controllo", color=colore),
+                     className="text-center mb-2"),
+            html.Small(f"Ultimo allarme: {ultimo:%d/%m/%Y}" if ultimo is not None else
+                       f"{riepilogo['punti']} punti nel periodo", className="d-block text-center text-muted"),
+        ])
+    ], color=colore, outline=True, className="h-100")
+
+
+def create_whatif_tab(indice_periodi):
     """Tab Simulazione What-If - Responsive"""
-    # Prepara i dati per il filtro temporale
-    df['data'] = pd.to_datetime(df['data'])
-    df_sorted = df.sort_values('data')
-    min_date = df_sorted['data'].min()
-    max_date = df_sorted['data'].max()
-    
-    # Crea una lista di mesi unici (uno ogni 30 giorni circa per avere ~12 marker)
-    total_days = (max_date - min_date).days
-    num_markers = min(13, max(2, total_days // 30 + 1))  # Max 13 marker (inizio + 12 mesi)
-    
-    month_marks = {}
-    for i in range(num_markers):
-        date = min_date + pd.DateOffset(days=i * (total_days / (num_markers - 1)))
-        month_marks[i] = date.strftime('%b %y')
+    # Marker del filtro temporale (uno ogni 30 giorni circa, massimo 13) dall'indice dei periodi
+    num_markers = indice_periodi.num_marker
+    month_marks = indice_periodi.etichette()
     
     return dbc.Container([
         html.H2("🔮 Pannello Simulazione What-If", className="mt-4 mb-4", style={
@@ -1128,7 +2178,8 @@ def create_whatif_tab(df):
                     marks=month_marks,
                     step=1,
                     tooltip={"placement": "bottom", "always_visible": False},
-                    allowCross=False
+                    allowCross=False,
+                    updatemode="mouseup"
                 ),
                 html.Div(id="whatif-date-info", className="mt-3 text-center text-info")
             ])
@@ -1151,7 +2202,8 @@ def create_whatif_tab(df):
                             min=-50, max=50, step=5,
                             value=0,
                             marks={i: f"{i}%" for i in range(-50, 51, 10)},
-                            tooltip={"placement": "bottom", "always_visible": True}
+                            tooltip={"placement": "bottom", "always_visible": True},
+                            updatemode="mouseup"
                         )
                     ], xs=12, md=4, className="mb-3"),
                     dbc.Col([
@@ -1163,7 +2215,8 @@ def create_whatif_tab(df):
                             min=-30, max=30, step=5,
                             value=0,
                             marks={i: f"€{i}" for i in range(-30, 31, 10)},
-                            tooltip={"placement": "bottom", "always_visible": True}
+                            tooltip={"placement": "bottom", "always_visible": True},
+                            updatemode="mouseup"
                         )
                     ], xs=12, md=4, className="mb-3"),
                     dbc.Col([
@@ -1175,7 +2228,8 @@ def create_whatif_tab(df):
                             min=-50, max=50, step=5,
                             value=0,
                             marks={i: f"{i}%" for i in range(-50, 51, 10)},
-                            tooltip={"placement": "bottom", "always_visible": True}
+                            tooltip={"placement": "bottom", "always_visible": True},
+                            updatemode="mouseup"
                         )
                     ], xs=12, md=4, className="mb-3"),
                 ])
@@ -1188,6 +2242,78 @@ def create_whatif_tab(df):
             dbc.Col(dcc.Graph(id="whatif-margine", config={'responsive': True}), xs=12, lg=6, className="mb-4"),
         ], className="mt-4 mb-5", style={"paddingBottom": "100px"}),
         
+        # Sensibilità del profitto alle leve
+        dbc.Card([
+            dbc.CardHeader(html.H5("🎯 Quale leva conta di più?", className="mb-0")),
+            dbc.CardBody([
+                html.P(
+                    "Profitto del periodo portando ogni leva al minimo e al massimo dello slider, con le altre "
+                    "ferme ai valori scelti. L'elasticità indica di quanti punti percentuali cambia il risultato "
+                    "per un +1% di volume, prezzo o costi.",
+                    className="text-muted small"
+                ),
+                dbc.Row([
+                    dbc.Col(dcc.Graph(id="whatif-tornado", config={'responsive': True}), xs=12, lg=7),
+                    dbc.Col(html.Div(id="whatif-elasticita"), xs=12, lg=5, className="d-flex align-items-center"),
+                ])
+            ])
+        ], className="mb-4"),
+        
+        # Ricerca obiettivo: quanto deve muoversi ogni leva per raggiungere un target
+        dbc.Card([
+            dbc.CardHeader(html.H5("🏁 Ricerca Obiettivo", className="mb-0")),
+            dbc.CardBody([
+                html.P(
+                    "Indica un obiettivo per il periodo selezionato: per ciascuna leva viene calcolato il valore "
+                    "che lo raggiunge, lasciando le altre leve come sono ora.",
+                    className="text-muted small"
+                ),
+                dbc.Row([
+                    dbc.Col(dbc.Select(
+                        id="goal-tipo",
+                        options=[{"label": f"{nome} ({unita})", "value": codice}
+                                 for codice, (nome, unita) in OBIETTIVI.items()],
+                        value="margine"
+                    ), xs=12, md=6, className="mb-2"),
+                    dbc.Col(dbc.Input(id="goal-valore", type="number", value=30, debounce=True),
+                            xs=12, md=6, className="mb-2"),
+                ]),
+                html.Div(id="goal-risultati", className="mt-2")
+            ])
+        ], className="mb-4"),
+        
+        # Scenari salvati e confronto
+        dbc.Card([
+            dbc.CardHeader(html.H5("💾 Scenari Salvati", className="mb-0")),
+            dbc.CardBody([
+                html.P(
+                    "Salva le leve correnti con un nome e confronta più scenari sul periodo selezionato. "
+                    "Gli scenari restano nel browser; i risultati vengono ricalcolati solo quando cambiano i dati.",
+                    className="text-muted small"
+                ),
+                dbc.Row([
+                    dbc.Col(dbc.Input(id="scenario-nome", placeholder="Nome dello scenario", maxLength=40),
+                            xs=12, md=6, className="mb-2"),
+                    dbc.Col(dbc.Button("💾 Salva scenario", id="scenario-salva", color="primary", className="w-100"),
+                            xs=6, md=3, className="mb-2"),
+                    dbc.Col(dbc.Button("🗑️ Elimina selezionati", id="scenario-elimina", color="danger", outline=True,
+                                       className="w-100"), xs=6, md=3, className="mb-2"),
+                ]),
+                html.Div(id="scenario-feedback", className="small text-info mb-2"),
+                dbc.Checklist(id="scenari-confronto", options=[], value=[], inline=True, className="mb-2"),
+                dbc.RadioItems(
+                    id="scenari-metrica",
+                    options=[{"label": "Profitto", "value": "profitto"},
+                             {"label": "Margine", "value": "margine"},
+                             {"label": "Differenza di profitto vs storico", "value": "delta_profitto"}],
+                    value="profitto",
+                    inline=True,
+                    className="mb-2"
+                ),
+                dcc.Graph(id="whatif-confronto", config={'responsive': True}),
+            ])
+        ], className="mb-4"),
+        
         # Spaziatura per evitare sovrapposizione con il footer
         html.Div(style={"height": "200px"})
     ], className="mb-5", style={"paddingBottom": "150px"})
@@ -1279,7 +2405,13 @@ def create_source_tab():
                         html.A("e_lithium_dashboard.py", 
                                href="https://github.com/Iappelli-Leonardo/e-lithium/blob/main/dashboard/e_lithium_dashboard.py", 
                                target="_blank"),
-                        " - Dashboard principale (~1500 righe)"
+                        " - Dashboard principale: layout e callback"
+                    ]),
+                    html.Li([
+                        html.A("dashboard/e_lithium_*.py",
+                               href="https://github.com/Iappelli-Leonardo/e-lithium/tree/main/dashboard",
+                               target="_blank"),
+                        " - Motori di calcolo (aggregazioni, SPC, previsioni, scenari, statistiche)"
                     ]),
                     html.Li([
                         html.A("e_lithium_simulatore.py", 
@@ -1320,7 +2452,23 @@ def create_source_tab():
 
 
 # Funzioni helper per creare grafici di distribuzione teorica
-def create_gaussian_distribution(df, column, title, color="#636EFA"):
+def aggiungi_traccia_kde(fig, kde, minimo, massimo):
+    """Curva della densità empirica (KDE) limitata all'intervallo dei dati"""
+    if kde is None:
+        return
+    griglia, densita = kde
+    dentro = (griglia >= minimo) & (griglia <= massimo)
+    fig.add_trace(go.Scatter(
+        x=griglia[dentro],
+        y=densita[dentro],
+        mode='lines',
+        name='Densità empirica (KDE)',
+        line=dict(color='#FFFFFF', width=2, dash='dot'),
+        showlegend=True
+    ))
+
+
+def create_gaussian_distribution(df, column, title, color="#636EFA", adattamento=None, kde=None):
     """Crea istogramma con fit Gaussiano (Normale) - Stile personalizzato"""
     fig = go.Figure()
     
@@ -1341,9 +2489,14 @@ def create_gaussian_distribution(df, column, title, color="#636EFA"):
     }
     xlabel = column_labels.get(column, column)
     
-    # Calcola parametri (valori originali per il fit)
-    mu_orig = data.mean()
-    sigma_orig = data.std()
+    # Calcola parametri (valori originali per il fit), se non già stimati con i test di adattamento
+    with fase("fit"):
+        if adattamento is not None:
+            mu_orig = adattamento["parametri"]["media"]
+            sigma_orig = adattamento["parametri"]["deviazione"]
+        else:
+            mu_orig = data.mean()
+            sigma_orig = data.std()
     
     # Arrotonda per la visualizzazione
     mu = round(mu_orig, 1)
@@ -1363,8 +2516,10 @@ def create_gaussian_distribution(df, column, title, color="#636EFA"):
     
     # Fit Gaussiano in rosso
     try:
-        x_range = np.linspace(data.min(), data.max(), 300)
-        y_gaussian = stats.norm.pdf(x_range, mu_orig, sigma_orig)
+        from scipy import stats
+        with fase("fit"):
+            x_range = np.linspace(data.min(), data.max(), 300)
+            y_gaussian = stats.norm.pdf(x_range, mu_orig, sigma_orig)
         
         fig.add_trace(go.Scatter(
             x=x_range,
@@ -1377,6 +2532,8 @@ def create_gaussian_distribution(df, column, title, color="#636EFA"):
     except Exception as e:
         print(f"Errore Gaussian fit: {e}")
     
+    aggiungi_traccia_kde(fig, kde, data.min(), data.max())
+    
     # Layout con legenda personalizzata
     fig.update_layout(
         title=dict(
@@ -1399,7 +2556,8 @@ def create_gaussian_distribution(df, column, title, color="#636EFA"):
             borderwidth=1,
             font=dict(size=11, color='white'),
             title=dict(
-                text=f'μ = {mu:.1f}<br>σ = {sigma:.1f}<br>CV = {cv:.1f}%',
+                text='<br>'.join([f'μ = {mu:.1f}', f'σ = {sigma:.1f}', f'CV = {cv:.1f}%']
+                                 + descrizione_test(adattamento)),
                 font=dict(size=12, color='white')
             )
         ),
@@ -1410,7 +2568,7 @@ def create_gaussian_distribution(df, column, title, color="#636EFA"):
     return fig
 
 
-def create_lognormal_distribution(df, column, title, color="#00CC96"):
+def create_lognormal_distribution(df, column, title, color="#00CC96", adattamento=None, kde=None):
     """Crea istogramma con fit Log-Normale - Stile personalizzato"""
     fig = go.Figure()
     
@@ -1446,11 +2604,16 @@ def create_lognormal_distribution(df, column, title, color="#00CC96"):
     
     # Fit Log-Normale in arancione
     try:
+        from scipy import stats
         # Parametri della log-normale (originali per il fit)
-        shape_orig, loc, scale_orig = stats.lognorm.fit(data, floc=0)
-        
-        x_range = np.linspace(data.min(), data.max(), 300)
-        y_lognorm = stats.lognorm.pdf(x_range, shape_orig, loc, scale_orig)
+        with fase("fit"):
+            if adattamento is not None:
+                shape_orig, loc, scale_orig = adattamento["parametri"]["forma"], 0, adattamento["parametri"]["scala"]
+            else:
+                shape_orig, loc, scale_orig = stats.lognorm.fit(data, floc=0)
+            
+            x_range = np.linspace(data.min(), data.max(), 300)
+            y_lognorm = stats.lognorm.pdf(x_range, shape_orig, loc, scale_orig)
         
         # Calcola e arrotonda per la visualizzazione
         mean_ln = round(np.exp(np.log(scale_orig) + shape_orig**2 / 2), 1)
@@ -1469,6 +2632,8 @@ def create_lognormal_distribution(df, column, title, color="#00CC96"):
         print(f"Errore Log-Normal fit: {e}")
         mean_ln, median_ln, shape = 0, 0, 0
     
+    aggiungi_traccia_kde(fig, kde, data.min(), data.max())
+    
     # Formatta media e mediana con notazione "k" se >= 1000
     mean_ln_str = f'{mean_ln/1000:.1f}k' if mean_ln >= 1000 else f'{mean_ln:.1f}'
     median_ln_str = f'{median_ln/1000:.1f}k' if median_ln >= 1000 else f'{median_ln:.1f}'
@@ -1495,7 +2660,8 @@ def create_lognormal_distribution(df, column, title, color="#00CC96"):
             borderwidth=1,
             font=dict(size=11, color='white'),
             title=dict(
-                text=f'Media = {mean_ln_str}<br>Mediana = {median_ln_str}<br>σ = {shape:.1f}',
+                text='<br>'.join([f'Media = {mean_ln_str}', f'Mediana = {median_ln_str}', f'σ = {shape:.1f}']
+                                 + descrizione_test(adattamento)),
                 font=dict(size=12, color='white')
             )
         ),
@@ -1506,7 +2672,7 @@ def create_lognormal_distribution(df, column, title, color="#00CC96"):
     return fig
 
 
-def create_poisson_distribution(df, column, title, color="#AB63FA"):
+def create_poisson_distribution(df, column, title, color="#AB63FA", adattamento=None):
     """Crea grafico PMF Poissoniano con curve multiple - Stile personalizzato"""
     fig = go.Figure()
     
@@ -1529,8 +2695,13 @@ def create_poisson_distribution(df, column, title, color="#AB63FA"):
     xlabel = column_labels.get(column, column)
     
     # Stima λ dai dati empirici
-    lambda_est = data.mean()
-    variance = data.var()
+    with fase("fit"):
+        if adattamento is not None:
+            lambda_est = adattamento["parametri"]["lambda"]
+            variance = adattamento["parametri"]["varianza"]
+        else:
+            lambda_est = data.mean()
+            variance = data.var()
     
     # Definisci 3 valori di λ per confronto
     lambda_values = [
@@ -1547,6 +2718,7 @@ def create_poisson_distribution(df, column, title, color="#AB63FA"):
     
     # Disegna le curve
     try:
+        from scipy import stats
         for i, lambda_val in enumerate(lambda_values):
             y_poisson = stats.poisson.pmf(x_range, lambda_val)
             
@@ -1583,7 +2755,8 @@ def create_poisson_distribution(df, column, title, color="#AB63FA"):
             borderwidth=1,
             font=dict(size=11, color='white'),
             title=dict(
-                text=f'λ stim = {lambda_est:.1f}<br>Var = {variance:.1f}<br>Eventi = {len(data)}',
+                text='<br>'.join([f'λ stim = {lambda_est:.1f}', f'Var = {variance:.1f}', f'Eventi = {len(data)}']
+                                 + descrizione_test(adattamento)),
                 font=dict(size=12, color='white')
             )
         ),
@@ -1608,110 +2781,105 @@ def create_poisson_distribution(df, column, title, color="#AB63FA"):
         Output("dist-profitto-lognorm", "figure"),
         Output("dist-prezzo-lognorm", "figure"),
         Output("dist-guasti-poisson", "figure"),
-        Output("heatmap-correlazioni", "figure"),
     ],
     [
         Input("date-range", "start_date"),
         Input("date-range", "end_date"),
         Input("purezza-range", "value"),
         Input("profitto-range", "value"),
+        Input("kde-overlay", "value"),
     ],
     prevent_initial_call=False
 )
-def update_dashboard_graphs(start_date, end_date, purezza_range, profitto_range):
+@strumenta
+@profila
+def update_dashboard_graphs(start_date, end_date, purezza_range, profitto_range, kde_overlay=None):
     try:
-        df = load_data()
-        
-        # Applico i filtri
-        if start_date:
-            df = df[df["data"] >= pd.to_datetime(start_date)]
-        if end_date:
-            df = df[df["data"] <= pd.to_datetime(end_date)]
-        
-        if isinstance(purezza_range, (list, tuple)) and len(purezza_range) == 2:
-            df = df[(df["purezza_%"] >= purezza_range[0]) & (df["purezza_%"] <= purezza_range[1])]
-        
-        if isinstance(profitto_range, (list, tuple)) and len(profitto_range) == 2:
-            df = df[(df["profitto_eur"] >= profitto_range[0]) & (df["profitto_eur"] <= profitto_range[1])]
+        # Applico i filtri (vista in cache per combinazione di filtri)
+        with fase("filter"):
+            impronta = impronta_filtri_dashboard(start_date, end_date, purezza_range, profitto_range)
+            df = get_vista_dashboard(impronta)
+        registra_righe(len(df))
         
         # Controllo della disponibilità e validità dei dati
         if len(df) < 2:
             empty_fig = go.Figure()
             empty_fig.add_annotation(text="Dati insufficienti per l'analisi")
             empty_fig.update_layout(template="plotly_dark")
-            return [empty_fig] * 8
+            return [empty_fig] * 7
         
-        # === DISTRIBUZIONI GAUSSIANE ===
-        fig_prod_gauss = create_gaussian_distribution(
-            df, "litio_estratto_kg", 
-            "📦 Produzione Media Litio Estratto - Distribuzione Gaussiana",
-            "#636EFA"
-        )
+        # Parametri e test di adattamento di tutte le colonne, in un'unica valutazione in cache
+        with fase("fit"):
+            adattamenti = get_adattamenti(impronta)
+            kde = get_kde_distribuzioni(impronta) if kde_overlay and "kde" in kde_overlay else {}
         
-        fig_pure_gauss = create_gaussian_distribution(
-            df, "purezza_%",
-            "✨ Tenore Medio del Minerale (Purezza %) - Distribuzione Gaussiana",
-            "#19D3F3"
-        )
+        with fase("figure"):
+            # === DISTRIBUZIONI GAUSSIANE ===
+            fig_prod_gauss = create_gaussian_distribution(
+                df, "litio_estratto_kg", 
+                "📦 Produzione Media Litio Estratto - Distribuzione Gaussiana",
+                "#636EFA",
+                adattamento=adattamenti.get(("litio_estratto_kg", "normale")),
+                kde=kde.get("litio_estratto_kg")
+            )
         
-        fig_marg_gauss = create_gaussian_distribution(
-            df, "margine_%",
-            "📊 Margine Medio (%) - Distribuzione Gaussiana",
-            "#FFA15A"
-        )
+            fig_pure_gauss = create_gaussian_distribution(
+                df, "purezza_%",
+                "✨ Tenore Medio del Minerale (Purezza %) - Distribuzione Gaussiana",
+                "#19D3F3",
+                adattamento=adattamenti.get(("purezza_%", "normale")),
+                kde=kde.get("purezza_%")
+            )
         
-        fig_costi_gauss = create_gaussian_distribution(
-            df, "costi_eur",
-            "💸 Costi Medi Operativi (€) - Distribuzione Gaussiana",
-            "#FF6692"
-        )
+            fig_marg_gauss = create_gaussian_distribution(
+                df, "margine_%",
+                "📊 Margine Medio (%) - Distribuzione Gaussiana",
+                "#FFA15A",
+                adattamento=adattamenti.get(("margine_%", "normale")),
+                kde=kde.get("margine_%")
+            )
         
-        # === DISTRIBUZIONI LOG-NORMALI ===
-        fig_prof_lognorm = create_lognormal_distribution(
-            df, "profitto_eur",
-            "💰 Profitto Medio (€) - Distribuzione Log-Normale",
-            "#00CC96"
-        )
+            fig_costi_gauss = create_gaussian_distribution(
+                df, "costi_eur",
+                "💸 Costi Medi Operativi (€) - Distribuzione Gaussiana",
+                "#FF6692",
+                adattamento=adattamenti.get(("costi_eur", "normale")),
+                kde=kde.get("costi_eur")
+            )
         
-        fig_prezzo_lognorm = create_lognormal_distribution(
-            df, "prezzo_litio_eur_kg",
-            "💵 Prezzo Medio del Litio (€/kg) - Distribuzione Log-Normale",
-            "#FECB52"
-        )
+            # === DISTRIBUZIONI LOG-NORMALI ===
+            fig_prof_lognorm = create_lognormal_distribution(
+                df, "profitto_eur",
+                "💰 Profitto Medio (€) - Distribuzione Log-Normale",
+                "#00CC96",
+                adattamento=adattamenti.get(("profitto_eur", "lognormale")),
+                kde=kde.get("profitto_eur")
+            )
         
-        # === DISTRIBUZIONE DI POISSON ===
-        fig_guasti_poisson = create_poisson_distribution(
-            df, "guasti",
-            "⚠️ Guasti Macchinari (Eventi Rari) - Distribuzione di Poisson",
-            "#AB63FA"
-        )
+            fig_prezzo_lognorm = create_lognormal_distribution(
+                df, "prezzo_litio_eur_kg",
+                "💵 Prezzo Medio del Litio (€/kg) - Distribuzione Log-Normale",
+                "#FECB52",
+                adattamento=adattamenti.get(("prezzo_litio_eur_kg", "lognormale")),
+                kde=kde.get("prezzo_litio_eur_kg")
+            )
         
-        # === HEATMAP CORRELAZIONI ===
-        corr_cols = ["litio_estratto_kg", "purezza_%", "profitto_eur", "margine_%", "costi_eur", "prezzo_litio_eur_kg", "guasti"]
-        corr_labels = ["Litio estratto (kg)", "Purezza (%)", "Profitto (€)", "Margine (%)", "Costi (€)", "Prezzo litio (€/kg)", "Guasti"]
-        corr_matrix = df[corr_cols].corr()
-        fig_heatmap = go.Figure(data=go.Heatmap(
-            z=corr_matrix.values,
-            x=corr_labels,
-            y=corr_labels,
-            colorscale="RdBu",
-            zmid=0,
-            text=corr_matrix.values.round(1),
-            texttemplate="%{text}",
-            textfont={"size": 10},
-            colorbar=dict(title="Correlazione")
-        ))
-        fig_heatmap.update_layout(
-            title="🔗 Matrice di Correlazione tra Metriche",
-            template="plotly_dark",
-            height=600
-        )
+            # === DISTRIBUZIONE DI POISSON ===
+            fig_guasti_poisson = create_poisson_distribution(
+                df, "guasti",
+                "⚠️ Guasti Macchinari (Eventi Rari) - Distribuzione di Poisson",
+                "#AB63FA",
+                adattamento=adattamenti.get(("guasti", "poisson"))
+            )
         
-        return (fig_prod_gauss, fig_pure_gauss, fig_marg_gauss, fig_costi_gauss,
+        with fase("serialize"):
+            return tuple(ottimizza_figura(fig) for fig in (
+                fig_prod_gauss, fig_pure_gauss, fig_marg_gauss, fig_costi_gauss,
                 fig_prof_lognorm, fig_prezzo_lognorm,
-                fig_guasti_poisson,
-                fig_heatmap)
+                fig_guasti_poisson))
     
+    except PreventUpdate:
+        raise
     except Exception as e:
         print(f"Errore nei grafici dashboard: {str(e)}")
         import traceback
@@ -1719,7 +2887,161 @@ def update_dashboard_graphs(start_date, end_date, purezza_range, profitto_range)
         empty_fig = go.Figure()
         empty_fig.add_annotation(text=f"Errore: {str(e)}")
         empty_fig.update_layout(template="plotly_dark")
-        return [empty_fig] * 8
+        return [empty_fig] * 7
+
+
+# Matrice di correlazione su tutte le variabili, in cache per combinazione di filtri e metodo
+@app.callback(
+    Output("heatmap-correlazioni", "figure"),
+    [
+        Input("date-range", "start_date"),
+        Input("date-range", "end_date"),
+        Input("purezza-range", "value"),
+        Input("profitto-range", "value"),
+        Input("correlazione-metodo", "value"),
+    ],
+    prevent_initial_call=False
+)
+@strumenta
+@profila
+def update_heatmap_correlazioni(start_date, end_date, purezza_range, profitto_range, metodo="pearson"):
+    try:
+        metodo = metodo if metodo in METODI_CORRELAZIONE else "pearson"
+        with fase("filter"):
+            impronta = impronta_filtri_dashboard(start_date, end_date, purezza_range, profitto_range)
+            df = get_vista_dashboard(impronta)
+        registra_righe(len(df))
+        
+        if len(df) < 2:
+            empty_fig = go.Figure()
+            empty_fig.add_annotation(text="Dati insufficienti per l'analisi")
+            empty_fig.update_layout(template="plotly_dark")
+            return empty_fig
+        
+        with fase("fit"):
+            corr_matrix = get_matrice_correlazione(impronta, metodo)
+        
+        with fase("figure"):
+            corr_labels = [etichetta(c) for c in corr_matrix.columns]
+            fig_heatmap = go.Figure(data=go.Heatmap(
+                z=corr_matrix.values,
+                x=corr_labels,
+                y=corr_labels,
+                colorscale="RdBu",
+                zmid=0,
+                zmin=-1,
+                zmax=1,
+                text=corr_matrix.values.round(2),
+                texttemplate="%{text}",
+                textfont={"size": 9},
+                colorbar=dict(title="Correlazione")
+            ))
+            fig_heatmap.update_layout(
+                title=f"🔗 Matrice di Correlazione tra Metriche ({METODI_CORRELAZIONE[metodo]})",
+                template="plotly_dark",
+                height=700
+            )
+        
+        return ottimizza_figura(fig_heatmap)
+    except PreventUpdate:
+        raise
+    except Exception as e:
+        print(f"Errore matrice di correlazione: {str(e)}")
+        empty_fig = go.Figure()
+        empty_fig.add_annotation(text=f"Errore: {str(e)}")
+        empty_fig.update_layout(template="plotly_dark")
+        return empty_fig
+
+
+# Correlazione ritardata tra due variabili (FFT sulle medie giornaliere filtrate)
+@app.callback(
+    Output("grafico-correlazione-ritardata", "figure"),
+    [
+        Input("date-range", "start_date"),
+        Input("date-range", "end_date"),
+        Input("purezza-range", "value"),
+        Input("profitto-range", "value"),
+        Input("lag-variabile-x", "value"),
+        Input("lag-variabile-y", "value"),
+        Input("lag-max", "value"),
+    ],
+    prevent_initial_call=False
+)
+@strumenta
+@profila
+def update_correlazione_ritardata(start_date, end_date, purezza_range, profitto_range,
+                                  variabile_x, variabile_y, ritardo_max=30):
+    try:
+        with fase("filter"):
+            impronta = impronta_filtri_dashboard(start_date, end_date, purezza_range, profitto_range)
+            df = get_vista_dashboard(impronta)
+        registra_righe(len(df))
+        
+        if len(df) < 2 or variabile_x not in df.columns or variabile_y not in df.columns:
+            empty_fig = go.Figure()
+            empty_fig.add_annotation(text="Dati insufficienti per l'analisi")
+            empty_fig.update_layout(template="plotly_dark")
+            return empty_fig
+        
+        with fase("fit"):
+            ritardi, correlazioni, coppie = get_correlazione_ritardata(
+                impronta, variabile_x, variabile_y, int(ritardo_max or 30))
+        
+        with fase("figure"):
+            nome_x, nome_y = etichetta(variabile_x), etichetta(variabile_y)
+            # Soglia di significatività approssimata (±2/√N) per ogni ritardo
+            soglia = 2 / np.sqrt(np.maximum(coppie, 1))
+            colori = np.where(np.abs(correlazioni) > soglia, "#FFA15A", "#636EFA")
+            
+            fig = go.Figure()
+            fig.add_trace(go.Bar(
+                x=ritardi,
+                y=correlazioni,
+                marker_color=colori,
+                name="Correlazione",
+                customdata=coppie,
+                hovertemplate='Ritardo %{x} giorni<br>r = %{y:.3f}<br>Coppie: %{customdata}<extra></extra>'
+            ))
+            for segno in (1, -1):
+                fig.add_trace(go.Scatter(
+                    x=ritardi, y=segno * soglia, mode="lines",
+                    line=dict(color="gray", dash="dash", width=1),
+                    name="Soglia ±2/√N", showlegend=segno == 1, hoverinfo="skip"
+                ))
+            
+            if np.isfinite(correlazioni).any():
+                migliore = int(np.nanargmax(np.abs(correlazioni)))
+                ritardo, valore = int(ritardi[migliore]), correlazioni[migliore]
+                if ritardo > 0:
+                    lettura = f"{nome_x} anticipa {nome_y} di {ritardo} giorni"
+                elif ritardo < 0:
+                    lettura = f"{nome_y} anticipa {nome_x} di {-ritardo} giorni"
+                else:
+                    lettura = "Massima correlazione senza ritardo"
+                fig.add_annotation(
+                    x=ritardo, y=valore, text=f"{lettura} (r = {valore:.2f})",
+                    showarrow=True, arrowhead=2, font=dict(color="white"), bgcolor="rgba(0,0,0,0.6)"
+                )
+            
+            fig.update_layout(
+                title=f"⏱️ Correlazione Ritardata: {nome_x} → {nome_y}",
+                xaxis_title=f"Ritardo (giorni, positivo = {nome_x} anticipa)",
+                yaxis_title="Correlazione",
+                yaxis=dict(range=[-1, 1]),
+                template="plotly_dark",
+                height=450,
+                bargap=0.1
+            )
+        
+        return ottimizza_figura(fig)
+    except PreventUpdate:
+        raise
+    except Exception as e:
+        print(f"Errore correlazione ritardata: {str(e)}")
+        empty_fig = go.Figure()
+        empty_fig.add_annotation(text=f"Errore: {str(e)}")
+        empty_fig.update_layout(template="plotly_dark")
+        return empty_fig
 
 
 # Callback per mostrare info sul periodo selezionato nel What-If
@@ -1728,244 +3050,948 @@ def update_dashboard_graphs(start_date, end_date, purezza_range, profitto_range)
     Input("whatif-date-range", "value"),
     prevent_initial_call=False
 )
+@strumenta
+@profila
 def update_whatif_date_info(date_range_indices):
     """Mostra informazioni sul periodo selezionato"""
     try:
         if not date_range_indices or len(date_range_indices) != 2:
             return "📅 Seleziona un periodo per iniziare"
         
-        df = load_data()
-        df['data'] = pd.to_datetime(df['data'])
-        df_sorted = df.sort_values('data')
-        min_date = df_sorted['data'].min()
-        max_date = df_sorted['data'].max()
-        total_days = (max_date - min_date).days
-        
-        start_idx, end_idx = date_range_indices
-        
-        # Calcola le date effettive basate sugli indici
-        num_markers = 13  # Stesso valore usato in create_whatif_tab
-        start_date = min_date + pd.DateOffset(days=int(start_idx * (total_days / (num_markers - 1))))
-        end_date = min_date + pd.DateOffset(days=int(end_idx * (total_days / (num_markers - 1))))
-        
-        # Filtra i dati per il periodo selezionato
-        df_filtered = df[(df['data'] >= start_date) & (df['data'] <= end_date)]
-        num_days = len(df_filtered)
+        # Date e righe del periodo dall'indice precalcolato dei marker
+        indice = get_indice_periodi()
+        start_date, end_date = indice.intervallo(date_range_indices)
+        inizio, fine = indice.righe(date_range_indices)
+        num_days = fine - inizio
         
         return f"📅 Periodo: {start_date.strftime('%d %b %Y')} - {end_date.strftime('%d %b %Y')} | {num_days} giorni di dati"
+    except PreventUpdate:
+        raise
     except Exception as e:
         return f"⚠️ Errore nel calcolo del periodo: {str(e)}"
 
 
+def componente_scatenante():
+    """Id del componente che ha attivato la callback (None nelle chiamate dirette)"""
+    try:
+        return ctx.triggered_id
+    except MissingCallbackContextException:
+        return None
+
+
+def larghezza_colonna_lg(larghezza_finestra):
+    """Frazione della finestra occupata da un grafico in colonna lg=6"""
+    return 0.5 if larghezza_finestra and larghezza_finestra >= 992 else 1.0
+
+
 # Simulazione di scenari alternativi con variabili controllabili
+# (uno zoom su uno dei due grafici richiede la risoluzione piena della sola finestra visibile)
 @app.callback(
     [Output("whatif-profitto", "figure"), Output("whatif-margine", "figure")],
     [Input("slider-prod", "value"), 
      Input("slider-prezzo", "value"), 
      Input("slider-costi", "value"),
-     Input("whatif-date-range", "value")],
+     Input("whatif-date-range", "value"),
+     Input("viewport-width", "data"),
+     Input("whatif-profitto", "relayoutData"),
+     Input("whatif-margine", "relayoutData")],
     prevent_initial_call=False
 )
-def update_whatif(prod_change, prezzo_change, costi_change, date_range_indices):
+@strumenta
+@profila
+def update_whatif(prod_change, prezzo_change, costi_change, date_range_indices,
+                  larghezza=None, relayout_profitto=None, relayout_margine=None):
     try:
-        df = load_data()
-        df['data'] = pd.to_datetime(df['data'])
+        with fase("load"):
+            piramide = get_piramide()
         
-        if len(df) == 0:
+        if piramide.data_min is None:
             empty_fig = go.Figure()
             empty_fig.add_annotation(text="Nessun dato disponibile")
             empty_fig.update_layout(template="plotly_dark")
             return empty_fig, empty_fig
         
-        # Applica filtro temporale
-        if date_range_indices and len(date_range_indices) == 2:
-            df_sorted = df.sort_values('data')
-            min_date = df_sorted['data'].min()
-            max_date = df_sorted['data'].max()
-            total_days = (max_date - min_date).days
-            
-            start_idx, end_idx = date_range_indices
-            num_markers = 13
-            
-            start_date = min_date + pd.DateOffset(days=int(start_idx * (total_days / (num_markers - 1))))
-            end_date = min_date + pd.DateOffset(days=int(end_idx * (total_days / (num_markers - 1))))
-            
-            df = df[(df['data'] >= start_date) & (df['data'] <= end_date)]
+        with fase("filter"):
+            # Applica filtro temporale
+            intervallo = intervallo_whatif(date_range_indices)
         
-        if len(df) == 0:
+            # Righe grezze o aggregati della piramide, secondo l'ampiezza del periodo
+            punti_max = punti_disegnabili(larghezza, larghezza_colonna_lg(larghezza))
+            livello, righe = piramide.seleziona(*(intervallo or (None, None)), punti_max)
+            finestra = None
+            scatenante = componente_scatenante()
+            if scatenante in ("whatif-profitto", "whatif-margine"):
+                finestra = finestra_da_relayout(
+                    relayout_profitto if scatenante == "whatif-profitto" else relayout_margine)
+                # Se la serie era già completa lo zoom è gestito dal browser
+                if finestra is None or (livello == GREZZI and len(righe) <= punti_max):
+                    raise PreventUpdate
+                if isinstance(finestra, tuple):
+                    visibile = interseca_intervalli(intervallo, finestra)
+                    livello, righe = piramide.seleziona(visibile[0], visibile[1], punti_max)
+        registra_righe(len(righe))
+        
+        if len(righe) == 0:
             empty_fig = go.Figure()
             empty_fig.add_annotation(text="Nessun dato nel periodo selezionato", font=dict(size=16, color="white"))
             empty_fig.update_layout(template="plotly_dark", paper_bgcolor='#1e1e1e', plot_bgcolor='#2d2d2d')
             return empty_fig, empty_fig
         
-        # Simulazione dell'impatto delle variazioni sui risultati
-        df_scenario = df.copy()
-        df_scenario["litio_estratto_kg"] = df_scenario["litio_estratto_kg"] * (1 + prod_change/100)
-        df_scenario["prezzo_litio_eur_kg"] = df_scenario["prezzo_litio_eur_kg"] + prezzo_change
-        df_scenario["costi_eur"] = df_scenario["costi_eur"] * (1 - costi_change/100)
-        df_scenario["ricavi_eur"] = df_scenario["litio_estratto_kg"] * df_scenario["prezzo_litio_eur_kg"]
-        df_scenario["profitto_eur"] = df_scenario["ricavi_eur"] - df_scenario["costi_eur"]
-        df_scenario["margine_%"] = (df_scenario["profitto_eur"] / df_scenario["ricavi_eur"].replace(0, 1)) * 100
-        
-        # Crea colonne per tooltip formattati
-        df_scenario["profitto_k"] = df_scenario["profitto_eur"] / 1000
-        
-        fig_prof = px.line(df_scenario, x="data", y="profitto_eur",
-                           title=f"Profitto Scenario (+Prod: {prod_change}%, €Prezzo: {prezzo_change:+d}, -Costi: {costi_change}%)",
-                           custom_data=["profitto_k"])
-        fig_marg = px.line(df_scenario, x="data", y="margine_%",
-                           title="Margine Scenario (%)")
-        
-        # Formattazione grafico profitti
-        fig_prof.update_traces(hovertemplate='<b>Data:</b> %{x|%Y-%m-%d}<br><b>Profitto:</b> €%{customdata[0]:.1f}k<extra></extra>')
-        if len(df_scenario) > 0:
-            min_val = int(df_scenario["profitto_eur"].min()/1000) - 5
-            max_val = int(df_scenario["profitto_eur"].max()/1000) + 10
-            
-            # Crea tick values e labels personalizzati
-            tick_range = list(range(min_val, max_val, 5))
-            tickvals = [i*1000 for i in tick_range]
-            ticktext = [str(i) if i == 0 else f'{i}k' for i in tick_range]
+        with fase("fit"):
+            if livello == GREZZI:
+                # Simulazione dell'impatto delle variazioni sui risultati
+                _, _, profitto, margine_scenario = applica_scenario(
+                    righe["litio_estratto_kg"].to_numpy(), righe["prezzo_litio_eur_kg"].to_numpy(),
+                    righe["costi_eur"].to_numpy(), prod_change, prezzo_change, costi_change)
+                df_scenario = pd.DataFrame({
+                    "data": righe["data"].to_numpy(),
+                    "profitto_eur": profitto,
+                    "margine_%": margine_scenario,
+                })
+            else:
+                # Sugli aggregati lo scenario si applica alle somme del bucket (è lineare nelle righe):
+                # profitto medio giornaliero e margine complessivo del periodo
+                ricavi = ricavi_scenario(righe["litio_x_prezzo_sum"].to_numpy(),
+                                         righe["litio_estratto_kg_sum"].to_numpy(), prod_change, prezzo_change)
+                profitto = ricavi - costi_scenario(righe["costi_eur_sum"].to_numpy(), costi_change)
+                df_scenario = pd.DataFrame({
+                    "data": righe["data"].to_numpy(),
+                    "profitto_eur": profitto / righe["conteggio"].to_numpy(),
+                    "margine_%": margine(profitto, ricavi),
+                })
+        
+            # Crea colonne per tooltip formattati
+            df_scenario["profitto_k"] = df_scenario["profitto_eur"] / 1000
+        
+        with fase("figure"):
+            fig_prof = go.Figure()
+            traccia_prof, _ = traccia_temporale(
+                df_scenario["data"], df_scenario["profitto_eur"], punti_max,
+                customdata=df_scenario["profitto_k"], mode="lines", showlegend=False,
+                hovertemplate='<b>Data:</b> %{x|%Y-%m-%d}<br><b>Profitto:</b> €%{customdata:.1f}k<extra></extra>'
+            )
+            fig_prof.add_trace(traccia_prof)
+            fig_prof.update_layout(
+                title=f"Profitto Scenario (+Prod: {prod_change}%, €Prezzo: {prezzo_change:+d}, -Costi: {costi_change}%)",
+                xaxis_title="data", yaxis_title="profitto_eur"
+            )
             
-            fig_prof.update_yaxes(
-                tickmode='array',
-                tickvals=tickvals,
-                ticktext=ticktext
+            fig_marg = go.Figure()
+            traccia_marg, _ = traccia_temporale(
+                df_scenario["data"], df_scenario["margine_%"], punti_max, mode="lines", showlegend=False,
+                hovertemplate='<b>Data:</b> %{x|%Y-%m-%d}<br><b>Margine:</b> %{y:.1f}%<extra></extra>'
             )
+            fig_marg.add_trace(traccia_marg)
+            fig_marg.update_layout(title="Margine Scenario (%)", xaxis_title="data", yaxis_title="margine_%")
+            if livello != GREZZI:
+                for fig in [fig_prof, fig_marg]:
+                    fig.update_layout(title_text=f"{fig.layout.title.text} - media {DESCRIZIONI_LIVELLI[livello]}")
+        
+            # Formattazione grafico profitti
+            if len(df_scenario) > 0:
+                min_val = int(df_scenario["profitto_eur"].min()/1000) - 5
+                max_val = int(df_scenario["profitto_eur"].max()/1000) + 10
+            
+                # Crea tick values e labels personalizzati
+                tick_range = list(range(min_val, max_val, 5))
+                tickvals = [i*1000 for i in tick_range]
+                ticktext = [str(i) if i == 0 else f'{i}k' for i in tick_range]
+            
+                fig_prof.update_yaxes(
+                    tickmode='array',
+                    tickvals=tickvals,
+                    ticktext=ticktext
+                )
+        
+            # Formattazione grafico margine
+            fig_marg.update_yaxes(ticksuffix='%')
+        
+            for fig in [fig_prof, fig_marg]:
+                fig.update_layout(
+                    template="plotly_dark",
+                    paper_bgcolor='#1e1e1e',
+                    plot_bgcolor='#2d2d2d',
+                    font=dict(color='white')
+                )
+                # Vista zoomata: i due grafici mostrano la stessa finestra
+                if isinstance(finestra, tuple):
+                    fig.update_xaxes(range=[finestra[0], finestra[1]])
+        
+        return ottimizza_figura(fig_prof), ottimizza_figura(fig_marg)
+    except PreventUpdate:
+        raise
+    except Exception as e:
+        print(f"Errore What-If: {str(e)}")
+        empty_fig = go.Figure()
+        empty_fig.add_annotation(text=f"Errore: {str(e)}")
+        return empty_fig, empty_fig
+
+
+# Sensibilità del profitto alle leve What-If: una valutazione sui totali del periodo
+@app.callback(
+    [Output("whatif-tornado", "figure"), Output("whatif-elasticita", "children")],
+    [Input("slider-prod", "value"),
+     Input("slider-prezzo", "value"),
+     Input("slider-costi", "value"),
+     Input("whatif-date-range", "value")],
+    prevent_initial_call=False
+)
+@strumenta
+@profila
+def update_whatif_sensibilita(prod_change, prezzo_change, costi_change, date_range_indices):
+    try:
+        with fase("filter"):
+            somme = get_somme_cumulate()
+            if len(somme) == 0:
+                raise ValueError("nessun dato disponibile")
+            intervallo = intervallo_whatif(date_range_indices)
+            registra_righe(int(get_totali_periodo(intervallo)["righe"]))
         
-        # Formattazione grafico margine
-        fig_marg.update_traces(hovertemplate='<b>Data:</b> %{x|%Y-%m-%d}<br><b>Margine:</b> %{y:.1f}%<extra></extra>')
-        fig_marg.update_yaxes(ticksuffix='%')
+        with fase("fit"):
+            scenario = tuple(float(v or 0) for v in (prod_change, prezzo_change, costi_change))
+            (profitto_base, margine_base), leve = get_sensibilita(intervallo, scenario)
         
-        for fig in [fig_prof, fig_marg]:
+        with fase("figure"):
+            # Barre dal profitto dello scenario corrente al minimo e al massimo di ogni leva,
+            # la leva con l'escursione maggiore in alto
+            ordine = list(reversed(leve))
+            nomi = [voce["nome"] for voce in ordine]
+            fig = go.Figure()
+            for estremo, colore, etichetta_estremo in (("min", "#EF553B", "Leva al minimo"),
+                                                       ("max", "#00CC96", "Leva al massimo")):
+                fig.add_trace(go.Bar(
+                    y=nomi,
+                    x=[voce[f"profitto_{estremo}"] - profitto_base for voce in ordine],
+                    base=profitto_base,
+                    orientation="h",
+                    name=etichetta_estremo,
+                    marker_color=colore,
+                    customdata=[[voce["minimo"] if estremo == "min" else voce["massimo"], voce["unita"],
+                                 voce[f"profitto_{estremo}"], voce[f"margine_{estremo}"]] for voce in ordine],
+                    hovertemplate="%{y} a %{customdata[0]:+g} %{customdata[1]}<br>"
+                                  "Profitto: €%{customdata[2]:,.0f}<br>Margine: %{customdata[3]:.1f}%<extra></extra>"
+                ))
+            fig.add_vline(x=profitto_base, line=dict(color="white", width=1, dash="dash"))
             fig.update_layout(
+                title="Escursione del profitto del periodo per leva",
+                barmode="overlay",
                 template="plotly_dark",
                 paper_bgcolor='#1e1e1e',
                 plot_bgcolor='#2d2d2d',
-                font=dict(color='white')
+                font=dict(color='white'),
+                height=300,
+                margin=dict(l=120, r=30, t=60, b=40),
+                legend=dict(orientation="h", yanchor="bottom", y=-0.35, x=0),
+                xaxis_title="profitto_eur"
             )
+            
+            righe = [html.Tr([
+                html.Td(voce["nome"], className="fw-bold"),
+                html.Td(f"{voce['elasticita_profitto']:+.2f}"),
+                html.Td(f"{voce['elasticita_margine']:+.2f}"),
+            ]) for voce in leve]
+            tabella = html.Div([
+                dbc.Table([
+                    html.Thead(html.Tr([html.Th("+1% di"), html.Th("Profitto (%)"), html.Th("Margine (%)")])),
+                    html.Tbody(righe)
+                ], bordered=False, hover=True, size="sm", className="mb-2"),
+                html.Small(f"Scenario corrente: profitto € {profitto_base:,.0f}, margine {margine_base:.1f}%",
+                           className="text-muted")
+            ], className="w-100")
         
-        return fig_prof, fig_marg
+        return ottimizza_figura(fig), tabella
+    except PreventUpdate:
+        raise
     except Exception as e:
-        print(f"Errore What-If: {str(e)}")
+        print(f"Errore sensibilità What-If: {str(e)}")
         empty_fig = go.Figure()
         empty_fig.add_annotation(text=f"Errore: {str(e)}")
-        return empty_fig, empty_fig
+        empty_fig.update_layout(template="plotly_dark")
+        return empty_fig, html.Div(f"Errore: {str(e)}")
+
+
+# Ricerca obiettivo: forma chiusa sui totali del periodo, bisezione vettoriale per il margine medio
+@app.callback(
+    Output("goal-risultati", "children"),
+    [Input("goal-tipo", "value"),
+     Input("goal-valore", "value"),
+     Input("slider-prod", "value"),
+     Input("slider-prezzo", "value"),
+     Input("slider-costi", "value"),
+     Input("whatif-date-range", "value")],
+    prevent_initial_call=False
+)
+@strumenta
+@profila
+def update_whatif_obiettivo(obiettivo, valore, prod_change, prezzo_change, costi_change, date_range_indices):
+    try:
+        if obiettivo not in OBIETTIVI or valore is None:
+            return html.Small("Inserisci un valore obiettivo", className="text-muted")
+        
+        with fase("filter"):
+            somme = get_somme_cumulate()
+            if len(somme) == 0:
+                return html.Div("Nessun dato disponibile")
+            intervallo = intervallo_whatif(date_range_indices)
+        
+        with fase("fit"):
+            scenario = tuple(float(v or 0) for v in (prod_change, prezzo_change, costi_change))
+            soluzioni = get_soluzioni_obiettivo(intervallo, scenario, obiettivo, float(valore))
+        
+        with fase("figure"):
+            nome_obiettivo, unita_obiettivo = OBIETTIVI[obiettivo]
+            righe = []
+            for leva, attuale, soluzione in zip(LEVE_WHATIF, scenario, soluzioni):
+                nome, unita, (minimo, massimo) = DESCRIZIONI_LEVE[leva]
+                if np.isnan(soluzione):
+                    valore_cella = html.Span("non raggiungibile", className="text-danger")
+                    stato = ""
+                else:
+                    valore_cella = f"{soluzione:+.2f} {unita}"
+                    entro = minimo <= soluzione <= massimo
+                    stato = dbc.Badge("entro lo slider" if entro else "fuori dallo slider",
+                                      color="success" if entro else "warning")
+                righe.append(html.Tr([
+                    html.Td(nome, className="fw-bold"),
+                    html.Td(valore_cella),
+                    html.Td(f"{attuale:+g} {unita}", className="text-muted"),
+                    html.Td(stato),
+                ]))
+            obiettivo_testo = (f"€ {float(valore):,.0f}" if unita_obiettivo == "€" else f"{float(valore):.1f}%")
+            return html.Div([
+                html.P(f"{nome_obiettivo}: {obiettivo_testo}", className="mb-2"),
+                dbc.Table([
+                    html.Thead(html.Tr([html.Th("Leva"), html.Th("Valore necessario"), html.Th("Attuale"), html.Th("")])),
+                    html.Tbody(righe)
+                ], bordered=False, hover=True, size="sm", responsive=True, className="mb-0"),
+            ])
+    except PreventUpdate:
+        raise
+    except Exception as e:
+        print(f"Errore ricerca obiettivo: {str(e)}")
+        return html.Div(f"Errore: {str(e)}")
+
+
+def nome_libero(salvati):
+    """Primo nome "Scenario N" non ancora usato (dopo un'eliminazione il conteggio non basta)"""
+    usati = {scenario["nome"] for scenario in salvati}
+    return next(f"Scenario {i}" for i in range(1, len(usati) + 2) if f"Scenario {i}" not in usati)
+
+
+# Salvataggio ed eliminazione degli scenari What-If (i risultati sono calcolati al salvataggio)
+@app.callback(
+    [Output("scenari-salvati", "data"), Output("scenario-feedback", "children")],
+    [Input("scenario-salva", "n_clicks"),
+     Input("scenario-elimina", "n_clicks")],
+    [State("scenario-nome", "value"),
+     State("slider-prod", "value"),
+     State("slider-prezzo", "value"),
+     State("slider-costi", "value"),
+     State("scenari-confronto", "value"),
+     State("scenari-salvati", "data")],
+    prevent_initial_call=True
+)
+@strumenta
+@profila
+def gestisci_scenari_salvati(n_salva, n_elimina, nome, prod_change, prezzo_change, costi_change,
+                             selezionati, salvati):
+    salvati = list(salvati or [])
+    if componente_scatenante() == "scenario-elimina":
+        rimossi = set(selezionati or [])
+        salvati = [scenario for scenario in salvati if scenario["nome"] not in rimossi]
+        return salvati, f"Scenari eliminati: {len(rimossi)}" if rimossi else "Nessuno scenario selezionato"
+    
+    leve = [float(v or 0) for v in (prod_change, prezzo_change, costi_change)]
+    nome = (nome or "").strip() or nome_libero(salvati)
+    # Un nome scelto dall'utente e già usato viene sovrascritto con le leve correnti
+    salvati = [scenario for scenario in salvati if scenario["nome"] != nome]
+    if len(salvati) >= MAX_SCENARI_SALVATI:
+        return no_update, f"Massimo {MAX_SCENARI_SALVATI} scenari: eliminane qualcuno prima di salvare"
+    salvati.append(scenario_salvato(nome, leve))
+    return salvati, f"Scenario \"{nome}\" salvato (produzione {leve[0]:+g}%, prezzo {leve[1]:+g} €/kg, " \
+                    f"riduzione costi {leve[2]:+g}%)"
+
+
+@app.callback(
+    [Output("scenari-confronto", "options"), Output("scenari-confronto", "value")],
+    Input("scenari-salvati", "data"),
+    [State("scenari-confronto", "options"),
+     State("scenari-confronto", "value")],
+    prevent_initial_call=False
+)
+def update_lista_scenari(salvati, opzioni=None, selezionati=None):
+    nomi = [scenario["nome"] for scenario in (salvati or [])]
+    # I nuovi scenari entrano nel confronto; per gli altri resta la selezione dell'utente
+    noti = {opzione["value"] for opzione in (opzioni or [])}
+    scelti = set(selezionati or [])
+    valori = [nome for nome in nomi if nome not in noti or nome in scelti]
+    nuove_opzioni = [{"label": nome, "value": nome} for nome in nomi]
+    if nuove_opzioni == opzioni and valori == selezionati:
+        # Risultati aggiornati nello store senza cambi di nomi: nessun nuovo disegno del confronto
+        raise PreventUpdate
+    return nuove_opzioni, valori
+
+
+# Confronto degli scenari salvati: risultati giornalieri dallo store, finestra del periodo scelto
+# (gli scenari calcolati su una versione precedente dei dati sono ricalcolati e riscritti nello store)
+@app.callback(
+    [Output("whatif-confronto", "figure"),
+     Output("scenari-salvati", "data", allow_duplicate=True)],
+    [Input("scenari-confronto", "value"),
+     Input("scenari-metrica", "value"),
+     Input("whatif-date-range", "value"),
+     Input("viewport-width", "data")],
+    State("scenari-salvati", "data"),
+    prevent_initial_call="initial_duplicate"
+)
+@strumenta
+@profila
+def update_confronto_scenari(selezionati, metrica, date_range_indices, larghezza=None, salvati=None):
+    try:
+        fig = go.Figure()
+        fig.update_layout(
+            template="plotly_dark",
+            paper_bgcolor='#1e1e1e',
+            plot_bgcolor='#2d2d2d',
+            font=dict(color='white'),
+            height=380,
+            hovermode="x unified",
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, x=0)
+        )
+        salvati = [dict(scenario) for scenario in (salvati or [])]
+        scelti = [scenario for scenario in salvati if scenario["nome"] in set(selezionati or [])]
+        if not scelti:
+            fig.add_annotation(text="Salva uno scenario per confrontarlo", showarrow=False)
+            return fig, no_update
+        
+        with fase("filter"):
+            versione = str(get_dataset_version())
+            date = get_giornaliero()["data"].to_numpy(dtype="datetime64[ns]")
+            intervallo = intervallo_whatif(date_range_indices)
+            punti_max = punti_disegnabili(larghezza)
+            i, j = 0, len(date)
+            if intervallo:
+                i = int(np.searchsorted(date, np.datetime64(intervallo[0], "ns"), side="left"))
+                j = max(i, int(np.searchsorted(date, np.datetime64(intervallo[1], "ns"), side="right")))
+            ricalcolati = 0
+            for scenario in scelti:
+                if not scenario_aggiornato(scenario, versione, len(date)):
+                    scenario.update(scenario_salvato(scenario["nome"], scenario["leve"]))
+                    ricalcolati += 1
+        
+        with fase("figure"):
+            metrica = metrica if metrica in METRICHE_SCENARIO else "profitto"
+            if metrica == "delta_profitto":
+                fig.add_hline(y=0, line=dict(color="white", width=1, dash="dash"))
+            righe = 0
+            for scenario in scelti:
+                # Lo store restituisce liste: i NaN del margine tornano come null
+                valori = np.asarray(scenario["risultati"][metrica][i:j], dtype=np.float64)
+                righe += j - i
+                traccia, _ = traccia_temporale(
+                    date[i:j], valori, punti_max, mode="lines", name=scenario["nome"],
+                    hovertemplate=f"{scenario['nome']}: " + ("%{y:.1f}%" if metrica == "margine" else "€%{y:,.0f}")
+                                  + "<extra></extra>"
+                )
+                fig.add_trace(traccia)
+            registra_righe(righe)
+            titoli = {"profitto": "Profitto giornaliero per scenario",
+                      "margine": "Margine giornaliero per scenario (%)",
+                      "delta_profitto": "Differenza di profitto giornaliero rispetto allo storico"}
+            fig.update_layout(title=titoli[metrica])
+            if metrica == "margine":
+                fig.update_yaxes(ticksuffix="%")
+        
+        return ottimizza_figura(fig), salvati if ricalcolati else no_update
+    except PreventUpdate:
+        raise
+    except Exception as e:
+        print(f"Errore confronto scenari: {str(e)}")
+        empty_fig = go.Figure()
+        empty_fig.add_annotation(text=f"Errore: {str(e)}")
+        empty_fig.update_layout(template="plotly_dark")
+        return empty_fig, no_update
 
 
 # Callback per il grafico trend profitti nel summary tab
+# (serie ridotta con LTTB alla larghezza della finestra; lo zoom richiede la risoluzione piena)
 @app.callback(
     Output("summary-profit-trend", "figure"),
     [Input("tabs", "value"),
-     Input("quick-filter-selection", "data")],
+     Input("quick-filter-selection", "data"),
+     Input("viewport-width", "data"),
+     Input("summary-profit-trend", "relayoutData")],
     prevent_initial_call=False
 )
-def update_summary_profit_trend(tab, filter_selection):
+@strumenta
+@profila
+def update_summary_profit_trend(tab, filter_selection, larghezza=None, relayout_data=None):
     if tab != "tab-summary":
         return go.Figure()
     
     try:
-        df_full = load_data()
-        
-        # Applica lo stesso filtro del summary tab
-        df_filtered = df_full.copy()
-        periodo_desc = "Ultimi 30 Giorni"
-        
-        if filter_selection and "filter" in filter_selection:
-            filter_type = filter_selection["filter"]
+        # Stessa selezione del summary tab; su intervalli lunghi si passa agli aggregati
+        with fase("filter"):
+            filter_type = get_quick_filter_type(filter_selection)
+            statistiche = get_statistiche_profitto(filter_type)
+            periodo_desc = QUICK_FILTER_DESCRIZIONI[filter_type]
             
-            if filter_type == "7d":
-                max_date = df_full["data"].max()
-                start_date = max_date - timedelta(days=6)
-                df_filtered = df_full[df_full["data"] >= start_date]
-                periodo_desc = "Ultimi 7 Giorni"
-            elif filter_type == "30d":
-                max_date = df_full["data"].max()
-                start_date = max_date - timedelta(days=29)
-                df_filtered = df_full[df_full["data"] >= start_date]
-                periodo_desc = "Ultimi 30 Giorni"
-            elif filter_type == "best":
-                media_profitto = df_full["profitto_eur"].mean()
-                std_profitto = df_full["profitto_eur"].std()
-                df_filtered = df_full[df_full["profitto_eur"] > (media_profitto + 0.5 * std_profitto)]
-                periodo_desc = "Migliori Performance"
-            elif filter_type == "alerts":
-                media_profitto = df_full["profitto_eur"].mean()
-                std_profitto = df_full["profitto_eur"].std()
-                df_filtered = df_full[(df_full["profitto_eur"] < (media_profitto - 0.5 * std_profitto)) | 
-                                      (df_full["purezza_%"] < 97)]
-                periodo_desc = "Alert Criticità"
-        
-        if len(df_filtered) == 0:
+            punti_max = punti_disegnabili(larghezza)
+            finestra = None
+            if componente_scatenante() == "summary-profit-trend":
+                finestra = finestra_da_relayout(relayout_data)
+                # Se la serie era già completa lo zoom è gestito dal browser
+                livello, righe = seleziona_trend_profitti(filter_type, None, punti_max)
+                if finestra is None or (livello == GREZZI and len(righe) <= punti_max):
+                    raise PreventUpdate
+            livello, righe = seleziona_trend_profitti(filter_type, finestra, punti_max)
+        registra_righe(len(righe))
+        
+        if statistiche["righe"] == 0:
             return go.Figure()
         
-        fig = go.Figure()
+        with fase("figure"):
+            fig = go.Figure()
         
-        # Linea profitti
-        fig.add_trace(go.Scatter(
-            x=df_filtered["data"],
-            y=df_filtered["profitto_eur"],
-            mode='lines+markers',
-            name='Profitto Giornaliero',
-            line=dict(color='#00CC96', width=3),
-            marker=dict(size=6),
-            fill='tozeroy',
-            fillcolor='rgba(0, 204, 150, 0.2)',
-            hovertemplate='€%{customdata:.1f}k<extra></extra>',
-            customdata=df_filtered["profitto_eur"] / 1000
-        ))
+            if livello == GREZZI:
+                # Linea profitti
+                traccia, _ = traccia_temporale(
+                    righe["data"],
+                    righe["profitto_eur"],
+                    punti_max,
+                    customdata=righe["profitto_eur"] / 1000,
+                    mode='lines+markers',
+                    name='Profitto Giornaliero',
+                    line=dict(color='#00CC96', width=3),
+                    marker=dict(size=6),
+                    fill='tozeroy',
+                    fillcolor='rgba(0, 204, 150, 0.2)',
+                    hovertemplate='€%{customdata:.1f}k<extra></extra>'
+                )
+                fig.add_trace(traccia)
+            else:
+                # Dati aggregati: media giornaliera del periodo e banda minimo-massimo
+                descrizione = DESCRIZIONI_LIVELLI[livello]
+                periodo_desc = f"{periodo_desc} (media {descrizione})"
+                for colonna, proprieta in (
+                    ("profitto_eur_max", dict(showlegend=False)),
+                    ("profitto_eur_min", dict(name="Min-Max", fill='tonexty',
+                                              fillcolor='rgba(0, 204, 150, 0.2)')),
+                ):
+                    traccia, _ = traccia_temporale(righe["data"], righe[colonna], punti_max, mode='lines',
+                                                   line=dict(width=0), hoverinfo='skip', **proprieta)
+                    fig.add_trace(traccia)
+                traccia, _ = traccia_temporale(
+                    righe["data"],
+                    righe["profitto_eur_mean"],
+                    punti_max,
+                    customdata=righe["profitto_eur_mean"] / 1000,
+                    mode='lines+markers',
+                    name=f'Profitto Medio Giornaliero ({descrizione})',
+                    line=dict(color='#00CC96', width=3),
+                    marker=dict(size=6),
+                    hovertemplate='€%{customdata:.1f}k<extra></extra>'
+                )
+                fig.add_trace(traccia)
         
-        # Linea media
-        media_profitto = df_filtered["profitto_eur"].mean()
-        media_profitto_k = media_profitto / 1000
-        fig.add_hline(
-            y=media_profitto,
-            line_dash="dash",
-            line_color="red",
-            annotation_text=f"Media: €{media_profitto_k:.1f}k",
-            annotation_position="right"
-        )
-        
-        fig.update_layout(
-            title=f"Andamento Profitti Giornalieri - {periodo_desc}",
-            xaxis_title="Data",
-            yaxis_title="Profitto (€)",
-            template="plotly_dark",
-            hovermode='x unified',
-            height=400,
-            margin=dict(l=60, r=120, t=80, b=60),
-            showlegend=True,
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
+            # Linea media
+            media_profitto = statistiche["media"]
+            media_profitto_k = media_profitto / 1000
+            fig.add_hline(
+                y=media_profitto,
+                line_dash="dash",
+                line_color="red",
+                annotation_text=f"Media: €{media_profitto_k:.1f}k",
+                annotation_position="right"
             )
-        )
         
-        # Formatta asse Y in migliaia (k)
-        if len(df_filtered) > 0 and df_filtered["profitto_eur"].max() > 0:
-            max_val = int(df_filtered["profitto_eur"].max()/1000) + 10
-            fig.update_yaxes(
-                tickformat='.1f',
-                ticksuffix='k',
-                tickvals=[i*1000 for i in range(0, max_val, 5)],
-                ticktext=[f'{i}' for i in range(0, max_val, 5)]
+            fig.update_layout(
+                title=f"Andamento Profitti Giornalieri - {periodo_desc}",
+                xaxis_title="Data",
+                yaxis_title="Profitto (€)",
+                template="plotly_dark",
+                hovermode='x unified',
+                height=400,
+                margin=dict(l=60, r=120, t=80, b=60),
+                showlegend=True,
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=1.02,
+                    xanchor="right",
+                    x=1
+                )
             )
         
-        return fig
+            # Formatta asse Y in migliaia (k)
+            if statistiche["massimo"] > 0:
+                max_val = int(statistiche["massimo"]/1000) + 10
+                fig.update_yaxes(
+                    tickformat='.1f',
+                    ticksuffix='k',
+                    tickvals=[i*1000 for i in range(0, max_val, 5)],
+                    ticktext=[f'{i}' for i in range(0, max_val, 5)]
+                )
+            
+            if isinstance(finestra, tuple):
+                fig.update_xaxes(range=[finestra[0], finestra[1]])
+        
+        return ottimizza_figura(fig)
+    except PreventUpdate:
+        raise
     except Exception as e:
         print(f"Errore summary profit trend: {e}")
         return go.Figure()
 
+# Serie dei sensori ambientali: periodo scelto o finestra di zoom, ridotte a min/max per pixel
+@app.callback(
+    [Output({"type": "grafico-ambiente", "index": ALL}, "figure"),
+     Output("ambiente-kpi", "children")],
+    [Input("ambiente-periodo", "value"),
+     Input("viewport-width", "data"),
+     Input({"type": "grafico-ambiente", "index": ALL}, "relayoutData")],
+    prevent_initial_call=False
+)
+@strumenta
+@profila
+def update_ambiente(periodo, larghezza=None, relayout_grafici=None):
+    try:
+        with fase("load"):
+            archivio = get_archivio_sensori()
+        colonne = archivio.colonne
+        
+        if len(archivio) == 0 or not colonne:
+            empty_fig = go.Figure()
+            empty_fig.add_annotation(text="Nessun dato dei sensori disponibile")
+            empty_fig.update_layout(template="plotly_dark")
+            return [empty_fig] * len(colonne), html.Div("Nessun dato disponibile")
+        
+        with fase("filter"):
+            _, giorni = PERIODI_AMBIENTE.get(periodo, PERIODI_AMBIENTE["all"])
+            inizio = archivio.fine - timedelta(days=giorni) if giorni else None
+            fine = None
+            punti_max = punti_disegnabili(larghezza)
+            
+            # Zoom su uno dei grafici: tutti mostrano la stessa finestra
+            scatenante = componente_scatenante()
+            if isinstance(scatenante, dict) and scatenante.get("type") == "grafico-ambiente":
+                relayout = (relayout_grafici or [None] * len(colonne))[colonne.index(scatenante["index"])]
+                finestra = finestra_da_relayout(relayout)
+                i, j = archivio.finestra(inizio, fine)
+                # Se le serie erano già complete lo zoom è gestito dal browser
+                if finestra is None or j - i <= punti_max:
+                    raise PreventUpdate
+                if isinstance(finestra, tuple):
+                    inizio, fine = interseca_intervalli((inizio, fine), finestra)
+            else:
+                finestra = None
+            
+            i, j = archivio.finestra(inizio, fine)
+        registra_righe((j - i) * len(colonne))
+        
+        with fase("figure"):
+            figure = []
+            schede = []
+            for colonna in colonne:
+                soglie = SOGLIE_AMBIENTALI[colonna]
+                x, y = archivio.riduci(colonna, inizio, fine, punti_max)
+                
+                fig = go.Figure()
+                fig.add_hrect(y0=soglie["attenzione"][0], y1=soglie["attenzione"][1],
+                              fillcolor="#FECB52", opacity=0.12, line_width=0, layer="below")
+                fig.add_hrect(y0=soglie["ottimale"][0], y1=soglie["ottimale"][1],
+                              fillcolor="#00CC96", opacity=0.15, line_width=0, layer="below")
+                traccia, _ = traccia_temporale(
+                    x, y, len(x) + 1, mode="lines", name=soglie["nome"],
+                    line=dict(color="#19D3F3", width=1.5),
+                    hovertemplate=f"%{{x|%Y-%m-%d %H:%M}}<br>%{{y:.1f}} {soglie['unita']}<extra></extra>"
+                )
+                fig.add_trace(traccia)
+                
+                # Valori critici evidenziati sopra la serie
+                critici = (y < soglie["attenzione"][0]) | (y > soglie["attenzione"][1])
+                if critici.any():
+                    traccia, _ = traccia_temporale(
+                        x[critici], y[critici], int(critici.sum()) + 1, mode="markers", name="Critico",
+                        marker=dict(color="#EF553B", size=6),
+                        hovertemplate=f"Critico: %{{y:.1f}} {soglie['unita']}<extra></extra>"
+                    )
+                    fig.add_trace(traccia)
+                
+                fig.update_layout(
+                    title=f"{soglie['nome']} ({soglie['unita']})",
+                    template="plotly_dark",
+                    height=320,
+                    margin=dict(l=60, r=30, t=60, b=40),
+                    showlegend=False,
+                    hovermode="x unified"
+                )
+                if isinstance(finestra, tuple):
+                    fig.update_xaxes(range=[inizio, fine])
+                figure.append(ottimizza_figura(fig))
+                
+                statistiche = archivio.statistiche(colonna, inizio, fine)
+                if statistiche:
+                    schede.append(dbc.Col(create_ambiente_kpi_card(colonna, statistiche),
+                                          xs=12, sm=6, lg=True, className="mb-3"))
+        
+        return figure, schede
+    except PreventUpdate:
+        raise
+    except Exception as e:
+        print(f"Errore monitoraggio ambientale: {str(e)}")
+        empty_fig = go.Figure()
+        empty_fig.add_annotation(text=f"Errore: {str(e)}")
+        empty_fig.update_layout(template="plotly_dark")
+        return [empty_fig] * len(get_archivio_sensori().colonne), html.Div(f"Errore: {str(e)}")
+
+
+def create_varianza_figure(scomposizione):
+    """Cascata: profitto del periodo precedente, effetti e profitto attuale"""
+    effetti = [(nome, scomposizione[chiave]) for chiave, nome in EFFETTI_VARIANZA
+               if chiave != "altro" or abs(scomposizione[chiave]) >= 1]
+    nomi = ["Periodo precedente"] + [nome for nome, _ in effetti] + ["Periodo attuale"]
+    valori = [scomposizione["profitto_base"]] + [valore for _, valore in effetti] + [scomposizione["profitto_corrente"]]
+    fig = go.Figure(go.Waterfall(
+        x=nomi, y=valori,
+        measure=["absolute"] + ["relative"] * len(effetti) + ["total"],
+        text=[f"€ {v:+,.0f}" if 0 < i < len(valori) - 1 else f"€ {v:,.0f}" for i, v in enumerate(valori)],
+        textposition="outside",
+        increasing=dict(marker=dict(color="#00CC96")),
+        decreasing=dict(marker=dict(color="#EF553B")),
+        totals=dict(marker=dict(color="#636EFA")),
+        connector=dict(line=dict(color="rgba(255,255,255,0.4)", width=1)),
+        hovertemplate="%{x}: € %{y:,.0f}<extra></extra>"
+    ))
+    fig.update_layout(
+        template="plotly_dark",
+        height=380,
+        margin=dict(l=60, r=30, t=30, b=40),
+        yaxis_title="Profitto (€)",
+        showlegend=False
+    )
+    return ottimizza_figura(fig)
+
+
+def create_spc_figure(dati, titolo, punti_max, formato=".4f", colore="#19D3F3"):
+    """Carta di controllo: statistica ridotta con LTTB, limiti e punti fuori controllo"""
+    fig = go.Figure()
+    tempi, valori = dati["tempi"], dati["valori"]
+    inferiore, centro, superiore = dati["limiti"]
+    
+    traccia, _ = traccia_temporale(
+        tempi, valori, punti_max, name=titolo, line=dict(color=colore, width=1.5), marker=dict(size=4),
+        hovertemplate=f"%{{x|%d/%m/%Y}}<br>%{{y:{formato}}}<extra></extra>"
+    )
+    fig.add_trace(traccia)
+    
+    # Limiti variabili (EWMA) come serie, limiti costanti come linee orizzontali
+    for limite, nome in ((inferiore, "LCL"), (superiore, "UCL")):
+        if isinstance(limite, np.ndarray):
+            traccia, _ = traccia_temporale(tempi, limite, punti_max, mode="lines", name=nome,
+                                           line=dict(color="#EF553B", width=1, dash="dash"), hoverinfo="skip")
+            fig.add_trace(traccia)
+        elif limite is not None:
+            fig.add_hline(y=limite, line=dict(color="#EF553B", width=1, dash="dash"),
+                          annotation_text=nome, annotation_position="top left")
+    if centro is not None:
+        fig.add_hline(y=centro, line=dict(color="#00CC96", width=1), annotation_text="CL",
+                      annotation_position="top left")
+    
+    # Allarmi precalcolati: solo le posizioni nella finestra, ridotte se sono troppe
+    allarmi = dati["allarmi"]
+    if len(allarmi):
+        traccia, _ = traccia_temporale(
+            tempi[allarmi], valori[allarmi], punti_max, mode="markers", name="Fuori controllo",
+            marker=dict(color="#EF553B", size=8, symbol="x"),
+            hovertemplate=f"Fuori controllo: %{{y:{formato}}}<extra></extra>"
+        )
+        fig.add_trace(traccia)
+    
+    fig.update_layout(
+        title=titolo,
+        template="plotly_dark",
+        height=340,
+        margin=dict(l=60, r=30, t=60, b=40),
+        showlegend=False,
+        hovermode="closest"
+    )
+    return fig
+
+
+# Carte di controllo del periodo scelto: letture per finestra sulle carte già calcolate
+@app.callback(
+    [Output("grafico-spc-xbar", "figure"),
+     Output("grafico-spc-r", "figure"),
+     Output("grafico-spc-ewma", "figure"),
+     Output("grafico-spc-cusum", "figure"),
+     Output("grafico-spc-c", "figure"),
+     Output("spc-allarmi", "children")],
+    [Input("spc-periodo", "value"),
+     Input("viewport-width", "data")],
+    prevent_initial_call=False
+)
+@strumenta
+@profila
+def update_spc(periodo, larghezza=None):
+    try:
+        with fase("load"):
+            monitor = get_monitor_spc()
+        
+        if len(monitor) == 0:
+            empty_fig = go.Figure()
+            empty_fig.add_annotation(text="Nessun dato disponibile")
+            empty_fig.update_layout(template="plotly_dark")
+            return [empty_fig] * 5 + [html.Div("Nessun dato disponibile")]
+        
+        with fase("filter"):
+            _, giorni = PERIODI_SPC.get(periodo, PERIODI_SPC["all"])
+            inizio = pd.Timestamp(monitor.ultimo_tempo) - timedelta(days=giorni) if giorni else None
+            carte = {carta: monitor.carta(carta, inizio) for carta in CARTE_SPC}
+            riepilogo = monitor.riepilogo(inizio)
+        registra_righe(len(carte["ewma"]["tempi"]))
+        
+        with fase("figure"):
+            punti_max = punti_disegnabili(larghezza, larghezza_colonna_lg(larghezza))
+            fig_xbar = create_spc_figure(carte["xbar"], "Purezza - medie X̄ dei sottogruppi", punti_max)
+            fig_r = create_spc_figure(carte["r"], "Purezza - escursioni R dei sottogruppi", punti_max,
+                                      colore="#AB63FA")
+            fig_ewma = create_spc_figure(carte["ewma"], "Purezza - EWMA (λ = 0.2)", punti_max, colore="#FFA15A")
+            
+            # CUSUM: lato superiore positivo, lato inferiore ribaltato sotto lo zero
+            cusum = carte["cusum"]
+            superiore, inferiore = cusum["valori"]
+            soglia = cusum["limiti"][2]
+            fig_cusum = create_spc_figure(
+                dict(cusum, valori=np.where(superiore >= inferiore, superiore, -inferiore),
+                     limiti=(-soglia, 0.0, soglia)),
+                "Purezza - CUSUM (C+ sopra, C- sotto lo zero)", punti_max, colore="#FECB52")
+            
+            fig_c = create_spc_figure(carte["c"], "Guasti settimanali - carta c (Poisson)", punti_max,
+                                      formato=".0f", colore="#636EFA")
+            figure = [ottimizza_figura(fig) for fig in (fig_xbar, fig_r, fig_ewma, fig_cusum, fig_c)]
+            
+            schede = [dbc.Col(create_spc_allarme_card(carta, riepilogo[carta]), xs=12, sm=6, lg=True,
+                              className="mb-3") for carta in CARTE_SPC]
+        
+        return figure + [schede]
+    except PreventUpdate:
+        raise
+    except Exception as e:
+        print(f"Errore controllo statistico: {str(e)}")
+        empty_fig = go.Figure()
+        empty_fig.add_annotation(text=f"Errore: {str(e)}")
+        empty_fig.update_layout(template="plotly_dark")
+        return [empty_fig] * 5 + [html.Div(f"Errore: {str(e)}")]
+
+
+# Guasti attesi nei prossimi giorni: i tassi per riga sono già calcolati, qui solo somme e quantili
+@app.callback(
+    [Output("guasti-rischio", "figure"),
+     Output("guasti-riepilogo", "children")],
+    [Input("guasti-orizzonte", "value"),
+     Input("viewport-width", "data")],
+    prevent_initial_call=False
+)
+@strumenta
+@profila
+def update_rischio_guasti(orizzonte, larghezza=None):
+    try:
+        with fase("load"):
+            rischio = get_rischio_guasti()
+        
+        if len(rischio) == 0 or rischio.modello is None:
+            empty_fig = go.Figure()
+            empty_fig.add_annotation(text="Nessun dato disponibile")
+            empty_fig.update_layout(template="plotly_dark")
+            return empty_fig, html.Div("Nessun dato disponibile")
+        
+        with fase("fit"):
+            orizzonte = int(orizzonte or 30)
+            attesi, inferiore, superiore, probabilita = rischio.prevedi(orizzonte)
+            tasso = rischio.tasso_giornaliero()
+            giorni, osservati, attesi_giorno = get_guasti_giornalieri()
+        registra_righe(len(giorni))
+        
+        with fase("figure"):
+            # Grafico in colonna lg=8: due terzi della finestra sugli schermi larghi
+            punti_max = punti_disegnabili(larghezza, 2 / 3 if larghezza_colonna_lg(larghezza) < 1 else 1.0)
+            fig = go.Figure()
+            traccia, _ = traccia_temporale(
+                giorni, osservati, punti_max, mode="markers", name="Guasti osservati",
+                marker=dict(color="#AB63FA", size=5),
+                hovertemplate="%{x|%d/%m/%Y}: %{y:.0f} guasti<extra></extra>"
+            )
+            fig.add_trace(traccia)
+            traccia, _ = traccia_temporale(
+                giorni, attesi_giorno, punti_max, mode="lines", name="Attesi dal modello",
+                line=dict(color="#FFA15A", width=1.5),
+                hovertemplate="%{x|%d/%m/%Y}: %{y:.2f} attesi<extra></extra>"
+            )
+            fig.add_trace(traccia)
+            
+            # Prossimi giorni: tasso recente costante con l'intervallo all'80% del totale
+            futuri = pd.date_range(pd.Timestamp(giorni[-1]) + timedelta(days=1), periods=orizzonte, freq="D")
+            fig.add_trace(go.Scatter(
+                x=futuri, y=np.full(orizzonte, tasso), mode="lines", name="Previsione",
+                line=dict(color="#FFA15A", width=2, dash="dash"),
+                hovertemplate="%{x|%d/%m/%Y}: %{y:.2f} attesi<extra></extra>"
+            ))
+            fig.update_layout(
+                title="Guasti giornalieri: osservati e attesi",
+                template="plotly_dark",
+                height=380,
+                margin=dict(l=60, r=30, t=60, b=40),
+                yaxis_title="Guasti al giorno",
+                legend=dict(orientation="h", y=-0.15),
+                hovermode="closest"
+            )
+            
+            coefficienti = rischio.modello.coefficienti()
+            coefficienti = coefficienti.reindex(coefficienti["z"].abs().sort_values(ascending=False).index)
+            riepilogo = dbc.Card([
+                dbc.CardBody([
+                    html.H5(f"Prossimi {orizzonte} giorni", className="mb-3"),
+                    html.H3(f"{attesi:.1f} guasti attesi", className="mb-1"),
+                    html.Small(f"Intervallo 80%: {inferiore:.0f} – {superiore:.0f} guasti", className="text-muted d-block"),
+                    html.Small(f"Probabilità di almeno un guasto: {probabilita * 100:.1f}%", className="text-muted d-block mb-3"),
+                    html.H6("Effetto di +1 deviazione standard sul tasso", className="mt-2"),
+                    dbc.Table([
+                        html.Thead(html.Tr([html.Th("Fattore"), html.Th("Tasso"), html.Th("z")])),
+                        html.Tbody([
+                            html.Tr([
+                                html.Td(riga.covariata),
+                                html.Td(f"{(riga.rapporto_tassi - 1) * 100:+.1f}%"),
+                                html.Td(f"{riga.z:+.1f}", className="fw-bold" if abs(riga.z) >= 2 else "text-muted")
+                            ]) for riga in coefficienti.itertuples()
+                        ])
+                    ], bordered=False, hover=True, size="sm", className="mb-0"),
+                    html.Small(f"Stimato su {rischio.modello.righe_addestramento:,} righe; |z| ≥ 2 = effetto significativo",
+                               className="text-muted")
+                ])
+            ])
+        
+        return ottimizza_figura(fig), riepilogo
+    except PreventUpdate:
+        raise
+    except Exception as e:
+        print(f"Errore rischio guasti: {str(e)}")
+        empty_fig = go.Figure()
+        empty_fig.add_annotation(text=f"Errore: {str(e)}")
+        empty_fig.update_layout(template="plotly_dark")
+        return empty_fig, html.Div(f"Errore: {str(e)}")
+
+
 # Callback per mostrare i valori del filtro purezza formattati
+# (drag_value aggiorna l'etichetta durante il trascinamento senza ricalcolare i grafici)
 @app.callback(
     Output("purezza-display", "children"),
-    Input("purezza-range", "value")
+    Input("purezza-range", "drag_value"),
+    State("purezza-range", "value")
 )
-def update_purezza_display(value):
+def update_purezza_display(drag_value, value):
     """Mostra i valori della purezza con 4 decimali."""
+    value = drag_value or value
     if value is None:
         return ""
     return f"{value[0]:.4f} - {value[1]:.4f}"
@@ -1973,10 +3999,12 @@ def update_purezza_display(value):
 # Callback per mostrare i valori del filtro profitto formattati in k
 @app.callback(
     Output("profitto-display", "children"),
-    Input("profitto-range", "value")
+    Input("profitto-range", "drag_value"),
+    State("profitto-range", "value")
 )
-def update_profitto_display(value):
+def update_profitto_display(drag_value, value):
     """Mostra i valori del profitto in formato k arrotondati."""
+    value = drag_value or value
     if value is None:
         return ""
     min_val = round(value[0] / 100) / 10
@@ -2010,6 +4038,19 @@ def close_welcome_modal(n_clicks, is_open, welcome_shown):
     return True, False
 
 
+segna_fase_avvio("callback")
+
+# Simulatore e precaricamento partono solo ora che l'app è completa
+avvia_lavori_differiti()
+if REPORT_AVVIO:
+    stampa_report_avvio()
+elif get_report_avvio()["oltre_budget"]:
+    print(f"[Avvio] Attenzione: import oltre il budget di {IMPORT_BUDGET_MS:.0f} ms")
+    stampa_report_avvio()
+
+
 # Avvio del server dell'applicazione
 if __name__ == "__main__":
+    # Il processo figlio del reloader legge il CSV: deve essere già completo
+    attendi_dati()
     app.run(debug=True)
@@ -0,0 +1,217 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from e_lithium_spc import _Colonna, _Impronta
+
+
+# ==========================================================
+#  Manutenzione predittiva: regressione di Poisson dei guasti
+#  sulle condizioni ambientali e produttive, stimata con IRLS
+#  su tutto lo storico e applicata alle righe nuove
+# ==========================================================
+#  Il modello è log(E[guasti]) = b0 + b . z, con z le covariate
+#  standardizzate. Il tasso atteso di ogni riga viene calcolato
+#  una sola volta, all'accodamento; la stima dei coefficienti è
+#  ripetuta solo quando lo storico è cresciuto abbastanza, partendo
+#  dai coefficienti precedenti (poche iterazioni).
+
+# Covariate del modello: (colonna, descrizione)
+COVARIATE = (
+    ("temperatura_C", "Temperatura"),
+    ("umidita_%", "Umidità"),
+    ("CO2_ppm", "CO₂"),
+    ("polveri_ug_m3", "Polveri"),
+    ("livello_falda_m", "Livello falda"),
+    ("litio_estratto_kg", "Produzione"),
+    ("energia_kWh", "Energia"),
+)
+
+ITERAZIONI_IRLS = 25
+TOLLERANZA_IRLS = 1e-8
+QUOTA_RIADDESTRAMENTO = 0.05  # nuova stima quando le righe crescono del 5%
+FINESTRA_TASSO_GIORNI = 30  # giorni recenti da cui si ricava il tasso atteso
+NANOSECONDI_GIORNO = 86_400 * 10**9
+
+
+def regressione_poisson(X, y, beta_iniziale=None, iterazioni=ITERAZIONI_IRLS, tolleranza=TOLLERANZA_IRLS):
+    """Coefficienti, covarianza e iterazioni della regressione di Poisson (IRLS, legame log).
+
+    X contiene già la colonna dell'intercetta. Ogni iterazione è un passo di Newton
+    b += (X' W X)^-1 X' (y - mu) con W = diag(mu), calcolato in blocco su tutte le righe.
+    """
+    if beta_iniziale is None:
+        beta = np.zeros(X.shape[1])
+        beta[0] = np.log(max(y.mean(), 1e-12))
+    else:
+        beta = np.array(beta_iniziale, dtype=np.float64)
+    informazione = np.eye(X.shape[1])
+    for iterazione in range(1, iterazioni + 1):
+        mu = np.exp(np.clip(X @ beta, -30, 30))
+        informazione = (X * mu[:, None]).T @ X
+        passo = np.linalg.solve(informazione + 1e-9 * np.eye(len(beta)), X.T @ (y - mu))
+        beta = beta + passo
+        if np.max(np.abs(passo)) < tolleranza:
+            break
+    return beta, np.linalg.pinv(informazione), iterazione
+
+
+class ModelloGuasti:
+    """Regressione di Poisson dei guasti per riga sulle covariate disponibili nel dataset"""
+
+    def __init__(self, covariate):
+        self.covariate = list(covariate)
+        self.media = self.scala = self.beta = self.covarianza = None
+        self.dispersione = 1.0
+        self.righe_addestramento = 0
+        self.iterazioni = 0
+
+    def matrice(self, df):
+        """Covariate standardizzate con l'intercetta (valori mancanti alla media)"""
+        z = (df[self.covariate].to_numpy(dtype=np.float64) - self.media) / self.scala
+        return np.column_stack((np.ones(len(df)), np.nan_to_num(z)))
+
+    def addestra(self, df, beta_iniziale=None):
+        valori = df[self.covariate].to_numpy(dtype=np.float64)
+        self.media = np.nanmean(valori, axis=0)
+        scala = np.nanstd(valori, axis=0)
+        self.scala = np.where(scala > 0, scala, 1.0)
+        X = self.matrice(df)
+        y = df["guasti"].fillna(0).to_numpy(dtype=np.float64)
+        self.beta, self.covarianza, self.iterazioni = regressione_poisson(X, y, beta_iniziale)
+        # Sovradispersione (chi quadro di Pearson / gradi di libertà): allarga gli intervalli
+        mu = np.exp(np.clip(X @ self.beta, -30, 30))
+        gradi = max(len(y) - len(self.beta), 1)
+        self.dispersione = max(float(np.sum((y - mu) ** 2 / mu) / gradi), 1.0)
+        self.righe_addestramento = len(df)
+        return self
+
+    def tassi(self, df):
+        """Guasti attesi per riga"""
+        return np.exp(np.clip(self.matrice(df) @ self.beta, -30, 30))
+
+    def coefficienti(self):
+        """Rapporto tra i tassi per +1 deviazione standard di ogni covariata, con statistica z"""
+        errori = np.sqrt(np.maximum(np.diag(self.covarianza), 0) * self.dispersione)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = self.beta / errori
+        nomi = dict(COVARIATE)
+        return pd.DataFrame({
+            "covariata": [nomi.get(c, c) for c in self.covariate],
+            "rapporto_tassi": np.exp(self.beta[1:]),
+            "z": z[1:],
+        })
+
+
+class RischioGuasti:
+    """Tassi di guasto attesi per riga, aggiornabili per accodamento.
+
+    Le righe accodate vengono solo valutate con il modello corrente; il modello è
+    stimato di nuovo (ripartendo dai coefficienti precedenti) quando lo storico
+    supera di `quota_riaddestramento` le righe dell'ultima stima.
+    """
+
+    def __init__(self, quota_riaddestramento=QUOTA_RIADDESTRAMENTO):
+        self.quota_riaddestramento = quota_riaddestramento
+        self.modello = None
+        self._tempi = _Colonna(np.int64)
+        self._tassi = _Colonna(np.float64)
+        self._guasti = _Colonna(np.float64)
+        self._primo_tempo = None
+        self._impronta = None  # colonne delle righe elaborate, per riconoscere uno storico riscritto
+        self.ultimo_tempo = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tempi)
+
+    def _colonne(self, df, colonna_data):
+        """Colonne da cui dipendono i tassi: date, guasti e covariate del modello"""
+        return (df[colonna_data].to_numpy(dtype="datetime64[ns]").astype(np.int64),
+                df["guasti"].to_numpy(dtype=np.float64),
+                *(df[c].to_numpy(dtype=np.float64) for c in self.modello.covariate))
+
+    def estende(self, df, colonna_data="data"):
+        """True se il DataFrame è questo storico più righe accodate.
+
+        Gli estremi scartano subito gli storici diversi; l'impronta delle righe già
+        elaborate riconosce anche valori riscritti con le stesse date agli estremi.
+        """
+        righe = len(self)
+        if righe == 0 or len(df) < righe:
+            return False
+        date = df[colonna_data]
+        if (pd.Timestamp(date.iloc[0]).value != self._primo_tempo
+                or pd.Timestamp(date.iloc[righe - 1]).value != self.ultimo_tempo
+                or any(c not in df for c in self.modello.covariate)):
+            return False
+        return self._impronta.corrisponde(*self._colonne(df.iloc[:righe], colonna_data))
+
+    def aggiorna(self, df, colonna_data="data"):
+        """Allinea i tassi al DataFrame: accoda le righe nuove o ricalcola tutto se lo storico è cambiato"""
+        with self._lock:
+            if not self.estende(df, colonna_data):
+                self._tempi, self._tassi, self._guasti = _Colonna(np.int64), _Colonna(np.float64), _Colonna(np.float64)
+                self.modello = None
+            nuove = df.iloc[len(self):]
+            if len(df) == 0:
+                return
+            precedente = self.modello
+            if precedente is None or len(df) >= precedente.righe_addestramento * (1 + self.quota_riaddestramento):
+                covariate = [c for c, _ in COVARIATE if c in df]
+                beta = precedente.beta if precedente is not None and precedente.covariate == covariate else None
+                self.modello = ModelloGuasti(covariate).addestra(df, beta)
+                # Nuovi coefficienti: i tassi di tutte le righe restano coerenti con il modello
+                self._tassi = _Colonna(np.float64)
+                self._tassi.accoda(self.modello.tassi(df))
+                # Le covariate possono essere cambiate: impronta ricalcolata su tutte le righe
+                self._impronta = _Impronta(2 + len(covariate))
+                self._impronta.accoda(*self._colonne(df, colonna_data))
+            else:
+                self._tassi.accoda(self.modello.tassi(nuove))
+                self._impronta.accoda(*self._colonne(nuove, colonna_data))
+            tempi = nuove[colonna_data].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+            self._tempi.accoda(tempi)
+            self._guasti.accoda(nuove["guasti"].fillna(0).to_numpy(dtype=np.float64))
+            self._primo_tempo = int(self._tempi.vista()[0])
+            self.ultimo_tempo = int(tempi[-1]) if len(tempi) else self.ultimo_tempo
+
+    def tasso_giornaliero(self, giorni=FINESTRA_TASSO_GIORNI):
+        """Guasti attesi al giorno, dalla media dei tassi degli ultimi `giorni` giorni"""
+        tempi = self._tempi.vista()
+        inizio = self.ultimo_tempo - giorni * NANOSECONDI_GIORNO
+        if inizio >= tempi[0]:
+            da, giorni_coperti = np.searchsorted(tempi, inizio, side="right"), giorni
+        else:
+            # Storico più corto della finestra: tutti i giorni dal primo (incluso)
+            da, giorni_coperti = 0, (self.ultimo_tempo - tempi[0]) / NANOSECONDI_GIORNO + 1
+        return float(self._tassi.vista()[da:].sum() / giorni_coperti)
+
+    def prevedi(self, giorni):
+        """Guasti attesi nei prossimi `giorni` giorni: (attesi, inferiore, superiore, P(almeno uno)).
+
+        L'intervallo all'80% usa la Poisson o, con sovradispersione, la binomiale
+        negativa con la stessa media e varianza dispersione x media.
+        """
+        from scipy import stats
+        attesi = self.tasso_giornaliero() * giorni
+        dispersione = self.modello.dispersione
+        if dispersione > 1.0 + 1e-6 and attesi > 0:
+            distribuzione = stats.nbinom(attesi / (dispersione - 1), 1 / dispersione)
+        else:
+            distribuzione = stats.poisson(attesi)
+        inferiore, superiore = distribuzione.ppf([0.1, 0.9])
+        return attesi, float(inferiore), float(superiore), float(1 - distribuzione.pmf(0))
+
+    def giornaliero(self):
+        """Guasti osservati e attesi per giorno di calendario: (giorni, osservati, attesi)"""
+        tempi = self._tempi.vista()
+        if len(tempi) == 0:
+            return np.empty(0, "datetime64[D]"), np.empty(0), np.empty(0)
+        giorno = tempi // NANOSECONDI_GIORNO
+        posizioni = giorno - giorno[0]
+        osservati = np.bincount(posizioni, weights=self._guasti.vista())
+        attesi = np.bincount(posizioni, weights=self._tassi.vista())
+        giorni = (giorno[0] + np.arange(len(osservati))).astype("datetime64[D]")
+        return giorni, osservati, attesi
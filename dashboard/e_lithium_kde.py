@@ -0,0 +1,64 @@
+import numpy as np
+
+
+# ==========================================================
+#  Stima della densità a nucleo gaussiano (KDE) su griglia:
+#  binning lineare dei dati e convoluzione con il nucleo via
+#  FFT, O(n + m log m) invece di O(n m) della KDE esatta
+# ==========================================================
+#  Ogni valore distribuisce il suo peso tra i due nodi della
+#  griglia più vicini (binning lineare); la densità sui nodi è la
+#  convoluzione dei pesi con il nucleo campionato sulla griglia.
+#  Con passo di griglia molto più piccolo della banda l'errore
+#  rispetto alla KDE esatta è trascurabile per un grafico.
+
+PUNTI_GRIGLIA = 512
+ESTENSIONE_NUCLEO = 4.0  # il nucleo è troncato a 4 bande
+
+
+def banda_scott(valori):
+    """Banda con la regola di Scott (come scipy.stats.gaussian_kde): sigma n^(-1/5)"""
+    return float(np.std(valori, ddof=1) * len(valori) ** (-1 / 5))
+
+
+def kde_binned(valori, punti=PUNTI_GRIGLIA, banda=None):
+    """Densità stimata su una griglia regolare: (griglia, densità), None con meno di due valori distinti"""
+    valori = np.asarray(valori, dtype=np.float64)
+    valori = valori[np.isfinite(valori)]
+    if len(valori) < 2:
+        return None
+    banda = banda or banda_scott(valori)
+    if not banda > 0:
+        return None
+
+    # Griglia estesa di 3 bande oltre gli estremi, per non troncare le code
+    inizio, fine = valori.min() - 3 * banda, valori.max() + 3 * banda
+    passo = (fine - inizio) / (punti - 1)
+    posizioni = (valori - inizio) / passo
+    sinistro = np.minimum(posizioni.astype(np.int64), punti - 2)
+    frazione = posizioni - sinistro
+    pesi = (np.bincount(sinistro, weights=1 - frazione, minlength=punti)
+            + np.bincount(sinistro + 1, weights=frazione, minlength=punti))
+
+    # Nucleo gaussiano campionato sui nodi entro ESTENSIONE_NUCLEO bande
+    semiampiezza = min(int(np.ceil(ESTENSIONE_NUCLEO * banda / passo)), punti - 1)
+    scarti = np.arange(-semiampiezza, semiampiezza + 1) * passo
+    nucleo = np.exp(-0.5 * (scarti / banda) ** 2) / (banda * np.sqrt(2 * np.pi))
+
+    # Convoluzione lineare con FFT su una lunghezza senza sovrapposizioni circolari
+    lunghezza = punti + len(nucleo) - 1
+    dimensione = 1 << (lunghezza - 1).bit_length()
+    convoluzione = np.fft.irfft(np.fft.rfft(pesi, dimensione) * np.fft.rfft(nucleo, dimensione), dimensione)
+    densita = np.maximum(convoluzione[semiampiezza:semiampiezza + punti], 0.0) / len(valori)
+    return inizio + passo * np.arange(punti), densita
+
+
+def kde_logaritmica(valori, punti=PUNTI_GRIGLIA):
+    """KDE dei logaritmi riportata sulla scala originale (f(x) = g(log x) / x), per dati positivi"""
+    valori = np.asarray(valori, dtype=np.float64)
+    risultato = kde_binned(np.log(valori[valori > 0]), punti)
+    if risultato is None:
+        return None
+    griglia, densita = risultato
+    x = np.exp(griglia)
+    return x, densita / x
@@ -0,0 +1,221 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# ==========================================================
+#  Strumentazione delle callback della dashboard E-Lithium
+#  Tempi, fasi, CPU, payload e righe elaborate esportati in
+#  formato testuale Prometheus (nessun servizio esterno)
+# ==========================================================
+#  Le metriche sono per processo: con più worker gunicorn ogni
+#  worker espone le proprie e lo scraper le aggrega.
+
+BUCKET_SECONDI = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKET_BYTE = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+BUCKET_RIGHE = (10, 100, 1e3, 1e4, 1e5, 1e6, 1e7)
+
+DESCRIZIONI = {
+    "e_lithium_callback_duration_seconds": ("histogram", "Tempo totale (wall) delle callback Dash"),
+    "e_lithium_callback_cpu_seconds": ("histogram", "Tempo CPU del thread impiegato dalle callback"),
+    "e_lithium_callback_phase_seconds": ("histogram", "Tempo esclusivo delle fasi load/filter/fit/figure"),
+    "e_lithium_callback_rows": ("histogram", "Righe del dataset elaborate per chiamata"),
+    "e_lithium_callback_payload_bytes": ("histogram", "Byte JSON prodotti per risposta (prima della compressione)"),
+    "e_lithium_callback_sent_bytes": ("histogram", "Byte trasmessi per risposta (dopo la compressione)"),
+    "e_lithium_callback_total": ("counter", "Chiamate alle callback per esito"),
+}
+
+
+class Istogramma:
+    """Istogramma cumulativo con bucket fissi (semantica Prometheus)"""
+
+    def __init__(self, bucket):
+        self.bucket = tuple(bucket)
+        self.conteggi = [0] * len(self.bucket)
+        self.somma = 0.0
+        self.totale = 0
+
+    def osserva(self, valore):
+        for i, limite in enumerate(self.bucket):
+            if valore <= limite:
+                self.conteggi[i] += 1
+        self.somma += valore
+        self.totale += 1
+
+
+class RegistroMetriche:
+    """Raccolta thread-safe di istogrammi e contatori etichettati"""
+
+    def __init__(self):
+        self._istogrammi = {}
+        self._contatori = {}
+        self._lock = threading.Lock()
+
+    def osserva(self, nome, valore, bucket=BUCKET_SECONDI, **etichette):
+        chiave = (nome, tuple(sorted(etichette.items())))
+        with self._lock:
+            istogramma = self._istogrammi.get(chiave)
+            if istogramma is None:
+                istogramma = self._istogrammi[chiave] = Istogramma(bucket)
+            istogramma.osserva(valore)
+
+    def incrementa(self, nome, valore=1, **etichette):
+        chiave = (nome, tuple(sorted(etichette.items())))
+        with self._lock:
+            self._contatori[chiave] = self._contatori.get(chiave, 0) + valore
+
+    def azzera(self):
+        with self._lock:
+            self._istogrammi.clear()
+            self._contatori.clear()
+
+    def esporta_prometheus(self):
+        """Serializza tutte le metriche nel formato di esposizione testuale Prometheus 0.0.4"""
+        with self._lock:
+            istogrammi = sorted(self._istogrammi.items())
+            contatori = sorted(self._contatori.items())
+
+        righe = []
+        dichiarate = set()
+
+        def intestazione(nome):
+            if nome not in dichiarate:
+                tipo, descrizione = DESCRIZIONI.get(nome, ("untyped", nome))
+                righe.append(f"# HELP {nome} {descrizione}")
+                righe.append(f"# TYPE {nome} {tipo}")
+                dichiarate.add(nome)
+
+        for (nome, etichette), istogramma in istogrammi:
+            intestazione(nome)
+            for limite, conteggio in zip(istogramma.bucket, istogramma.conteggi):
+                righe.append(f"{nome}_bucket{_etichette(etichette, le=_numero(limite))} {conteggio}")
+            righe.append(f"{nome}_bucket{_etichette(etichette, le='+Inf')} {istogramma.totale}")
+            righe.append(f"{nome}_sum{_etichette(etichette)} {istogramma.somma!r}")
+            righe.append(f"{nome}_count{_etichette(etichette)} {istogramma.totale}")
+
+        for (nome, etichette), valore in contatori:
+            intestazione(nome)
+            righe.append(f"{nome}{_etichette(etichette)} {valore}")
+
+        righe.extend(_metriche_processo())
+        return "\n".join(righe) + "\n"
+
+
+def _numero(valore):
+    return repr(float(valore))
+
+
+def _escape(valore):
+    return str(valore).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etichette(etichette, **extra):
+    coppie = list(etichette) + list(extra.items())
+    if not coppie:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in coppie) + "}"
+
+
+def _metriche_processo():
+    """Risorse del processo: CPU totale e picco di memoria residente"""
+    righe = [
+        "# HELP process_cpu_seconds_total Tempo CPU totale del processo",
+        "# TYPE process_cpu_seconds_total counter",
+        f"process_cpu_seconds_total {time.process_time()!r}",
+    ]
+    if resource is not None:
+        # ru_maxrss è in kB su Linux
+        picco = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        righe += [
+            "# HELP process_resident_memory_max_bytes Picco di memoria residente del processo",
+            "# TYPE process_resident_memory_max_bytes gauge",
+            f"process_resident_memory_max_bytes {picco}",
+        ]
+    return righe
+
+
+registro = RegistroMetriche()
+
+# Contesto della callback in esecuzione: nome, pila delle fasi aperte e righe elaborate
+_contesto = ContextVar("e_lithium_callback", default=None)
+
+
+def strumenta_callback(func=None, *, interruzioni=()):
+    """Decoratore: misura tempo wall/CPU, fasi e righe elaborate di una callback.
+
+    Le eccezioni in `interruzioni` (es. PreventUpdate) sono conteggiate con
+    status="prevented" e non come errori.
+    """
+    if func is None:
+        return functools.partial(strumenta_callback, interruzioni=interruzioni)
+
+    nome = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stato = {"callback": nome, "fasi": [], "righe": 0}
+        token = _contesto.set(stato)
+        esito = "ok"  # ok | prevented | error
+        inizio = time.perf_counter()
+        inizio_cpu = time.thread_time()
+        try:
+            return func(*args, **kwargs)
+        except interruzioni:
+            esito = "prevented"
+            raise
+        except Exception:
+            esito = "error"
+            raise
+        finally:
+            _contesto.reset(token)
+            registro.osserva("e_lithium_callback_duration_seconds", time.perf_counter() - inizio, callback=nome)
+            registro.osserva("e_lithium_callback_cpu_seconds", time.thread_time() - inizio_cpu, callback=nome)
+            if stato["righe"]:
+                registro.osserva("e_lithium_callback_rows", stato["righe"], bucket=BUCKET_RIGHE, callback=nome)
+            registro.incrementa("e_lithium_callback_total", callback=nome, status=esito)
+    return wrapper
+
+
+@contextmanager
+def fase(nome):
+    """Misura il tempo esclusivo di una fase (load, filter, fit, figure) della callback corrente.
+
+    Le fasi annidate vengono sottratte dalla fase che le contiene, così la somma
+    delle fasi non supera mai il tempo totale della callback.
+    """
+    stato = _contesto.get()
+    if stato is None:
+        yield
+        return
+    voce = [nome, 0.0]  # nome, tempo delle sotto-fasi
+    stato["fasi"].append(voce)
+    inizio = time.perf_counter()
+    try:
+        yield
+    finally:
+        durata = time.perf_counter() - inizio
+        stato["fasi"].pop()
+        if stato["fasi"]:
+            stato["fasi"][-1][1] += durata
+        registro.osserva("e_lithium_callback_phase_seconds", max(durata - voce[1], 0.0),
+                         callback=stato["callback"], phase=nome)
+
+
+def registra_righe(numero):
+    """Somma le righe elaborate dalla callback corrente"""
+    stato = _contesto.get()
+    if stato is not None:
+        stato["righe"] += int(numero)
+
+
+def registra_payload(callback, byte_json, byte_inviati):
+    """Registra la dimensione della risposta di una callback"""
+    registro.osserva("e_lithium_callback_payload_bytes", byte_json, bucket=BUCKET_BYTE, callback=callback)
+    registro.osserva("e_lithium_callback_sent_bytes", byte_inviati, bucket=BUCKET_BYTE, callback=callback)
@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+
+
+# ==========================================================
+#  Piramide di aggregazioni temporali (giorno, settimana,
+#  mese, trimestre) con somma/media/minimo/massimo per
+#  metrica, costruita una volta per versione del dataset
+# ==========================================================
+#  I grafici scelgono il livello in base all'intervallo visibile:
+#  il numero di punti inviati resta limitato qualunque sia la
+#  lunghezza della serie.
+
+# (codice, periodo pandas per l'inizio del bucket, descrizione)
+LIVELLI = (
+    ("D", "D", "giornaliera"),
+    ("W", "W-SUN", "settimanale"),  # settimane da lunedì a domenica
+    ("M", "M", "mensile"),
+    ("Q", "Q-DEC", "trimestrale"),
+)
+DESCRIZIONI_LIVELLI = {codice: descrizione for codice, _, descrizione in LIVELLI}
+GREZZI = "grezzi"
+
+# Le righe grezze restano preferite finché la riduzione LTTB lavora su pochi punti
+FATTORE_GREZZI = 4
+
+
+def _inizi_bucket(codici):
+    """Posizioni in cui inizia un nuovo bucket (codici ordinati)"""
+    return np.concatenate(([0], np.flatnonzero(np.diff(codici)) + 1))
+
+
+def _riduci(valori, inizi, conteggi):
+    """Somma, minimo, massimo e valori validi di ogni bucket (NaN ignorati)"""
+    validi = ~np.isnan(valori)
+    if validi.all():
+        return (np.add.reduceat(valori, inizi), np.minimum.reduceat(valori, inizi),
+                np.maximum.reduceat(valori, inizi), conteggi)
+    return (np.add.reduceat(np.where(validi, valori, 0.0), inizi), np.fmin.reduceat(valori, inizi),
+            np.fmax.reduceat(valori, inizi), np.add.reduceat(validi.astype(np.int64), inizi))
+
+
+class PiramideAggregazioni:
+    """Aggregazioni per livello temporale di tutte le metriche numeriche del dataset.
+
+    Ogni livello è un DataFrame con la colonna della data (inizio del bucket),
+    `conteggio` (righe grezze) e per ogni metrica le colonne `<metrica>_sum`,
+    `_mean`, `_min` e `_max`. I livelli superiori sono ricavati da quello
+    giornaliero, senza ripassare sulle righe grezze. `derivate` aggiunge metriche
+    calcolate riga per riga ({nome: funzione(df) -> array}) senza toccare il DataFrame.
+    """
+
+    def __init__(self, df, colonna_data="data", metriche=None, derivate=None):
+        if not df[colonna_data].is_monotonic_increasing:
+            df = df.sort_values(colonna_data, kind="stable")
+        self.colonna_data = colonna_data
+        self.grezzi = df
+        self.metriche = list(metriche) if metriche is not None else [
+            c for c in df.select_dtypes("number").columns if c != colonna_data]
+        self._date_grezze = df[colonna_data].to_numpy(dtype="datetime64[ns]")
+        self.livelli = {}
+
+        if len(df) == 0:
+            return
+
+        # Livello giornaliero dalle righe grezze (ordinate: bucket contigui)
+        giorni = self._date_grezze.astype("datetime64[D]")
+        inizi = _inizi_bucket(giorni.astype(np.int64))
+        conteggi = np.diff(np.append(inizi, len(df)))
+        aggregati = {}
+        for metrica in self.metriche:
+            aggregati[metrica] = _riduci(df[metrica].to_numpy(dtype=np.float64), inizi, conteggi)
+        for nome, funzione in (derivate or {}).items():
+            aggregati[nome] = _riduci(np.asarray(funzione(df), dtype=np.float64), inizi, conteggi)
+        self.metriche += [nome for nome in (derivate or {}) if nome not in self.metriche]
+        self.livelli["D"] = self._componi(giorni[inizi].astype("datetime64[ns]"), conteggi, aggregati)
+
+        # Settimane, mesi e trimestri ricombinando i bucket giornalieri
+        giornaliero = self.livelli["D"]
+        date_giorni = pd.DatetimeIndex(giornaliero[colonna_data])
+        for codice, periodo, _ in LIVELLI[1:]:
+            periodi = date_giorni.to_period(periodo)
+            inizi = _inizi_bucket(periodi.asi8)
+            conteggi = np.add.reduceat(giornaliero["conteggio"].to_numpy(), inizi)
+            aggregati = {}
+            for metrica in self.metriche:
+                # Conteggi per metrica solo se nel dataset ci sono valori mancanti
+                validi = conteggi
+                if f"{metrica}_count" in giornaliero:
+                    validi = np.add.reduceat(giornaliero[f"{metrica}_count"].to_numpy(), inizi)
+                aggregati[metrica] = (
+                    np.add.reduceat(giornaliero[f"{metrica}_sum"].to_numpy(), inizi),
+                    np.fmin.reduceat(giornaliero[f"{metrica}_min"].to_numpy(), inizi),
+                    np.fmax.reduceat(giornaliero[f"{metrica}_max"].to_numpy(), inizi),
+                    validi,
+                )
+            self.livelli[codice] = self._componi(
+                periodi[inizi].start_time.to_numpy(dtype="datetime64[ns]"), conteggi, aggregati)
+
+    def _componi(self, date, conteggi, aggregati):
+        colonne = {self.colonna_data: date, "conteggio": conteggi}
+        for metrica, (somma, minimo, massimo, validi) in aggregati.items():
+            colonne[f"{metrica}_sum"] = somma
+            with np.errstate(invalid="ignore", divide="ignore"):
+                colonne[f"{metrica}_mean"] = somma / validi
+            colonne[f"{metrica}_min"] = minimo
+            colonne[f"{metrica}_max"] = massimo
+            if validi is not conteggi:
+                colonne[f"{metrica}_count"] = validi
+        return pd.DataFrame(colonne)
+
+    @property
+    def data_min(self):
+        return pd.Timestamp(self._date_grezze[0]) if len(self._date_grezze) else None
+
+    @property
+    def data_max(self):
+        return pd.Timestamp(self._date_grezze[-1]) if len(self._date_grezze) else None
+
+    def _posizioni(self, livello, inizio, fine):
+        """Intervallo di righe [i, j) del livello compreso tra inizio e fine (inclusi)"""
+        if livello == GREZZI:
+            date = self._date_grezze
+        else:
+            date = self.livelli[livello][self.colonna_data].to_numpy()
+        i = 0 if inizio is None else np.searchsorted(date, np.datetime64(inizio, "ns"), side="left")
+        j = len(date) if fine is None else np.searchsorted(date, np.datetime64(fine, "ns"), side="right")
+        return i, max(i, j)
+
+    def conta(self, livello, inizio=None, fine=None):
+        """Numero di punti del livello nell'intervallo (ricerca binaria, costo costante)"""
+        i, j = self._posizioni(livello, inizio, fine)
+        return j - i
+
+    def righe(self, livello, inizio=None, fine=None):
+        """Righe (grezze o aggregate) del livello nell'intervallo"""
+        i, j = self._posizioni(livello, inizio, fine)
+        tabella = self.grezzi if livello == GREZZI else self.livelli[livello]
+        return tabella.iloc[i:j]
+
+    def seleziona(self, inizio, fine, punti_max):
+        """Livello più fine adatto all'intervallo visibile e relative righe.
+
+        Le righe grezze sono usate finché non superano FATTORE_GREZZI volte i punti
+        disegnabili (poi interviene LTTB); altrimenti il primo livello aggregato
+        che resta entro i punti disegnabili, al limite quello trimestrale.
+        """
+        if not self.livelli or self.conta(GREZZI, inizio, fine) <= punti_max * FATTORE_GREZZI:
+            return GREZZI, self.righe(GREZZI, inizio, fine)
+        for codice, _, _ in LIVELLI:
+            if self.conta(codice, inizio, fine) <= punti_max:
+                return codice, self.righe(codice, inizio, fine)
+        return LIVELLI[-1][0], self.righe(LIVELLI[-1][0], inizio, fine)
+
+
+def _estremo(a, b, funzione):
+    return b if a is None else a if b is None else funzione(a, b)
+
+
+def interseca_intervalli(primo, secondo):
+    """Intersezione di due intervalli (inizio, fine).
+
+    None indica un intervallo illimitato; un estremo None è aperto da quel lato.
+    """
+    if primo is None:
+        return secondo
+    if secondo is None:
+        return primo
+    return (_estremo(primo[0], secondo[0], max), _estremo(primo[1], secondo[1], min))
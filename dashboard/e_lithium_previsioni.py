@@ -0,0 +1,179 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+# ==========================================================
+#  Previsioni delle serie giornaliere (metodo di Holt con
+#  trend smorzato), stimate insieme su tutte le serie e su
+#  tutta la griglia dei parametri, aggiornabili giorno per giorno
+# ==========================================================
+#  Ogni passo della ricorsione aggiorna in blocco una matrice
+#  serie x combinazioni (alfa, beta): la ricerca dei parametri
+#  costa un solo passaggio sui giorni. Lo stato finale di ogni
+#  combinazione viene conservato, quindi i nuovi giorni
+#  proseguono la ricorsione senza ripartire dall'inizio.
+
+# Serie previste: (colonna, aggregazione giornaliera, descrizione, unità)
+SERIE_PREVISTE = (
+    ("litio_estratto_kg", "sum", "Litio estratto", "kg"),
+    ("prezzo_litio_eur_kg", "mean", "Prezzo litio", "€/kg"),
+    ("costi_eur", "sum", "Costi", "€"),
+    ("profitto_eur", "sum", "Profitto", "€"),
+)
+ORIZZONTI = (7, 30, 90)
+
+GRIGLIA_ALFA = np.linspace(0.05, 0.95, 19)
+GRIGLIA_BETA = np.array([0.01, 0.02, 0.05, 0.1, 0.2, 0.3])
+SMORZAMENTO = 0.98
+Z_80 = 1.2816  # quantile normale dell'intervallo di previsione all'80%
+
+
+class PrevisoreHolt:
+    """Holt con trend smorzato per più serie giornaliere allineate sullo stesso calendario.
+
+    `aggiorna(primo_giorno, valori)` riceve la matrice giorni x serie (NaN nei giorni
+    mancanti) dall'inizio dello storico: i giorni già elaborati non vengono ripassati.
+    L'ultimo giorno resta provvisorio (può ricevere altre righe) e viene rielaborato
+    al successivo aggiornamento. Per ogni serie si usano i parametri con il minimo
+    errore quadratico di previsione a un passo.
+    """
+
+    def __init__(self, griglia_alfa=GRIGLIA_ALFA, griglia_beta=GRIGLIA_BETA, smorzamento=SMORZAMENTO):
+        alfa, beta = np.meshgrid(griglia_alfa, griglia_beta, indexing="ij")
+        self.alfa = alfa.ravel()
+        self.beta = beta.ravel()
+        self.phi = smorzamento
+        self.primo_giorno = None
+        self.giorni = 0
+        self._confermato = None  # stato dopo l'ultimo giorno definitivo
+        self._valori_confermati = None  # giorni definitivi già elaborati, per riconoscere uno storico riscritto
+        self._trend = None
+        self._stato = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.giorni
+
+    @staticmethod
+    def _trend_iniziale(valori):
+        """Trend iniziale dai primi due giorni validi di ogni serie"""
+        serie = valori.shape[1]
+        trend = np.zeros(serie)
+        for s in range(serie):
+            validi = np.flatnonzero(~np.isnan(valori[:, s]))
+            if len(validi) > 1:
+                trend[s] = (valori[validi[1], s] - valori[validi[0], s]) / (validi[1] - validi[0])
+        return trend
+
+    def _stato_iniziale(self, trend):
+        """Stato prima del primo giorno: il livello parte dal primo valore di ogni serie"""
+        serie, combinazioni = len(trend), len(self.alfa)
+        return {
+            "livello": np.full((serie, combinazioni), np.nan),
+            "trend": np.repeat(trend[:, None], combinazioni, axis=1),
+            "sse": np.zeros((serie, combinazioni)),
+            "errori": np.zeros(serie, dtype=np.int64),
+            "giorni": 0,
+        }
+
+    def _prosegui(self, stato, valori):
+        """Ricorsione di Holt sui giorni indicati per tutte le serie e combinazioni insieme"""
+        livello, trend = stato["livello"].copy(), stato["trend"].copy()
+        sse, errori = stato["sse"].copy(), stato["errori"].copy()
+        alfa, beta, phi = self.alfa, self.beta, self.phi
+        for riga in valori:
+            osservati = ~np.isnan(riga)
+            # Il primo valore di una serie inizializza il livello: nessun errore da contare
+            iniziali = osservati & np.isnan(livello[:, 0])
+            contati = (osservati & ~iniziali)[:, None]
+            previsto = livello + phi * trend
+            errore = np.where(contati, riga[:, None] - previsto, 0.0)
+            sse += errore * errore
+            errori += contati[:, 0]
+            nuovo_livello = np.where(iniziali[:, None], riga[:, None], previsto + alfa * errore)
+            trend = np.where(contati, beta * (nuovo_livello - livello) + (1 - beta) * phi * trend,
+                             np.where(iniziali[:, None], trend, phi * trend))
+            livello = nuovo_livello
+        return {"livello": livello, "trend": trend, "sse": sse, "errori": errori,
+                "giorni": stato["giorni"] + len(valori)}
+
+    def _estende(self, primo_giorno, valori, trend):
+        """True se lo storico ricevuto prosegue quello confermato (stessi giorni e stessi valori)"""
+        if self._confermato is None or primo_giorno != self.primo_giorno:
+            return False
+        giorni = self._confermato["giorni"]
+        return (len(valori) >= giorni
+                and np.array_equal(valori[:giorni], self._valori_confermati, equal_nan=True)
+                # Il trend iniziale può dipendere da giorni successivi a quelli confermati
+                and np.array_equal(trend, self._trend))
+
+    def aggiorna(self, primo_giorno, valori):
+        """Allinea il modello allo storico giornaliero (elabora solo i giorni nuovi).
+
+        Se i giorni già confermati sono cambiati (storico riscritto o troncato)
+        la ricorsione riparte dal primo giorno.
+        """
+        valori = np.asarray(valori, dtype=np.float64)
+        primo_giorno = pd.Timestamp(primo_giorno) if primo_giorno is not None else None
+        trend = self._trend_iniziale(valori)
+        with self._lock:
+            if not self._estende(primo_giorno, valori, trend):
+                self.primo_giorno = primo_giorno
+                self._trend = trend
+                self._confermato = self._stato_iniziale(trend)
+            if len(valori) == 0:
+                self._stato, self.giorni = self._confermato, 0
+                self._valori_confermati = valori[:0].copy()
+                return
+            definitivi = len(valori) - 1
+            self._confermato = self._prosegui(self._confermato, valori[self._confermato["giorni"]:definitivi])
+            self._valori_confermati = valori[:definitivi].copy()
+            self._stato = self._prosegui(self._confermato, valori[definitivi:])
+            self.giorni = len(valori)
+
+    def parametri(self, stato=None):
+        """Per ogni serie: indice della combinazione migliore, alfa, beta e RMSE a un passo"""
+        stato = stato or self._stato
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mse = stato["sse"] / np.maximum(stato["errori"], 1)[:, None]
+        migliore = np.argmin(mse, axis=1)
+        righe = np.arange(len(migliore))
+        return migliore, self.alfa[migliore], self.beta[migliore], np.sqrt(mse[righe, migliore])
+
+    def prevedi(self, orizzonte):
+        """Previsioni per 1..orizzonte giorni dopo l'ultimo: (date, previsione, inferiore, superiore).
+
+        Le matrici sono orizzonte x serie; l'intervallo all'80% usa la varianza
+        dell'errore di Holt smorzato a h passi, sigma^2 (1 + somma_j c_j^2) con
+        c_j = alfa (1 + beta (phi + ... + phi^j)).
+        """
+        stato = self._stato
+        migliore, alfa, beta, rmse = self.parametri(stato)
+        righe = np.arange(len(migliore))
+        livello = stato["livello"][righe, migliore]
+        trend = stato["trend"][righe, migliore]
+
+        passi = np.arange(1, orizzonte + 1)
+        somme_phi = np.cumsum(self.phi ** passi)  # phi + ... + phi^h
+        previsione = livello[None, :] + somme_phi[:, None] * trend[None, :]
+        c = alfa[None, :] * (1 + beta[None, :] * somme_phi[:, None])
+        varianza = 1 + np.concatenate((np.zeros((1, len(righe))), np.cumsum(c[:-1] ** 2, axis=0)))
+        semiampiezza = Z_80 * rmse[None, :] * np.sqrt(varianza)
+
+        ultimo_giorno = self.primo_giorno + pd.Timedelta(days=stato["giorni"] - 1)
+        date = pd.date_range(ultimo_giorno + pd.Timedelta(days=1), periods=orizzonte, freq="D")
+        return date, previsione, previsione - semiampiezza, previsione + semiampiezza
+
+
+def serie_da_livello_giornaliero(giornaliero, colonna_data="data"):
+    """Matrice giorni x serie su calendario continuo dal livello giornaliero della piramide"""
+    colonne = [f"{colonna}_{aggregazione}" for colonna, aggregazione, _, _ in SERIE_PREVISTE]
+    if len(giornaliero) == 0:
+        return None, np.empty((0, len(colonne)))
+    giorni = giornaliero[colonna_data].to_numpy(dtype="datetime64[D]")
+    posizioni = (giorni - giorni[0]).astype(np.int64)
+    calendario = np.full((posizioni[-1] + 1, len(colonne)), np.nan)
+    calendario[posizioni] = giornaliero[colonne].to_numpy(dtype=np.float64)
+    return pd.Timestamp(giorni[0]), calendario
@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+import functools
+import threading
+from collections import Counter
+from datetime import datetime
+
+
+# ==========================================================
+#  Profilazione su richiesta delle callback della dashboard
+#  Profilo deterministico (cProfile, file .prof) e stack
+#  campionati in formato "folded" pronti per i flamegraph
+# ==========================================================
+#
+#  E_LITHIUM_PROFILE            off (default) | always | request
+#      off     -> i decoratori restituiscono la funzione originale (costo nullo)
+#      always  -> ogni chiamata delle callback decorate viene profilata
+#      request -> solo le richieste con header "X-E-Lithium-Profile: 1"
+#                 o con "?profile=1" nell'URL della pagina
+#  E_LITHIUM_PROFILE_DIR        cartella di output (default: <progetto>/profili)
+#  E_LITHIUM_PROFILE_MODE       both (default) | cprofile | sampling
+#  E_LITHIUM_PROFILE_INTERVAL_MS  intervallo di campionamento (default 5 ms)
+#  E_LITHIUM_PROFILE_CALLBACKS  elenco di callback da profilare separate da virgola
+
+MODALITA = os.environ.get("E_LITHIUM_PROFILE", "off").strip().lower()
+ABILITATA = MODALITA in ("always", "request", "1", "true")
+PROFILE_DIR = os.environ.get(
+    "E_LITHIUM_PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "profili")
+)
+TIPO_PROFILO = os.environ.get("E_LITHIUM_PROFILE_MODE", "both").strip().lower()
+INTERVALLO_CAMPIONAMENTO_S = float(os.environ.get("E_LITHIUM_PROFILE_INTERVAL_MS", "5")) / 1000
+CALLBACK_SELEZIONATE = {
+    nome.strip() for nome in os.environ.get("E_LITHIUM_PROFILE_CALLBACKS", "").split(",") if nome.strip()
+}
+
+HEADER_PROFILO = "X-E-Lithium-Profile"
+
+# cProfile non supporta profilazioni sovrapposte: una richiesta alla volta
+_profilo_lock = threading.Lock()
+
+
+def _richiesta_chiede_profilo():
+    """True se la richiesta HTTP corrente ha chiesto la profilazione (header o query)"""
+    import flask
+    if not flask.has_request_context():
+        return False
+    richiesta = flask.request
+    if richiesta.headers.get(HEADER_PROFILO, "") in ("1", "true"):
+        return True
+    if richiesta.args.get("profile") in ("1", "true"):
+        return True
+    # Le callback Dash sono POST verso /_dash-update-component: il flag ?profile=1
+    # messo sull'URL della pagina arriva attraverso il Referer
+    from urllib.parse import urlparse, parse_qs
+    query = parse_qs(urlparse(richiesta.referrer or "").query)
+    return query.get("profile", [""])[0] in ("1", "true")
+
+
+class CampionatoreStack(threading.Thread):
+    """Campiona periodicamente lo stack di un thread e conta gli stack identici"""
+
+    def __init__(self, thread_id, intervallo):
+        super().__init__(daemon=True, name="e-lithium-campionatore")
+        self.thread_id = thread_id
+        self.intervallo = intervallo
+        self.conteggi = Counter()
+        self._fermata = threading.Event()
+
+    def run(self):
+        while not self._fermata.wait(self.intervallo):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                codice = frame.f_code
+                stack.append(f"{codice.co_name} ({os.path.basename(codice.co_filename)}:{codice.co_firstlineno})")
+                frame = frame.f_back
+            self.conteggi[";".join(reversed(stack))] += 1
+
+    def ferma(self):
+        self._fermata.set()
+        self.join()
+
+    def salva_folded(self, percorso):
+        """Formato "folded" (stack;separati;da;punto-e-virgola conteggio) per flamegraph.pl/speedscope"""
+        with open(percorso, "w", encoding="utf-8") as f:
+            for stack, conteggio in self.conteggi.most_common():
+                f.write(f"{stack} {conteggio}\n")
+
+
+def _esegui_profilato(func, args, kwargs):
+    """Esegue la funzione sotto profiler e scrive i file nella cartella dei profili"""
+    import cProfile
+    import pstats
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(
+        PROFILE_DIR,
+        f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{func.__name__}_{os.getpid()}"
+    )
+
+    profiler = cProfile.Profile() if TIPO_PROFILO in ("both", "cprofile") else None
+    campionatore = None
+    if TIPO_PROFILO in ("both", "sampling"):
+        campionatore = CampionatoreStack(threading.get_ident(), INTERVALLO_CAMPIONAMENTO_S)
+        campionatore.start()
+
+    inizio = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        durata = time.perf_counter() - inizio
+        if campionatore is not None:
+            campionatore.ferma()
+            campionatore.salva_folded(base + ".folded")
+        if profiler is not None:
+            profiler.dump_stats(base + ".prof")
+            with open(base + ".txt", "w", encoding="utf-8") as f:
+                statistiche = pstats.Stats(profiler, stream=f)
+                statistiche.sort_stats("cumulative").print_stats(40)
+        print(f"[Profilazione] {func.__name__}: {durata * 1000:.1f} ms -> {base}.*")
+
+
+def profila(func):
+    """Decoratore: profila la callback se la profilazione è attiva.
+
+    Con E_LITHIUM_PROFILE=off (default) restituisce la funzione stessa, senza wrapper.
+    """
+    if not ABILITATA or (CALLBACK_SELEZIONATE and func.__name__ not in CALLBACK_SELEZIONATE):
+        return func
+
+    sempre = MODALITA in ("always", "1", "true")
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not (sempre or _richiesta_chiede_profilo()):
+            return func(*args, **kwargs)
+        if not _profilo_lock.acquire(blocking=False):
+            # Un'altra richiesta è già sotto profilazione: esecuzione normale
+            return func(*args, **kwargs)
+        try:
+            return _esegui_profilato(func, args, kwargs)
+        finally:
+            _profilo_lock.release()
+    return wrapper
@@ -0,0 +1,151 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+# ==========================================================
+#  Archivio colonnare delle serie dei sensori ambientali
+#  Colonne float32 con indice temporale (int64, ns): query
+#  per finestra con ricerca binaria, append incrementale e
+#  riduzione min/max per il rendering
+# ==========================================================
+
+# Soglie operative della miniera: fascia ottimale e fascia di attenzione,
+# fuori dalla fascia di attenzione il valore è critico
+SOGLIE_AMBIENTALI = {
+    "temperatura_C": {"nome": "Temperatura", "unita": "°C", "ottimale": (24, 31), "attenzione": (22, 33)},
+    "umidita_%": {"nome": "Umidità", "unita": "%", "ottimale": (50, 72), "attenzione": (45, 78)},
+    "CO2_ppm": {"nome": "CO2", "unita": "ppm", "ottimale": (350, 460), "attenzione": (300, 500)},
+    "polveri_ug_m3": {"nome": "Polveri", "unita": "µg/m³", "ottimale": (0, 50), "attenzione": (0, 60)},
+    "livello_falda_m": {"nome": "Livello Falda", "unita": "m", "ottimale": (25, 33), "attenzione": (23, 35)},
+}
+
+CAPACITA_INIZIALE = 1024
+
+
+class ArchivioSensori:
+    """Serie temporali dei sensori in array float32 contigui con indice temporale ordinato.
+
+    Le letture restituiscono viste sugli array (nessuna copia); `aggiungi` accoda
+    nuove rilevazioni raddoppiando la capacità quando serve (costo ammortizzato costante).
+    """
+
+    def __init__(self, colonne, capacita=CAPACITA_INIZIALE):
+        self.colonne = list(colonne)
+        self._tempi = np.empty(capacita, dtype=np.int64)
+        self._valori = {c: np.empty(capacita, dtype=np.float32) for c in self.colonne}
+        self._lunghezza = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def da_dataframe(cls, df, colonne=None, colonna_data="data"):
+        """Archivio costruito dalle colonne ambientali presenti nel DataFrame"""
+        colonne = [c for c in (colonne or SOGLIE_AMBIENTALI) if c in df.columns]
+        archivio = cls(colonne, capacita=max(len(df), CAPACITA_INIZIALE))
+        archivio.aggiungi(df[colonna_data].to_numpy(dtype="datetime64[ns]"),
+                          {c: df[c].to_numpy() for c in colonne})
+        return archivio
+
+    def __len__(self):
+        return self._lunghezza
+
+    def aggiungi(self, tempi, valori):
+        """Accoda rilevazioni (tempi crescenti, successivi all'ultima rilevazione)"""
+        tempi = np.asarray(tempi, dtype="datetime64[ns]").astype(np.int64)
+        nuove = len(tempi)
+        if nuove == 0:
+            return
+        with self._lock:
+            ordinate = np.all(np.diff(tempi) >= 0) and (
+                self._lunghezza == 0 or tempi[0] >= self._tempi[self._lunghezza - 1])
+            if not ordinate:
+                raise ValueError("Le rilevazioni devono essere in ordine temporale")
+            richiesta = self._lunghezza + nuove
+            if richiesta > len(self._tempi):
+                capacita = max(richiesta, 2 * len(self._tempi))
+                self._tempi = self._ingrandisci(self._tempi, capacita)
+                self._valori = {c: self._ingrandisci(v, capacita) for c, v in self._valori.items()}
+            self._tempi[self._lunghezza:richiesta] = tempi
+            for colonna in self.colonne:
+                self._valori[colonna][self._lunghezza:richiesta] = np.asarray(valori[colonna], dtype=np.float32)
+            self._lunghezza = richiesta
+
+    def _ingrandisci(self, array, capacita):
+        nuovo = np.empty(capacita, dtype=array.dtype)
+        nuovo[:self._lunghezza] = array[:self._lunghezza]
+        return nuovo
+
+    @property
+    def inizio(self):
+        return pd.Timestamp(self._tempi[0]) if self._lunghezza else None
+
+    @property
+    def fine(self):
+        return pd.Timestamp(self._tempi[self._lunghezza - 1]) if self._lunghezza else None
+
+    def finestra(self, inizio=None, fine=None):
+        """Indici [i, j) delle rilevazioni tra inizio e fine (inclusi), ricerca binaria"""
+        tempi = self._tempi[:self._lunghezza]
+        i = 0 if inizio is None else int(np.searchsorted(tempi, pd.Timestamp(inizio).value, side="left"))
+        j = len(tempi) if fine is None else int(np.searchsorted(tempi, pd.Timestamp(fine).value, side="right"))
+        return i, max(i, j)
+
+    def serie(self, colonna, inizio=None, fine=None):
+        """Tempi (datetime64[ns]) e valori della colonna nella finestra, come viste"""
+        i, j = self.finestra(inizio, fine)
+        return self._tempi[i:j].view("datetime64[ns]"), self._valori[colonna][i:j]
+
+    def riduci(self, colonna, inizio=None, fine=None, punti=1000):
+        """Serie ridotta per il grafico: per ogni bucket il minimo e il massimo, nell'ordine temporale.
+
+        A differenza di una media, la coppia min/max conserva i picchi oltre soglia.
+        """
+        tempi, valori = self.serie(colonna, inizio, fine)
+        n = len(valori)
+        if n <= punti:
+            return tempi, valori
+
+        dimensione = -(-n // max(punti // 2, 1))
+        bucket = -(-n // dimensione)  # ogni bucket contiene almeno una rilevazione
+        # Ultimo bucket completato ripetendo l'ultimo valore: argmin e argmax restituiscono
+        # la prima occorrenza, quindi non cadono mai sul riempimento
+        riempimento = dimensione * bucket - n
+        blocchi = np.pad(valori, (0, riempimento), mode="edge").reshape(bucket, dimensione)
+        base = np.arange(bucket) * dimensione
+        pos_min = base + np.argmin(blocchi, axis=1)
+        pos_max = base + np.argmax(blocchi, axis=1)
+        # Nei bucket costanti minimo e massimo coincidono: un solo punto
+        posizioni = np.unique(np.concatenate((pos_min, pos_max)))
+        return tempi[posizioni], valori[posizioni]
+
+    def statistiche(self, colonna, inizio=None, fine=None):
+        """Ultimo valore, media, minimo, massimo e quota del tempo in ogni fascia di soglia"""
+        _, valori = self.serie(colonna, inizio, fine)
+        if len(valori) == 0:
+            return None
+        soglie = SOGLIE_AMBIENTALI.get(colonna)
+        risultato = {
+            "ultimo": float(valori[-1]),
+            "media": float(valori.mean(dtype=np.float64)),
+            "minimo": float(valori.min()),
+            "massimo": float(valori.max()),
+            "rilevazioni": len(valori),
+        }
+        if soglie:
+            ottimali = (valori >= soglie["ottimale"][0]) & (valori <= soglie["ottimale"][1])
+            accettabili = (valori >= soglie["attenzione"][0]) & (valori <= soglie["attenzione"][1])
+            risultato["quota_ottimale"] = float(ottimali.mean())
+            risultato["quota_attenzione"] = float((accettabili & ~ottimali).mean())
+            risultato["quota_critica"] = float((~accettabili).mean())
+        return risultato
+
+
+def stato_valore(colonna, valore):
+    """Fascia di appartenenza del valore: ottimale, attenzione o critico"""
+    soglie = SOGLIE_AMBIENTALI[colonna]
+    if soglie["ottimale"][0] <= valore <= soglie["ottimale"][1]:
+        return "ottimale"
+    if soglie["attenzione"][0] <= valore <= soglie["attenzione"][1]:
+        return "attenzione"
+    return "critico"
@@ -0,0 +1,121 @@
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+
+# ==========================================================
+#  Serie temporali lunghe: riduzione lato server (LTTB)
+#  alla larghezza in pixel del grafico e rendering WebGL
+#  oltre una soglia di punti
+# ==========================================================
+#
+#  E_LITHIUM_SOGLIA_WEBGL      punti oltre i quali si usa Scattergl (default 1000)
+#  E_LITHIUM_PUNTI_PER_PIXEL   punti disegnati per pixel di larghezza (default 1)
+
+SOGLIA_WEBGL = int(os.environ.get("E_LITHIUM_SOGLIA_WEBGL", "1000"))
+PUNTI_PER_PIXEL = float(os.environ.get("E_LITHIUM_PUNTI_PER_PIXEL", "1"))
+SOGLIA_MARCATORI = 400  # oltre questa densità i marcatori coprono la linea
+LARGHEZZA_DEFAULT = 1200
+PUNTI_MINIMI = 200
+
+
+def punti_disegnabili(larghezza_finestra, frazione=1.0):
+    """Numero massimo di punti da inviare per un grafico largo `frazione` della finestra"""
+    larghezza = larghezza_finestra or LARGHEZZA_DEFAULT
+    return max(int(larghezza * frazione * PUNTI_PER_PIXEL), PUNTI_MINIMI)
+
+
+def lttb(x, y, punti):
+    """Indici dei punti scelti da Largest-Triangle-Three-Buckets.
+
+    Il primo e l'ultimo punto sono sempre inclusi; gli altri punti-2 bucket
+    contribuiscono ciascuno il punto che forma il triangolo di area massima con
+    il punto scelto nel bucket precedente e la media del bucket successivo.
+    """
+    n = len(x)
+    if punti >= n or punti < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Riferimento locale per x: evita la perdita di precisione con i timestamp in ns
+    x = x - x[0]
+
+    num_bucket = punti - 2
+    passo = (n - 2) / num_bucket
+    inizi = (np.arange(num_bucket) * passo).astype(np.int64) + 1
+    fini = np.append(inizi[1:], n - 1)
+
+    # Media di ogni bucket (per il bucket finale il "successivo" è l'ultimo punto)
+    conteggi = fini - inizi
+    medie_x = np.add.reduceat(x[:n - 1], inizi) / conteggi
+    medie_y = np.add.reduceat(y[:n - 1], inizi) / conteggi
+    medie_x = np.append(medie_x[1:], x[n - 1])
+    medie_y = np.append(medie_y[1:], y[n - 1])
+
+    indici = np.empty(punti, dtype=np.int64)
+    indici[0], indici[-1] = 0, n - 1
+    a = 0
+    for i in range(num_bucket):
+        bx = x[inizi[i]:fini[i]]
+        by = y[inizi[i]:fini[i]]
+        aree = np.abs((x[a] - medie_x[i]) * (by - y[a]) - (x[a] - bx) * (medie_y[i] - y[a]))
+        a = inizi[i] + int(np.argmax(aree))
+        indici[i + 1] = a
+    return indici
+
+
+def finestra_da_relayout(relayout_data, asse="xaxis"):
+    """Intervallo visibile dell'asse da relayoutData.
+
+    Restituisce (inizio, fine) come Timestamp, "auto" se l'utente ha ripristinato
+    la vista completa, None se l'evento non riguarda l'asse (es. autosize).
+    """
+    if not relayout_data:
+        return None
+    if relayout_data.get(f"{asse}.autorange"):
+        return "auto"
+    intervallo = relayout_data.get(f"{asse}.range")
+    if intervallo is None and f"{asse}.range[0]" in relayout_data:
+        intervallo = [relayout_data[f"{asse}.range[0]"], relayout_data.get(f"{asse}.range[1]")]
+    if not intervallo or intervallo[0] is None or intervallo[1] is None:
+        return None
+    try:
+        inizio, fine = pd.Timestamp(intervallo[0]), pd.Timestamp(intervallo[1])
+    except (ValueError, TypeError):
+        return None
+    return (min(inizio, fine), max(inizio, fine))
+
+
+def filtra_finestra(df, finestra, colonna="data"):
+    """Righe del DataFrame dentro la finestra visibile (tutto se la finestra non è definita)"""
+    if not isinstance(finestra, tuple):
+        return df
+    date = df[colonna]
+    return df[(date >= finestra[0]) & (date <= finestra[1])]
+
+
+def traccia_temporale(x, y, punti_max, customdata=None, mode="lines+markers", **proprieta):
+    """Traccia Scatter o Scattergl della serie, ridotta con LTTB ai punti disegnabili.
+
+    Restituisce (traccia, ridotta): ridotta è True se sono stati scartati punti,
+    cioè se uno zoom deve richiedere al server la risoluzione piena.
+    """
+    x = pd.Series(x).reset_index(drop=True)
+    y = pd.Series(y).reset_index(drop=True)
+    ridotta = len(x) > punti_max
+    if ridotta:
+        x_numerico = x.to_numpy(dtype="datetime64[ns]").astype(np.int64) \
+            if pd.api.types.is_datetime64_any_dtype(x) else x.to_numpy()
+        indici = lttb(x_numerico, y.to_numpy(), punti_max)
+        x, y = x.iloc[indici], y.iloc[indici]
+        if customdata is not None:
+            customdata = np.asarray(customdata)[indici]
+
+    if len(x) > SOGLIA_MARCATORI:
+        mode = mode.replace("+markers", "").replace("markers+", "")
+    classe = go.Scattergl if len(x) > SOGLIA_WEBGL else go.Scatter
+    traccia = classe(x=x, y=y, mode=mode, customdata=customdata, **proprieta)
+    return traccia, ridotta
@@ -0,0 +1,372 @@
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+# ==========================================================
+#  Controllo statistico di processo (SPC)
+#  Carte X̄/R, EWMA e CUSUM per la purezza, carta c (Poisson)
+#  per i guasti: calcolo vettoriale in un solo passaggio,
+#  aggiornamento incrementale e allarmi precalcolati
+# ==========================================================
+#  I limiti sono stimati una sola volta sulle prime righe (fase I)
+#  e poi congelati: le righe accodate sono valutate rispetto agli
+#  stessi limiti e non richiedono di ricalcolare lo storico.
+
+# Costanti delle carte X̄/R per dimensione del sottogruppo: (A2, D3, D4, d2)
+COSTANTI_XR = {
+    2: (1.880, 0.0, 3.267, 1.128),
+    3: (1.023, 0.0, 2.574, 1.693),
+    4: (0.729, 0.0, 2.282, 2.059),
+    5: (0.577, 0.0, 2.114, 2.326),
+    6: (0.483, 0.0, 2.004, 2.534),
+    7: (0.419, 0.076, 1.924, 2.704),
+    8: (0.373, 0.136, 1.864, 2.847),
+    9: (0.337, 0.184, 1.816, 2.970),
+    10: (0.308, 0.223, 1.777, 3.078),
+}
+
+CARTE = {
+    "xbar": "Medie X̄",
+    "r": "Escursioni R",
+    "ewma": "EWMA",
+    "cusum": "CUSUM",
+    "c": "Guasti (carta c)",
+}
+
+CAPACITA_INIZIALE = 1024
+
+
+class _Colonna:
+    """Array a capacità crescente: accodamento ammortizzato e letture come viste"""
+
+    def __init__(self, dtype, capacita=CAPACITA_INIZIALE):
+        self._dati = np.empty(capacita, dtype=dtype)
+        self._lunghezza = 0
+
+    def __len__(self):
+        return self._lunghezza
+
+    def accoda(self, valori):
+        valori = np.asarray(valori, dtype=self._dati.dtype)
+        richiesta = self._lunghezza + len(valori)
+        if richiesta > len(self._dati):
+            nuovo = np.empty(max(richiesta, 2 * len(self._dati)), dtype=self._dati.dtype)
+            nuovo[:self._lunghezza] = self._dati[:self._lunghezza]
+            self._dati = nuovo
+        self._dati[self._lunghezza:richiesta] = valori
+        self._lunghezza = richiesta
+
+    def vista(self, n=None):
+        return self._dati[:self._lunghezza if n is None else n]
+
+
+class _Impronta:
+    """Impronte (BLAKE2b) delle colonne già elaborate, una per colonna, aggiornate all'accodamento.
+
+    Ogni impronta dipende solo dai byte della colonna concatenati, non da come sono
+    stati suddivisi negli accodamenti: lo storico ricevuto si confronta con una sola
+    passata sul prefisso già elaborato, senza conservarne una copia.
+    """
+
+    def __init__(self, colonne):
+        self._impronte = [hashlib.blake2b(digest_size=16) for _ in range(colonne)]
+
+    @staticmethod
+    def _byte(valori):
+        return np.ascontiguousarray(valori).view(np.uint8)
+
+    def accoda(self, *valori):
+        for impronta, colonna in zip(self._impronte, valori):
+            impronta.update(self._byte(colonna))
+
+    def corrisponde(self, *valori):
+        """True se le colonne (stessi tipi usati in `accoda`) sono quelle già elaborate"""
+        return len(valori) == len(self._impronte) and all(
+            hashlib.blake2b(self._byte(colonna), digest_size=16).digest() == impronta.digest()
+            for impronta, colonna in zip(self._impronte, valori))
+
+
+def cusum_lindley(incrementi, iniziale=0.0):
+    """CUSUM tabulare C_t = max(0, C_{t-1} + y_t) senza ciclo.
+
+    Con S_t somma cumulata degli incrementi vale (ricorsione di Lindley)
+    C_t = S_t - min(-C_0, min_{j<=t} S_j): basta un minimo cumulato.
+    """
+    somme = np.cumsum(incrementi)
+    return somme - np.minimum(np.minimum.accumulate(somme), -iniziale)
+
+
+def _raggruppa(residuo_tempi, residuo_valori, tempi, valori, dimensione):
+    """Blocchi completi di `dimensione` righe consecutive e righe rimaste in sospeso"""
+    tempi = np.concatenate((residuo_tempi, tempi))
+    valori = np.concatenate((residuo_valori, valori))
+    completi = len(valori) // dimensione * dimensione
+    blocchi = valori[:completi].reshape(-1, dimensione)
+    fine_blocchi = tempi[dimensione - 1:completi:dimensione]
+    return fine_blocchi, blocchi, tempi[completi:], valori[completi:]
+
+
+class MonitorSPC:
+    """Carte di controllo della purezza e dei guasti, aggiornabili per accodamento.
+
+    - X̄/R su sottogruppi di `dimensione_sottogruppo` righe consecutive;
+    - EWMA (filtro ricorsivo con scipy.signal.lfilter) con limiti variabili nel tempo;
+    - CUSUM tabulare superiore e inferiore (k e h in multipli di sigma);
+    - carta c sui guasti sommati per unità di ispezione di `righe_unita_c` righe.
+
+    Gli indici dei punti fuori controllo sono calcolati all'accodamento:
+    le letture per finestra usano solo ricerche binarie.
+    """
+
+    def __init__(self, dimensione_sottogruppo=5, lambda_ewma=0.2, l_ewma=3.0, k_cusum=0.5, h_cusum=5.0,
+                 righe_unita_c=7, sottogruppi_fase_uno=25):
+        if dimensione_sottogruppo not in COSTANTI_XR:
+            raise ValueError(f"Dimensione del sottogruppo non supportata: {dimensione_sottogruppo}")
+        self.n = dimensione_sottogruppo
+        self.lambda_ewma = lambda_ewma
+        self.l_ewma = l_ewma
+        self.k_cusum = k_cusum
+        self.h_cusum = h_cusum
+        self.righe_unita_c = righe_unita_c
+        self.sottogruppi_fase_uno = sottogruppi_fase_uno
+        self.parametri = None
+        self._lock = threading.Lock()
+
+        # Serie per riga (purezza), per sottogruppo e per unità di ispezione
+        self._righe = {nome: _Colonna(np.float64) for nome in ("ewma", "cusum_sup", "cusum_inf")}
+        self._tempi_righe = _Colonna(np.int64)
+        self._sottogruppi = {nome: _Colonna(np.float64) for nome in ("media", "escursione")}
+        self._tempi_sottogruppi = _Colonna(np.int64)
+        self._unita = _Colonna(np.float64)
+        self._tempi_unita = _Colonna(np.int64)
+        self._allarmi = {carta: _Colonna(np.int64) for carta in CARTE}
+
+        # Stato del calcolo incrementale
+        self._sospesi_purezza = (np.empty(0, np.int64), np.empty(0))
+        self._sospesi_guasti = (np.empty(0, np.int64), np.empty(0))
+        self._ewma = self._cusum_sup = self._cusum_inf = 0.0
+        self._impronta = _Impronta(3)
+        self.righe = 0
+        self.ultimo_tempo = None
+
+    @classmethod
+    def da_dataframe(cls, df, colonna_data="data", **opzioni):
+        monitor = cls(**opzioni)
+        monitor.aggiungi_righe(df, colonna_data)
+        return monitor
+
+    def __len__(self):
+        return self.righe
+
+    @staticmethod
+    def _colonne(df, colonna_data):
+        return (df[colonna_data].to_numpy(dtype="datetime64[ns]"),
+                df["purezza_%"].to_numpy(dtype=np.float64),
+                df["guasti"].to_numpy(dtype=np.float64))
+
+    def estende(self, df, colonna_data="data"):
+        """True se il DataFrame è questo storico più righe accodate.
+
+        Gli estremi scartano subito gli storici diversi; l'impronta delle righe già
+        elaborate riconosce anche valori riscritti con le stesse date agli estremi.
+        """
+        if self.righe == 0 or len(df) < self.righe:
+            return False
+        date = df[colonna_data]
+        if (pd.Timestamp(date.iloc[0]).value != self._primo_tempo
+                or pd.Timestamp(date.iloc[self.righe - 1]).value != self.ultimo_tempo):
+            return False
+        tempi, purezza, guasti = self._colonne(df.iloc[:self.righe], colonna_data)
+        return self._impronta.corrisponde(tempi.astype(np.int64), purezza, guasti)
+
+    def aggiungi_righe(self, df, colonna_data="data"):
+        """Accoda le righe del DataFrame (successive all'ultima già elaborata)"""
+        self.aggiungi(*self._colonne(df, colonna_data))
+
+    def aggiungi(self, tempi, purezza, guasti):
+        """Elabora le nuove righe: un solo passaggio vettoriale per ogni carta"""
+        tempi = np.asarray(tempi, dtype="datetime64[ns]").astype(np.int64)
+        if len(tempi) == 0:
+            return
+        with self._lock:
+            if self.ultimo_tempo is not None and tempi[0] < self.ultimo_tempo:
+                raise ValueError("Le righe devono essere successive all'ultima elaborata")
+            purezza = np.asarray(purezza, dtype=np.float64)
+            guasti = np.asarray(guasti, dtype=np.float64)
+            self._impronta.accoda(tempi, purezza, guasti)
+            if self.parametri is None:
+                self._primo_tempo = int(tempi[0])
+                self.parametri = self._stima_fase_uno(purezza, guasti)
+
+            validi = ~np.isnan(purezza)
+            self._aggiungi_purezza(tempi[validi], purezza[validi])
+            validi = ~np.isnan(guasti)
+            self._aggiungi_guasti(tempi[validi], guasti[validi])
+            self.righe += len(tempi)
+            self.ultimo_tempo = int(tempi[-1])
+
+    def _stima_fase_uno(self, purezza, guasti):
+        """Centro e dispersione del processo stimati sui primi sottogruppi"""
+        a2, d3, d4, d2 = COSTANTI_XR[self.n]
+        x = purezza[~np.isnan(purezza)][:self.n * self.sottogruppi_fase_uno]
+        completi = len(x) // self.n * self.n
+        if completi >= 2 * self.n:
+            blocchi = x[:completi].reshape(-1, self.n)
+            centro = float(blocchi.mean())
+            r_medio = float(np.ptp(blocchi, axis=1).mean())
+            sigma = r_medio / d2
+        else:
+            # Storico troppo corto per i sottogruppi: stima diretta
+            centro = float(x.mean()) if len(x) else 0.0
+            sigma = float(x.std(ddof=1)) if len(x) > 1 else 0.0
+            r_medio = sigma * d2
+
+        g = guasti[~np.isnan(guasti)][:self.righe_unita_c * self.sottogruppi_fase_uno]
+        unita = len(g) // self.righe_unita_c
+        c_medio = float(g[:unita * self.righe_unita_c].sum() / unita) if unita else \
+            float(g.mean() * self.righe_unita_c) if len(g) else 0.0
+
+        return {
+            "centro": centro,
+            "sigma": sigma,
+            "xbar": (centro - a2 * r_medio, centro, centro + a2 * r_medio),
+            "r": (d3 * r_medio, r_medio, d4 * r_medio),
+            "h": self.h_cusum * sigma,
+            "c": (max(0.0, c_medio - 3 * np.sqrt(c_medio)), c_medio, c_medio + 3 * np.sqrt(c_medio)),
+        }
+
+    def _registra_allarmi(self, carta, fuori, offset):
+        indici = np.flatnonzero(fuori)
+        if len(indici):
+            self._allarmi[carta].accoda(indici + offset)
+
+    def _aggiungi_purezza(self, tempi, x):
+        from scipy.signal import lfilter
+
+        p = self.parametri
+        inizio = len(self._tempi_righe)
+        self._tempi_righe.accoda(tempi)
+        if len(x) == 0:
+            return
+
+        # EWMA z_t = λ x_t + (1 - λ) z_{t-1}, ripartendo dall'ultimo valore calcolato
+        lam = self.lambda_ewma
+        precedente = self._ewma if inizio else p["centro"]
+        ewma, _ = lfilter([lam], [1.0, lam - 1.0], x, zi=[(1.0 - lam) * precedente])
+        self._righe["ewma"].accoda(ewma)
+        self._ewma = float(ewma[-1])
+        semiampiezza = self.limiti_ewma(inizio, inizio + len(x))
+        self._registra_allarmi("ewma", np.abs(ewma - p["centro"]) > semiampiezza, inizio)
+
+        # CUSUM superiore e inferiore con scarto di riferimento k sigma
+        k = self.k_cusum * p["sigma"]
+        sup = cusum_lindley(x - (p["centro"] + k), self._cusum_sup)
+        inf = cusum_lindley((p["centro"] - k) - x, self._cusum_inf)
+        self._righe["cusum_sup"].accoda(sup)
+        self._righe["cusum_inf"].accoda(inf)
+        self._cusum_sup, self._cusum_inf = float(sup[-1]), float(inf[-1])
+        self._registra_allarmi("cusum", (sup > p["h"]) | (inf > p["h"]), inizio)
+
+        # Sottogruppi X̄/R: le righe di un sottogruppo incompleto restano in sospeso
+        fine_blocchi, blocchi, *sospesi = _raggruppa(*self._sospesi_purezza, tempi, x, self.n)
+        self._sospesi_purezza = tuple(sospesi)
+        if len(blocchi):
+            inizio = len(self._tempi_sottogruppi)
+            medie, escursioni = blocchi.mean(axis=1), np.ptp(blocchi, axis=1)
+            self._tempi_sottogruppi.accoda(fine_blocchi)
+            self._sottogruppi["media"].accoda(medie)
+            self._sottogruppi["escursione"].accoda(escursioni)
+            self._registra_allarmi("xbar", (medie < p["xbar"][0]) | (medie > p["xbar"][2]), inizio)
+            self._registra_allarmi("r", (escursioni < p["r"][0]) | (escursioni > p["r"][2]), inizio)
+
+    def _aggiungi_guasti(self, tempi, g):
+        p = self.parametri
+        fine_blocchi, blocchi, *sospesi = _raggruppa(*self._sospesi_guasti, tempi, g, self.righe_unita_c)
+        self._sospesi_guasti = tuple(sospesi)
+        if len(blocchi):
+            inizio = len(self._tempi_unita)
+            conteggi = blocchi.sum(axis=1)
+            self._tempi_unita.accoda(fine_blocchi)
+            self._unita.accoda(conteggi)
+            self._registra_allarmi("c", (conteggi < p["c"][0]) | (conteggi > p["c"][2]), inizio)
+
+    def limiti_ewma(self, inizio, fine):
+        """Semiampiezza dei limiti EWMA per le righe [inizio, fine): si allarga fino al regime"""
+        lam = self.lambda_ewma
+        regime = self.l_ewma * self.parametri["sigma"] * np.sqrt(lam / (2 - lam))
+        semiampiezza = np.full(fine - inizio, regime)
+        # Oltre il transitorio (1 - λ)^(2t) è sotto la precisione macchina: limiti costanti
+        transitorio = min(fine, int(np.ceil(np.log(np.finfo(np.float64).eps) / (2 * np.log1p(-lam)))))
+        if transitorio > inizio:
+            t = np.arange(inizio, transitorio) + 1.0
+            semiampiezza[:transitorio - inizio] = regime * np.sqrt(1 - (1 - lam) ** (2 * t))
+        return semiampiezza
+
+    def _serie_carta(self, carta):
+        if carta in ("xbar", "r"):
+            return self._tempi_sottogruppi
+        if carta == "c":
+            return self._tempi_unita
+        return self._tempi_righe
+
+    def carta(self, carta, inizio=None, fine=None):
+        """Punti della carta nella finestra [inizio, fine] con limiti e indici degli allarmi.
+
+        Restituisce un dizionario con `tempi` (datetime64), `valori` (per la CUSUM la
+        coppia superiore/inferiore), `limiti` (inferiore, centro, superiore; per la EWMA
+        array per punto) e `allarmi`, posizioni nella finestra dei punti fuori controllo.
+        """
+        with self._lock:
+            colonna_tempi = self._serie_carta(carta)
+            n = len(colonna_tempi)
+            tempi = colonna_tempi.vista(n)
+            allarmi = self._allarmi[carta].vista()
+            if carta == "xbar":
+                valori = self._sottogruppi["media"].vista(n)
+            elif carta == "r":
+                valori = self._sottogruppi["escursione"].vista(n)
+            elif carta == "c":
+                valori = self._unita.vista(n)
+            elif carta == "ewma":
+                valori = self._righe["ewma"].vista(n)
+            else:
+                valori = (self._righe["cusum_sup"].vista(n), self._righe["cusum_inf"].vista(n))
+
+        i = 0 if inizio is None else int(np.searchsorted(tempi, pd.Timestamp(inizio).value, side="left"))
+        j = n if fine is None else int(np.searchsorted(tempi, pd.Timestamp(fine).value, side="right"))
+        j = max(i, j)
+        a, b = np.searchsorted(allarmi, [i, j])
+        p = self.parametri or {}
+        if carta == "ewma":
+            semiampiezza = self.limiti_ewma(i, j)
+            limiti = (p["centro"] - semiampiezza, p["centro"], p["centro"] + semiampiezza)
+        elif carta == "cusum":
+            limiti = (None, 0.0, p.get("h"))
+        else:
+            limiti = p.get(carta)
+        return {
+            "tempi": tempi[i:j].view("datetime64[ns]"),
+            "valori": tuple(v[i:j] for v in valori) if isinstance(valori, tuple) else valori[i:j],
+            "limiti": limiti,
+            "allarmi": allarmi[a:b] - i,
+        }
+
+    def riepilogo(self, inizio=None, fine=None):
+        """Per ogni carta: punti, allarmi e data dell'ultimo allarme nella finestra"""
+        risultato = {}
+        for carta in CARTE:
+            with self._lock:
+                tempi = self._serie_carta(carta).vista()
+                allarmi = self._allarmi[carta].vista()
+            i = 0 if inizio is None else int(np.searchsorted(tempi, pd.Timestamp(inizio).value, side="left"))
+            j = len(tempi) if fine is None else int(np.searchsorted(tempi, pd.Timestamp(fine).value, side="right"))
+            a, b = np.searchsorted(allarmi, [i, max(i, j)])
+            risultato[carta] = {
+                "punti": max(0, j - i),
+                "allarmi": int(b - a),
+                "ultimo_allarme": pd.Timestamp(tempi[allarmi[b - 1]]) if b > a else None,
+            }
+        return risultato
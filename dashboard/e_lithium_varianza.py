@@ -0,0 +1,66 @@
+import numpy as np
+
+
+# ==========================================================
+#  Scomposizione della variazione del profitto tra due
+#  periodi in effetto volume, prezzo e costi
+# ==========================================================
+#  Con V = litio venduto, P = prezzo medio (ricavi / V) e
+#  u = costo unitario (costi / V) di ciascun periodo:
+#    volume = (V1 - V0) (P0 - u0)   margine unitario di partenza
+#    prezzo = (P1 - P0) V1
+#    costi  = -(u1 - u0) V1
+#  La somma è la variazione di ricavi - costi; la parte restante
+#  della variazione del profitto registrato (rettifiche) è "altro".
+#  Bastano le somme dei due periodi: con le somme cumulate ogni
+#  coppia di periodi costa un numero fisso di operazioni.
+
+# Effetti nell'ordine del grafico a cascata: (chiave, descrizione)
+EFFETTI = (
+    ("volume", "Volume"),
+    ("prezzo", "Prezzo"),
+    ("costi", "Costi unitari"),
+    ("altro", "Altro"),
+)
+
+
+def _per_unita(somma, litio):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(litio > 0, somma / np.where(litio > 0, litio, 1), 0.0)
+
+
+def scomponi_varianza(base, corrente):
+    """Effetti della variazione di profitto tra i totali di due periodi (dizionari di array).
+
+    I totali sono quelli di `SommeCumulate.totali`; senza la somma del profitto
+    registrato si usa ricavi - costi e l'effetto "altro" è nullo.
+    """
+    v0, v1 = np.asarray(base["litio"], dtype=np.float64), np.asarray(corrente["litio"], dtype=np.float64)
+    p0, p1 = _per_unita(base["litio_x_prezzo"], v0), _per_unita(corrente["litio_x_prezzo"], v1)
+    u0, u1 = _per_unita(base["costi"], v0), _per_unita(corrente["costi"], v1)
+
+    operativo_base = base["litio_x_prezzo"] - base["costi"]
+    operativo_corrente = corrente["litio_x_prezzo"] - corrente["costi"]
+    profitto_base = base.get("profitto", operativo_base)
+    profitto_corrente = corrente.get("profitto", operativo_corrente)
+
+    risultato = {
+        "profitto_base": profitto_base,
+        "profitto_corrente": profitto_corrente,
+        "volume": (v1 - v0) * (p0 - u0),
+        "prezzo": (p1 - p0) * v1,
+        "costi": -(u1 - u0) * v1,
+        "altro": (profitto_corrente - operativo_corrente) - (profitto_base - operativo_base),
+    }
+    risultato["variazione"] = profitto_corrente - profitto_base
+    return risultato
+
+
+def confronta_periodi(somme, inizi_base, fini_base, inizi, fini):
+    """Scomposizione per coppie di periodi (date incluse) dalle somme cumulate"""
+    return scomponi_varianza(somme.totali(inizi_base, fini_base), somme.totali(inizi, fini))
+
+
+def confronta_righe(somme, righe_base, righe):
+    """Scomposizione per coppie di intervalli di righe [i, j) dalle somme cumulate"""
+    return scomponi_varianza(somme.totali_righe(*righe_base), somme.totali_righe(*righe))
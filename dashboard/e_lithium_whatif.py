@@ -0,0 +1,354 @@
+import numpy as np
+import pandas as pd
+
+
+# ==========================================================
+#  Formule della simulazione What-If, condivise dal tab
+#  della dashboard e dall'esecuzione batch degli scenari
+# ==========================================================
+#  Uno scenario è la terna (variazione produzione %, variazione
+#  prezzo €/kg, riduzione costi %). Il profitto è lineare nelle
+#  somme del periodo: con le somme cumulate ogni scenario su
+#  qualunque periodo si valuta in tempo costante.
+
+# Colonne della tabella degli scenari (esecuzione batch)
+PARAMETRI = ("produzione_%", "prezzo_delta_eur_kg", "costi_%")
+
+
+def ricavi_scenario(litio_x_prezzo, litio, produzione, prezzo_delta):
+    """Ricavi con la produzione variata del produzione% e il prezzo spostato di prezzo_delta €/kg.
+
+    Vale sia riga per riga sia sulle somme di un periodo: sum((1+p) L (P+d)) = (1+p) (sum LP + d sum L).
+    """
+    return (1 + produzione / 100) * (litio_x_prezzo + prezzo_delta * litio)
+
+
+def costi_scenario(costi, riduzione):
+    """Costi ridotti del riduzione% (valori negativi aumentano i costi)"""
+    return costi * (1 - riduzione / 100)
+
+
+def margine(profitto, ricavi):
+    """Margine percentuale sui ricavi (ricavi nulli trattati come 1, come nel tab What-If)"""
+    return profitto / np.where(ricavi == 0, 1, ricavi) * 100
+
+
+def applica_scenario(litio, prezzo, costi, produzione=0, prezzo_delta=0, riduzione_costi=0):
+    """Ricavi, costi, profitto e margine dello scenario riga per riga"""
+    ricavi = ricavi_scenario(litio * prezzo, litio, produzione, prezzo_delta)
+    costi = costi_scenario(costi, riduzione_costi)
+    profitto = ricavi - costi
+    return ricavi, costi, profitto, margine(profitto, ricavi)
+
+
+class SommeCumulate:
+    """Somme cumulate di litio, litio x prezzo, costi e profitto sulle righe ordinate per data.
+
+    `totali(inizi, fini)` restituisce le somme di molti periodi con due ricerche
+    binarie e una differenza per periodo, senza ripassare sulle righe.
+    """
+
+    def __init__(self, df, colonna_data="data"):
+        if not df[colonna_data].is_monotonic_increasing:
+            df = df.sort_values(colonna_data, kind="stable")
+        self.date = df[colonna_data].to_numpy(dtype="datetime64[ns]")
+        litio = df["litio_estratto_kg"].to_numpy(dtype=np.float64)
+        prezzo = df["prezzo_litio_eur_kg"].to_numpy(dtype=np.float64)
+        costi = df["costi_eur"].to_numpy(dtype=np.float64)
+        serie = [("litio", litio), ("litio_x_prezzo", litio * prezzo), ("costi", costi)]
+        if "profitto_eur" in df:
+            serie.append(("profitto", df["profitto_eur"].to_numpy(dtype=np.float64)))
+        # Prima riga a zero: la somma di [i, j) è cumulata[j] - cumulata[i]
+        self.cumulate = {nome: np.concatenate(([0.0], np.cumsum(valori))) for nome, valori in serie}
+
+    def __len__(self):
+        return len(self.date)
+
+    def posizioni(self, inizi, fini):
+        """Intervalli di righe [i, j) dei periodi (date incluse; NaT = illimitato)"""
+        inizi = pd.to_datetime(pd.Series(inizi)).to_numpy(dtype="datetime64[ns]")
+        fini = pd.to_datetime(pd.Series(fini)).to_numpy(dtype="datetime64[ns]")
+        i = np.where(np.isnat(inizi), 0, np.searchsorted(self.date, inizi, side="left"))
+        j = np.where(np.isnat(fini), len(self.date), np.searchsorted(self.date, fini, side="right"))
+        return i, np.maximum(i, j)
+
+    def totali(self, inizi, fini):
+        """Numero di righe e somme di ogni periodo come dizionario di array"""
+        return self.totali_righe(*self.posizioni(inizi, fini))
+
+    def totali_righe(self, i, j):
+        """Come `totali`, per intervalli di righe [i, j) già noti"""
+        i, j = np.asarray(i), np.asarray(j)
+        risultato = {nome: cumulata[j] - cumulata[i] for nome, cumulata in self.cumulate.items()}
+        risultato["righe"] = j - i
+        return risultato
+
+
+class IndicePeriodi:
+    """Marker dello slider del periodo What-If con date e righe corrispondenti.
+
+    I marker sono al massimo `max_marker` (uno ogni ~30 giorni), equidistanti tra
+    la prima e l'ultima data a giorni interi. Per ogni marker sono precalcolati la
+    data e gli offset di riga (prima riga dal marker in poi, righe fino al marker
+    incluso): un periodo tra due marker si risolve con due accessi ad array.
+    """
+
+    def __init__(self, date, max_marker=13):
+        date = np.asarray(date, dtype="datetime64[ns]")
+        if len(date) == 0:
+            raise ValueError("Nessuna data per l'indice dei periodi")
+        if np.any(np.diff(date.astype(np.int64)) < 0):
+            date = np.sort(date)
+        data_min, data_max = pd.Timestamp(date[0]), pd.Timestamp(date[-1])
+        total_days = (data_max - data_min).days
+        self.num_marker = min(max_marker, max(2, total_days // 30 + 1))
+        giorni = (np.arange(self.num_marker) * (total_days / (self.num_marker - 1))).astype(np.int64)
+        self.date_marker = (np.datetime64(data_min.to_datetime64(), "ns")
+                            + giorni.astype("timedelta64[D]")).astype("datetime64[ns]")
+        self.righe_da = np.searchsorted(date, self.date_marker, side="left")
+        self.righe_fino = np.searchsorted(date, self.date_marker, side="right")
+
+    def etichette(self, formato="%b %y"):
+        """Etichette dei marker per lo slider {posizione: testo}"""
+        return {i: pd.Timestamp(data).strftime(formato) for i, data in enumerate(self.date_marker)}
+
+    def _posizione(self, indice):
+        return min(max(int(indice), 0), self.num_marker - 1)
+
+    def intervallo(self, indici):
+        """(data inizio, data fine) dei marker selezionati, None senza una selezione valida"""
+        if not indici or len(indici) != 2:
+            return None
+        i, j = sorted(self._posizione(k) for k in indici)
+        return pd.Timestamp(self.date_marker[i]), pd.Timestamp(self.date_marker[j])
+
+    def righe(self, indici):
+        """Offset [inizio, fine) delle righe ordinate per data comprese nel periodo"""
+        i, j = sorted(self._posizione(k) for k in indici)
+        return int(self.righe_da[i]), int(max(self.righe_da[i], self.righe_fino[j]))
+
+
+def valuta_scenari(somme, scenari):
+    """Risultati aggregati di una tabella di scenari, in un'unica valutazione vettoriale.
+
+    `scenari` ha le colonne di PARAMETRI (mancanti = 0) e opzionalmente `inizio` e
+    `fine` del periodo (mancanti = tutto lo storico). Restituisce la tabella con
+    ricavi, costi, profitto totale e medio per riga, margine e differenza di
+    profitto rispetto allo storico dello stesso periodo.
+    """
+    n = len(scenari)
+    valori = {p: scenari[p].fillna(0).to_numpy(dtype=np.float64) if p in scenari else np.zeros(n)
+              for p in PARAMETRI}
+    inizi = scenari["inizio"] if "inizio" in scenari else pd.Series([pd.NaT] * n)
+    fini = scenari["fine"] if "fine" in scenari else pd.Series([pd.NaT] * n)
+    totali = somme.totali(inizi, fini)
+
+    ricavi = ricavi_scenario(totali["litio_x_prezzo"], totali["litio"],
+                             valori["produzione_%"], valori["prezzo_delta_eur_kg"])
+    costi = costi_scenario(totali["costi"], valori["costi_%"])
+    profitto = ricavi - costi
+    profitto_storico = totali["litio_x_prezzo"] - totali["costi"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        profitto_medio = np.where(totali["righe"] > 0, profitto / totali["righe"], np.nan)
+
+    risultato = scenari.reset_index(drop=True).copy()
+    risultato["righe"] = totali["righe"]
+    risultato["ricavi_eur"] = ricavi
+    risultato["costi_eur"] = costi
+    risultato["profitto_eur"] = profitto
+    risultato["profitto_medio_eur"] = profitto_medio
+    risultato["margine_%"] = margine(profitto, ricavi)
+    risultato["delta_profitto_eur"] = profitto - profitto_storico
+    return risultato
+
+
+# === SENSIBILITÀ ===
+# Escursione delle leve nel tab What-If (stessi limiti degli slider)
+LEVE = {
+    "produzione_%": ("Produzione", "%", (-50, 50)),
+    "prezzo_delta_eur_kg": ("Prezzo", "€/kg", (-30, 30)),
+    "costi_%": ("Riduzione costi", "%", (-50, 50)),
+}
+# Grandezza sottostante di ogni leva per l'elasticità (volume, prezzo di vendita, costi)
+GRANDEZZE = {"produzione_%": "volume", "prezzo_delta_eur_kg": "prezzo", "costi_%": "costi"}
+EPSILON_ELASTICITA = 0.01
+
+
+def valuta_leve(totali, leve):
+    """Ricavi, costi, profitto e margine dei totali di un periodo per una matrice di leve (k x 3)"""
+    leve = np.asarray(leve, dtype=np.float64)
+    ricavi = ricavi_scenario(totali["litio_x_prezzo"], totali["litio"], leve[:, 0], leve[:, 1])
+    costi = costi_scenario(totali["costi"], leve[:, 2])
+    profitto = ricavi - costi
+    return ricavi, costi, profitto, margine(profitto, ricavi)
+
+
+def sensibilita(totali, scenario, leve=None):
+    """Tornado e elasticità locali di profitto e margine per ogni leva, in una sola valutazione.
+
+    `totali` sono le somme del periodo (vedi SommeCumulate.totali, valori scalari),
+    `scenario` i valori correnti delle leve nell'ordine di PARAMETRI. Per il tornado
+    ogni leva è portata al minimo e al massimo con le altre ferme; l'elasticità è la
+    variazione percentuale del risultato per +1% della grandezza sottostante
+    (volume prodotto, prezzo di vendita, costi), riportata come variazione di leva.
+    Restituisce (profitto e margine dello scenario, lista ordinata per escursione del profitto).
+    """
+    leve = leve or LEVE
+    base = np.asarray(scenario, dtype=np.float64)
+    eps = EPSILON_ELASTICITA
+    righe = [base]
+    for k, parametro in enumerate(PARAMETRI):
+        for estremo in leve[parametro][2]:
+            riga = base.copy()
+            riga[k] = estremo
+            righe.append(riga)
+
+    # +1% della grandezza sottostante espresso come nuovo valore della leva
+    produzione, prezzo_delta, riduzione = base
+    litio = float(totali["litio"])
+    prezzo_medio = (float(totali["litio_x_prezzo"]) + prezzo_delta * litio) / litio if litio else 0.0
+    spostate = (
+        ((1 + produzione / 100) * (1 + eps) - 1) * 100,
+        prezzo_delta + eps * prezzo_medio,
+        (1 - (1 - riduzione / 100) * (1 + eps)) * 100,
+    )
+    for k, valore in enumerate(spostate):
+        riga = base.copy()
+        riga[k] = valore
+        righe.append(riga)
+
+    _, _, profitto, margini = valuta_leve(totali, np.vstack(righe))
+    profitto_base, margine_base = profitto[0], margini[0]
+    risultati = []
+    for k, parametro in enumerate(PARAMETRI):
+        nome, unita, (minimo, massimo) = leve[parametro]
+        basso, alto, spostato = 1 + 2 * k, 2 + 2 * k, 1 + 2 * len(PARAMETRI) + k
+        with np.errstate(invalid="ignore", divide="ignore"):
+            elasticita_profitto = (profitto[spostato] / profitto_base - 1) / eps
+            elasticita_margine = (margini[spostato] / margine_base - 1) / eps
+        risultati.append({
+            "parametro": parametro,
+            "nome": nome,
+            "unita": unita,
+            "grandezza": GRANDEZZE[parametro],
+            "minimo": minimo,
+            "massimo": massimo,
+            "profitto_min": float(profitto[basso]),
+            "profitto_max": float(profitto[alto]),
+            "margine_min": float(margini[basso]),
+            "margine_max": float(margini[alto]),
+            "escursione": float(abs(profitto[alto] - profitto[basso])),
+            "elasticita_profitto": float(elasticita_profitto),
+            "elasticita_margine": float(elasticita_margine),
+        })
+    risultati.sort(key=lambda voce: voce["escursione"], reverse=True)
+    return (float(profitto_base), float(margine_base)), risultati
+
+
+# === RICERCA OBIETTIVO ===
+OBIETTIVI = {
+    "profitto": ("Profitto del periodo", "€"),
+    "margine": ("Margine del periodo", "%"),
+    "margine_medio": ("Margine medio giornaliero", "%"),
+}
+# Intervalli di ricerca della bisezione (più ampi degli slider)
+INTERVALLI_RICERCA = {"produzione_%": (-99.0, 1000.0), "prezzo_delta_eur_kg": (None, 1000.0), "costi_%": (-1000.0, 100.0)}
+ITERAZIONI_BISEZIONE = 60
+
+
+def risolvi_obiettivo(totali, scenario, obiettivo, valore):
+    """Valore di ogni leva (con le altre ferme) che porta profitto o margine del periodo all'obiettivo.
+
+    Il profitto (1+p)(LP + dL) - (1-c)C è lineare in ciascuna leva: la soluzione è in
+    forma chiusa per tutte e tre. Restituisce un array nell'ordine di PARAMETRI, NaN
+    dove l'obiettivo non è raggiungibile muovendo quella leva.
+    """
+    produzione, prezzo_delta, riduzione = (float(v) for v in scenario)
+    lp, litio, costi = (float(totali[k]) for k in ("litio_x_prezzo", "litio", "costi"))
+    fattore = 1 + produzione / 100
+    base_ricavi = lp + prezzo_delta * litio
+    costi_scen = costi * (1 - riduzione / 100)
+    ricavi = fattore * base_ricavi
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if obiettivo == "profitto":
+            ricavi_necessari = valore + costi_scen           # per produzione e prezzo
+            costi_ammessi = ricavi - valore                   # per i costi
+        else:
+            quota_costi = 1 - valore / 100                    # costi / ricavi richiesto
+            if quota_costi <= 0:
+                return np.full(len(PARAMETRI), np.nan)
+            ricavi_necessari = costi_scen / quota_costi
+            costi_ammessi = quota_costi * ricavi
+        soluzioni = np.array([
+            (ricavi_necessari / base_ricavi - 1) * 100,
+            (ricavi_necessari / fattore - lp) / litio,
+            (1 - costi_ammessi / costi) * 100,
+        ])
+    # Ricavi o costi negativi non hanno senso fisico
+    soluzioni[0] = soluzioni[0] if soluzioni[0] > -100 else np.nan
+    soluzioni[1] = soluzioni[1] if ricavi_necessari > 0 else np.nan
+    soluzioni[2] = soluzioni[2] if costi_ammessi >= 0 else np.nan
+    return np.where(np.isfinite(soluzioni), soluzioni, np.nan)
+
+
+def margine_medio(litio_x_prezzo, litio, costi, leve):
+    """Media dei margini giornalieri per ogni riga di leve (k x 3) su array giornalieri (n)"""
+    leve = np.asarray(leve, dtype=np.float64)
+    ricavi = ricavi_scenario(litio_x_prezzo[None, :], litio[None, :], leve[:, 0:1], leve[:, 1:2])
+    profitto = ricavi - costi_scenario(costi[None, :], leve[:, 2:3])
+    return margine(profitto, ricavi).mean(axis=1)
+
+
+def risolvi_margine_medio(litio_x_prezzo, litio, costi, scenario, valore, iterazioni=ITERAZIONI_BISEZIONE):
+    """Leve che portano la media dei margini giornalieri all'obiettivo, con bisezione vettoriale.
+
+    La media dei rapporti non è lineare nelle leve, ma è crescente in ciascuna: le tre
+    bisezioni procedono insieme, ogni iterazione valuta una matrice 3 x giorni.
+    """
+    litio_x_prezzo, litio, costi = (np.asarray(a, dtype=np.float64) for a in (litio_x_prezzo, litio, costi))
+    validi = litio > 0
+    if not validi.any():
+        return np.full(len(PARAMETRI), np.nan)
+    litio_x_prezzo, litio, costi = litio_x_prezzo[validi], litio[validi], costi[validi]
+    base = np.asarray(scenario, dtype=np.float64)
+
+    # Il prezzo non può scendere sotto lo zero nel giorno con il prezzo medio più basso
+    prezzo_minimo = -float(np.min(litio_x_prezzo / litio)) * 0.999
+    basso = np.array([INTERVALLI_RICERCA[p][0] if INTERVALLI_RICERCA[p][0] is not None else prezzo_minimo
+                      for p in PARAMETRI])
+    alto = np.array([INTERVALLI_RICERCA[p][1] for p in PARAMETRI])
+    diagonale = np.eye(len(PARAMETRI), dtype=bool)
+
+    def valuta(valori_leve):
+        # Riga k: scenario corrente con la sola leva k sostituita
+        leve = np.where(diagonale, valori_leve[:, None], base[None, :])
+        return margine_medio(litio_x_prezzo, litio, costi, leve)
+
+    raggiungibili = (valuta(basso) <= valore) & (valuta(alto) >= valore)
+    for _ in range(iterazioni):
+        medio = (basso + alto) / 2
+        sopra = valuta(medio) >= valore
+        alto = np.where(sopra, medio, alto)
+        basso = np.where(sopra, basso, medio)
+    return np.where(raggiungibili, (basso + alto) / 2, np.nan)
+
+
+# === SCENARI SALVATI ===
+MAX_SCENARI_SALVATI = 10
+
+
+def risultati_giornalieri(giornaliero, scenario, colonna_data="data"):
+    """Profitto e margine per giorno dello scenario (e profitto storico) dalle somme giornaliere"""
+    produzione, prezzo_delta, riduzione = (float(v) for v in scenario)
+    litio_x_prezzo = giornaliero["litio_x_prezzo_sum"].to_numpy(dtype=np.float64)
+    costi = giornaliero["costi_eur_sum"].to_numpy(dtype=np.float64)
+    ricavi = ricavi_scenario(litio_x_prezzo, giornaliero["litio_estratto_kg_sum"].to_numpy(dtype=np.float64),
+                             produzione, prezzo_delta)
+    profitto = ricavi - costi_scenario(costi, riduzione)
+    return {
+        "date": giornaliero[colonna_data].to_numpy(dtype="datetime64[ns]"),
+        "profitto": profitto,
+        "margine": margine(profitto, ricavi),
+        "delta_profitto": profitto - (litio_x_prezzo - costi),
+    }
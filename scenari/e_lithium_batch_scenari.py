@@ -0,0 +1,156 @@
+import os
+import sys
+import time
+import argparse
+import itertools
+
+import numpy as np
+import pandas as pd
+
+
+# ==========================================================
+#  Esecuzione batch degli scenari What-If
+#  Legge una tabella di scenari (o genera una griglia),
+#  li valuta con le somme cumulate del dataset e scrive
+#  profitto e margine aggregati in un file colonnare
+# ==========================================================
+#
+#  Colonne della tabella degli scenari (CSV o Parquet):
+#    nome                 facoltativo
+#    produzione_%         variazione della produzione (es. 10 = +10%)
+#    prezzo_delta_eur_kg  variazione del prezzo di vendita in €/kg
+#    costi_%              riduzione dei costi (es. 5 = -5%)
+#    inizio, fine         periodo (date incluse; vuoto = tutto lo storico)
+#
+#  Esempi:
+#    python scenari/e_lithium_batch_scenari.py scenari.csv --output risultati.parquet
+#    python scenari/e_lithium_batch_scenari.py --griglia produzione_%=-50:50:5 \
+#        --griglia prezzo_delta_eur_kg=-30:30:5 --griglia costi_%=-50:50:5 --output sweep.csv
+#    python scenari/e_lithium_batch_scenari.py scenari.csv --processi 4 --output risultati.parquet
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(project_dir, "dashboard"))
+
+from e_lithium_whatif import PARAMETRI, SommeCumulate, valuta_scenari
+
+CSV_DEFAULT = os.path.join(project_dir, "data", "e_lithium_data.csv")
+
+# Sotto questa soglia un pool di processi costa più della valutazione vettoriale
+MIN_SCENARI_PER_PROCESSO = 100_000
+
+
+def leggi_tabella(percorso):
+    """Tabella da CSV o Parquet (in base all'estensione)"""
+    if percorso.endswith((".parquet", ".pq")):
+        return pd.read_parquet(percorso)
+    return pd.read_csv(percorso)
+
+
+def scrivi_tabella(df, percorso):
+    """Scrive Parquet, Feather o CSV in base all'estensione del file"""
+    os.makedirs(os.path.dirname(os.path.abspath(percorso)), exist_ok=True)
+    if percorso.endswith((".parquet", ".pq")):
+        df.to_parquet(percorso, index=False)
+    elif percorso.endswith(".feather"):
+        df.to_feather(percorso)
+    else:
+        df.to_csv(percorso, index=False)
+
+
+def genera_griglia(specifiche):
+    """Prodotto cartesiano dei valori dei parametri, da specifiche 'parametro=min:max:passo'"""
+    assi = {}
+    for specifica in specifiche:
+        nome, _, intervallo = specifica.partition("=")
+        if nome not in PARAMETRI:
+            raise ValueError(f"Parametro sconosciuto: {nome} (ammessi: {', '.join(PARAMETRI)})")
+        minimo, massimo, passo = (float(v) for v in intervallo.split(":"))
+        assi[nome] = np.arange(minimo, massimo + passo / 2, passo)
+    combinazioni = list(itertools.product(*assi.values()))
+    return pd.DataFrame(combinazioni, columns=list(assi.keys()))
+
+
+def prepara_scenari(scenari):
+    """Parametri mancanti a 0 e periodi convertiti in date"""
+    scenari = scenari.copy()
+    for parametro in PARAMETRI:
+        scenari[parametro] = scenari[parametro].fillna(0.0) if parametro in scenari else 0.0
+    for colonna in ("inizio", "fine"):
+        scenari[colonna] = pd.to_datetime(scenari[colonna]) if colonna in scenari else pd.NaT
+    return scenari
+
+
+# Nei processi del pool le somme cumulate sono ricevute una volta sola all'avvio
+_somme_processo = None
+
+
+def _inizializza_processo(somme):
+    global _somme_processo
+    _somme_processo = somme
+
+
+def _valuta_blocco(scenari):
+    return valuta_scenari(_somme_processo, scenari)
+
+
+def esegui(scenari, somme, processi=1):
+    """Valuta gli scenari, in un'unica chiamata vettoriale o divisi tra più processi"""
+    if processi <= 1 or len(scenari) < MIN_SCENARI_PER_PROCESSO:
+        return valuta_scenari(somme, scenari)
+
+    from concurrent.futures import ProcessPoolExecutor
+    blocchi = np.array_split(np.arange(len(scenari)), processi)
+    with ProcessPoolExecutor(max_workers=processi, initializer=_inizializza_processo,
+                             initargs=(somme,)) as pool:
+        risultati = pool.map(_valuta_blocco, [scenari.iloc[blocco] for blocco in blocchi])
+        return pd.concat(list(risultati), ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Valutazione batch degli scenari What-If E-Lithium")
+    parser.add_argument("scenari", nargs="?", default=None, help="tabella degli scenari (CSV o Parquet)")
+    parser.add_argument("--griglia", action="append", default=[],
+                        help="genera la griglia parametro=min:max:passo (ripetibile)")
+    parser.add_argument("--dati", default=os.environ.get("E_LITHIUM_CSV") or CSV_DEFAULT,
+                        help="CSV dei dati di produzione")
+    parser.add_argument("--output", required=True, help="file dei risultati (.parquet, .feather o .csv)")
+    parser.add_argument("--processi", type=int, default=1,
+                        help=f"processi paralleli (usati oltre {MIN_SCENARI_PER_PROCESSO:,} scenari)")
+    args = parser.parse_args()
+
+    if not args.scenari and not args.griglia:
+        parser.error("indicare una tabella degli scenari o almeno un --griglia")
+
+    inizio = time.perf_counter()
+    griglia = genera_griglia(args.griglia) if args.griglia else None
+    scenari = leggi_tabella(args.scenari) if args.scenari else griglia
+    if args.scenari and griglia is not None:
+        # Ogni riga della tabella (es. un periodo) viene combinata con tutta la griglia
+        scenari = scenari.drop(columns=[c for c in griglia if c in scenari]).merge(griglia, how="cross")
+    scenari = prepara_scenari(scenari)
+
+    df = pd.read_csv(args.dati, parse_dates=["data"])
+    somme = SommeCumulate(df)
+    caricamento = time.perf_counter() - inizio
+    print(f"[Scenari] {len(scenari):,} scenari su {len(somme):,} righe di dati ({caricamento:.2f} s di caricamento)")
+
+    inizio = time.perf_counter()
+    risultati = esegui(scenari, somme, args.processi)
+    durata = time.perf_counter() - inizio
+    print(f"[Scenari] Valutazione completata in {durata * 1000:.1f} ms")
+
+    try:
+        scrivi_tabella(risultati, args.output)
+    except ImportError as e:
+        print(f"[Scenari] Formato non disponibile ({str(e).splitlines()[0]}): usare un file .csv oppure installare pyarrow")
+        sys.exit(1)
+    print(f"[Scenari] Risultati salvati in: {args.output}")
+
+    migliore = risultati.loc[risultati["profitto_eur"].idxmax()]
+    print("[Scenari] Scenario con profitto massimo: "
+          + ", ".join(f"{p} {migliore[p]:+g}" for p in PARAMETRI)
+          + f" -> profitto € {migliore['profitto_eur']:,.0f}, margine {migliore['margine_%']:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
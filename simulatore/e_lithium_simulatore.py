@@ -12,7 +12,6 @@ from datetime import datetime, timedelta
 NUM_GIORNI = 365  # giorni simulati
 DATA_INIZIO = datetime.now() - timedelta(days=NUM_GIORNI)  # Parte da 365 giorni fa fino ad oggi
 
-os.makedirs("data", exist_ok=True)
 OUTPUT_FILE = "data/e_lithium_data.csv"
 
 def simulate_environmental_data(num_days: int):
@@ -57,9 +56,9 @@ def simulate_economic_data(num_days: int, litio_estratto):
 
 
 
-def generate_dataset(num_days=NUM_GIORNI, data_inizio=DATA_INIZIO):
-    """Genera dataset completo per E-lithium S.p.A."""
-    date_rng = [data_inizio + timedelta(days=i) for i in range(num_days)]
+def generate_dataset(num_days=NUM_GIORNI, data_inizio=DATA_INIZIO, passo=timedelta(days=1)):
+    """Genera dataset completo per E-lithium S.p.A. (passo: intervallo tra due rilevazioni)"""
+    date_rng = pd.date_range(data_inizio, periods=num_days, freq=passo)
 
     temp, hum, co2, dust, water = simulate_environmental_data(num_days)
     litio, grade, energia, guasti = simulate_production_data(num_days)
@@ -90,6 +89,7 @@ def generate_dataset(num_days=NUM_GIORNI, data_inizio=DATA_INIZIO):
 
 
 if __name__ == "__main__":
+    os.makedirs("data", exist_ok=True)
     df = generate_dataset()
     df.to_csv(OUTPUT_FILE, index=False)
     print(f"[DEBUG] Directory di lavoro attuale: {os.getcwd()}")
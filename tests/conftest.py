@@ -0,0 +1,14 @@
+import os
+import sys
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# I moduli della dashboard si importano per nome, come fa e_lithium_dashboard.py
+sys.path.insert(0, os.path.join(project_dir, "dashboard"))
+sys.path.insert(0, os.path.join(project_dir, "simulatore"))
+sys.path.insert(0, os.path.join(project_dir, "scenari"))
+sys.path.insert(0, os.path.join(project_dir, "benchmark"))
+
+# Importare la dashboard non deve rigenerare il CSV né precaricare moduli in background
+os.environ.setdefault("E_LITHIUM_SKIP_SIMULATORE", "1")
+os.environ.setdefault("E_LITHIUM_PRERISCALDAMENTO", "0")
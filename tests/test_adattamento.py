@@ -0,0 +1,71 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from e_lithium_adattamento import adattamento, descrizione_test, valuta_adattamenti
+
+
+@pytest.mark.parametrize("righe", [500, 20_000])
+def test_ks_come_scipy(righe):
+    valori = np.random.default_rng(0).normal(5, 2, righe)
+    risultato = adattamento(valori, "normale")
+    media, deviazione = risultato["parametri"]["media"], risultato["parametri"]["deviazione"]
+    atteso = stats.kstest(valori, "norm", args=(media, deviazione))
+    d, p = risultato["test"]["ks"]
+    assert d == pytest.approx(atteso.statistic)
+    assert p == pytest.approx(atteso.pvalue, rel=1e-6)
+
+
+def test_anderson_darling_come_scipy():
+    valori = np.random.default_rng(1).normal(0, 1, 1000)
+    a2, _ = adattamento(valori, "normale")["test"]["ad"]
+    # scipy.stats.anderson standardizza con ddof=1: statistiche vicine ma non identiche
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)  # scelta del metodo per il p-value (scipy >= 1.17)
+        attesa = stats.anderson(valori, "norm").statistic
+    assert a2 == pytest.approx(attesa, rel=0.02)
+
+
+def test_adattamento_buono_e_cattivo():
+    rng = np.random.default_rng(2)
+    normale = adattamento(rng.normal(10, 1, 2000), "normale")
+    assert min(p for _, p in normale["test"].values()) > 0.01
+    esponenziale = adattamento(rng.exponential(1, 2000), "normale")
+    assert max(p for _, p in esponenziale["test"].values()) < 1e-6
+
+    lognormale = adattamento(np.r_[rng.lognormal(2, 0.5, 2000), -1.0, np.nan], "lognormale")
+    assert lognormale["righe"] == 2000
+    assert lognormale["parametri"]["forma"] == pytest.approx(0.5, rel=0.05)
+    assert lognormale["parametri"]["scala"] == pytest.approx(np.exp(2), rel=0.05)
+    assert lognormale["test"]["ks"][1] > 0.01
+
+
+def test_chi_quadro_poisson():
+    rng = np.random.default_rng(3)
+    risultato = adattamento(rng.poisson(4, 3000), "poisson")
+    statistica, p = risultato["test"]["chi2"]
+    assert risultato["parametri"]["lambda"] == pytest.approx(4, rel=0.05)
+    assert p > 0.01 and risultato["gradi_chi2"] >= 5
+    assert adattamento(rng.negative_binomial(2, 0.3, 3000), "poisson")["test"]["chi2"][1] < 1e-6
+
+    # Eventi rari: indice di dispersione con n - 1 gradi di libertà
+    rari = adattamento(rng.poisson(0.05, 300), "poisson")
+    assert rari["gradi_chi2"] == 299 and 0 <= rari["test"]["chi2"][1] <= 1
+
+
+def test_valutazione_in_blocco_e_legenda():
+    rng = np.random.default_rng(4)
+    df = pd.DataFrame({"a": rng.normal(size=1000), "b": rng.lognormal(size=1000), "c": rng.poisson(2, 1000)})
+    specifiche = [("a", "normale"), ("b", "lognormale"), ("c", "poisson"), ("assente", "normale")]
+    sequenziale = valuta_adattamenti(df, specifiche, parallelo=False)
+    assert list(sequenziale) == specifiche[:3]
+    assert valuta_adattamenti(df, specifiche, parallelo=True) == sequenziale
+
+    assert adattamento([1.0, 2.0], "normale") is None
+    assert adattamento(np.ones(10), "normale")["test"] == {}
+    righe = descrizione_test(sequenziale[("a", "normale")])
+    assert [r.split(" p = ")[0] for r in righe] == ["KS", "AD"] and all(r.endswith("✓") for r in righe)
+    assert descrizione_test(None) == []
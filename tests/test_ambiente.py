@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+LARGHEZZA = 320  # punti disegnabili al minimo: lo zoom richiede sempre nuove serie
+
+
+@pytest.fixture(scope="module")
+def dashboard():
+    import e_lithium_dashboard as dash
+    from e_lithium_simulatore import generate_dataset
+
+    np.random.seed(0)
+    # 60 giorni di rilevazioni ogni 10 minuti: anche gli ultimi 7 giorni superano i punti disegnabili
+    dash.imposta_dataset(generate_dataset(num_days=60 * 144, data_inizio=datetime(2024, 1, 1),
+                                          passo=timedelta(minutes=10)))
+    return dash
+
+
+def _zoom(dash, monkeypatch, periodo, inizio, fine):
+    colonne = dash.get_archivio_sensori().colonne
+    monkeypatch.setattr(dash, "componente_scatenante",
+                        lambda: {"type": "grafico-ambiente", "index": colonne[0]})
+    relayout = [{"xaxis.range[0]": str(inizio), "xaxis.range[1]": str(fine)}] + [None] * (len(colonne) - 1)
+    return dash.update_ambiente(periodo, LARGHEZZA, relayout)
+
+
+@pytest.mark.parametrize("periodo", ["7d", "30d", "90d", "all"])
+def test_zoom_con_periodo_relativo(dashboard, monkeypatch, periodo):
+    fine_dati = dashboard.get_archivio_sensori().fine
+    inizio, fine = fine_dati - pd.Timedelta(days=3), fine_dati - pd.Timedelta(days=1)
+    figure, _ = _zoom(dashboard, monkeypatch, periodo, inizio, fine)
+    for fig in figure:
+        assert not fig.layout.annotations  # nessuna figura di errore
+        x = pd.to_datetime(np.asarray(fig.data[0].x))
+        assert x.min() >= inizio and x.max() <= fine
+        assert [pd.Timestamp(v) for v in fig.layout.xaxis.range] == [inizio, fine]
+
+
+def test_zoom_oltre_il_periodo_limitato_al_periodo(dashboard, monkeypatch):
+    fine_dati = dashboard.get_archivio_sensori().fine
+    figure, _ = _zoom(dashboard, monkeypatch, "7d", fine_dati - pd.Timedelta(days=20), fine_dati)
+    inizio_periodo = fine_dati - pd.Timedelta(days=7)
+    assert pd.Timestamp(figure[0].layout.xaxis.range[0]) == inizio_periodo
+    assert pd.to_datetime(np.asarray(figure[0].data[0].x)).min() >= inizio_periodo
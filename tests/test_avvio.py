@@ -0,0 +1,46 @@
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def dashboard(monkeypatch, tmp_path):
+    import e_lithium_dashboard as dash
+    generazioni = []
+
+    def genera_csv():
+        time.sleep(0.1)  # i worker concorrenti arrivano mentre il primo sta generando
+        generazioni.append(dash.ID_AVVIO)
+        (tmp_path / "e_lithium_data.csv").write_text("data\n")
+
+    monkeypatch.setattr(dash, "csv_path", str(tmp_path / "e_lithium_data.csv"))
+    monkeypatch.setattr(dash, "genera_csv", genera_csv)
+    monkeypatch.setattr(dash, "ID_AVVIO", "1000")
+    monkeypatch.setattr(dash, "generazioni", generazioni, raising=False)
+    return dash
+
+
+def test_simulatore_eseguito_una_volta_per_avvio(dashboard):
+    # Quattro worker dello stesso master avviati insieme
+    worker = [threading.Thread(target=dashboard.esegui_simulatore) for _ in range(4)]
+    for w in worker:
+        w.start()
+    for w in worker:
+        w.join()
+    assert dashboard.generazioni == ["1000"]
+
+    # Worker riavviato dallo stesso master: legge soltanto
+    dashboard.esegui_simulatore()
+    assert dashboard.generazioni == ["1000"]
+
+
+def test_nuovo_avvio_o_csv_mancante_rigenerano(dashboard, monkeypatch, tmp_path):
+    dashboard.esegui_simulatore()
+    monkeypatch.setattr(dashboard, "ID_AVVIO", "2000")
+    dashboard.esegui_simulatore()
+    assert dashboard.generazioni == ["1000", "2000"]
+
+    (tmp_path / "e_lithium_data.csv").unlink()
+    dashboard.esegui_simulatore()
+    assert dashboard.generazioni == ["1000", "2000", "2000"]
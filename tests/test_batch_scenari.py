@@ -0,0 +1,77 @@
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import e_lithium_batch_scenari as batch
+from e_lithium_whatif import SommeCumulate
+
+
+@pytest.fixture(scope="module")
+def dati():
+    from e_lithium_simulatore import generate_dataset
+
+    np.random.seed(0)
+    return generate_dataset(num_days=400, data_inizio=datetime(2024, 1, 1))
+
+
+def _atteso(df, produzione, prezzo_delta, riduzione, inizio=None, fine=None):
+    periodo = df[df["data"].between(inizio or df["data"].min(), fine or df["data"].max())]
+    ricavi = (periodo["litio_estratto_kg"] * (1 + produzione / 100)
+              * (periodo["prezzo_litio_eur_kg"] + prezzo_delta)).sum()
+    return ricavi - (periodo["costi_eur"] * (1 - riduzione / 100)).sum()
+
+
+def test_griglia_e_valutazione(dati):
+    scenari = batch.prepara_scenari(batch.genera_griglia(["produzione_%=-10:10:10", "costi_%=0:5:5"]))
+    assert len(scenari) == 6 and (scenari["prezzo_delta_eur_kg"] == 0).all()
+
+    risultati = batch.esegui(scenari, SommeCumulate(dati))
+    for _, riga in risultati.iterrows():
+        assert riga["profitto_eur"] == pytest.approx(_atteso(dati, riga["produzione_%"], 0, riga["costi_%"]))
+    assert (risultati["righe"] == len(dati)).all()
+
+
+def test_esegui_con_processi_uguale_al_calcolo_unico(dati, monkeypatch):
+    scenari = batch.prepara_scenari(pd.DataFrame({
+        "produzione_%": np.linspace(-50, 50, 40),
+        "prezzo_delta_eur_kg": np.linspace(-30, 30, 40),
+        "inizio": ["2024-03-01"] * 20 + [None] * 20,
+        "fine": ["2024-06-30"] * 20 + [None] * 20,
+    }))
+    somme = SommeCumulate(dati)
+    monkeypatch.setattr(batch, "MIN_SCENARI_PER_PROCESSO", 1)
+    paralleli = batch.esegui(scenari, somme, processi=2)
+    pd.testing.assert_frame_equal(paralleli, batch.esegui(scenari, somme, processi=1))
+
+    riga = paralleli.iloc[0]
+    assert riga["profitto_eur"] == pytest.approx(_atteso(
+        dati, riga["produzione_%"], riga["prezzo_delta_eur_kg"], 0,
+        pd.Timestamp("2024-03-01"), pd.Timestamp("2024-06-30")))
+
+
+def test_main_scrive_il_csv(dati, tmp_path, monkeypatch, capsys):
+    csv_dati = tmp_path / "dati.csv"
+    dati.to_csv(csv_dati, index=False)
+    tabella = tmp_path / "scenari.csv"
+    pd.DataFrame({"nome": ["base", "primavera"], "inizio": [None, "2024-03-01"],
+                  "fine": [None, "2024-05-31"]}).to_csv(tabella, index=False)
+    uscita = tmp_path / "risultati" / "sweep.csv"
+
+    monkeypatch.setattr(sys, "argv", ["e_lithium_batch_scenari.py", str(tabella), "--dati", str(csv_dati),
+                                      "--griglia", "prezzo_delta_eur_kg=-5:5:5", "--output", str(uscita)])
+    batch.main()
+
+    risultati = pd.read_csv(uscita, parse_dates=["inizio", "fine"])
+    # Ogni riga della tabella è combinata con tutta la griglia
+    assert len(risultati) == 6
+    assert list(risultati["nome"]) == ["base"] * 3 + ["primavera"] * 3
+    for _, riga in risultati.iterrows():
+        inizio = None if pd.isna(riga["inizio"]) else riga["inizio"]
+        fine = None if pd.isna(riga["fine"]) else riga["fine"]
+        assert riga["profitto_eur"] == pytest.approx(_atteso(dati, 0, riga["prezzo_delta_eur_kg"], 0, inizio, fine))
+    uscita_console = capsys.readouterr().out
+    assert f"Risultati salvati in: {uscita}" in uscita_console
+    assert "Scenario con profitto massimo: produzione_% +0, prezzo_delta_eur_kg +5, costi_% +0" in uscita_console
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+import e_lithium_benchmark as benchmark
+
+
+def _report(**mediane):
+    return {"risultati": {"365": {nome: {"mediana_ms": valore} for nome, valore in mediane.items()}}}
+
+
+def test_regressioni_oltre_soglia_e_tolleranza():
+    baseline = _report(veloce=1.0, lento=100.0, stabile=50.0, rimosso=10.0)
+    risultati = _report(veloce=2.5, lento=140.0, stabile=55.0, nuovo=500.0)["risultati"]
+    regressioni = benchmark.confronta_con_baseline(risultati, baseline, soglia=0.25, tolleranza_ms=2.0)
+    # veloce: +150% ma solo 1.5 ms in più; stabile: entro il 25%; nuovo: senza riferimento
+    assert regressioni == [("365", "lento", 100.0, 140.0)]
+    assert benchmark.confronta_con_baseline(risultati, {}, 0.25, 2.0) == []
+
+
+def test_misura_svuota_le_cache_prima_di_ogni_chiamata():
+    eventi = []
+    misure = benchmark.misura(lambda df: eventi.append("chiamata"), None, ripetizioni=3,
+                              prima_di_ogni_chiamata=lambda: eventi.append("svuota"))
+    # Prima chiamata, tre ripetizioni e la chiamata sotto tracemalloc
+    assert eventi == ["svuota", "chiamata"] * 5
+    assert set(misure) == {"primo_ms", "min_ms", "mediana_ms", "picco_mb"}
+    assert misure["min_ms"] <= misure["mediana_ms"]
+
+
+def test_dataset_giornaliero_e_ad_alta_frequenza():
+    giornaliero = benchmark.crea_dataset(400)
+    assert len(giornaliero) == 400
+    assert (giornaliero["data"].diff().dropna() == timedelta(days=1)).all()
+
+    righe = benchmark.MAX_GIORNI_GIORNALIERI * 2
+    fitto = benchmark.crea_dataset(righe)
+    assert len(fitto) == righe
+    assert fitto["data"].iloc[-1] - fitto["data"].iloc[0] < benchmark.ARCO_ALTA_FREQUENZA
+
+
+def test_casi_eseguibili_sul_dataset_minimo(capsys):
+    import e_lithium_dashboard as dash
+
+    df = benchmark.crea_dataset(365)
+    dash.imposta_dataset(df)
+    casi = benchmark.casi_benchmark(dash)
+    assert len({nome for nome, _ in casi}) == len(casi)
+    for nome, funzione in casi:
+        funzione(df)
+    # Le callback riportano gli errori a console invece di sollevarli
+    assert "Errore" not in capsys.readouterr().out
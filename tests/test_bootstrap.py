@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from e_lithium_bootstrap import (
+    BUDGET_ELEMENTI, CAMPIONI_MASSIMI, CAMPIONI_MINIMI, COLONNE_KPI, dimensione_ricampionamento, intervalli_kpi,
+)
+
+
+def _dataset(righe, seme=0):
+    rng = np.random.default_rng(seme)
+    return pd.DataFrame({
+        "litio_estratto_kg": rng.normal(1000, 100, righe),
+        "purezza_%": rng.normal(99.5, 0.1, righe),
+        "profitto_eur": rng.normal(5000, 2000, righe),
+        "margine_%": rng.normal(30, 5, righe),
+    })
+
+
+def test_dimensione_entro_il_budget():
+    assert dimensione_ricampionamento(100) == (CAMPIONI_MASSIMI, 100)
+    for righe in (365, 10_000, 1_000_000):
+        campioni, m = dimensione_ricampionamento(righe)
+        assert CAMPIONI_MINIMI <= campioni <= CAMPIONI_MASSIMI
+        assert m <= righe and campioni * m <= BUDGET_ELEMENTI
+    assert dimensione_ricampionamento(1_000_000)[1] < 1_000_000  # bootstrap m su n
+
+
+def test_intervalli_contengono_la_stima_e_hanno_l_ampiezza_attesa():
+    df = _dataset(2000)
+    intervalli = intervalli_kpi(df)
+    assert intervalli["campioni"] == dimensione_ricampionamento(2000)[0]
+    for chiave, colonna in COLONNE_KPI:
+        inferiore, superiore = intervalli[f"avg_{chiave}"]
+        assert inferiore < df[colonna].mean() < superiore
+        # Ampiezza teorica di un intervallo al 95% sulla media: 2 x 1.96 sigma / sqrt(n)
+        attesa = 2 * 1.96 * df[colonna].std() / np.sqrt(len(df))
+        assert superiore - inferiore == pytest.approx(attesa, rel=0.15)
+        inferiore, superiore = intervalli[f"trend_{chiave}"]
+        assert inferiore < superiore
+
+
+def test_bootstrap_m_su_n_conserva_l_ampiezza():
+    df = _dataset(20_000)
+    completo = intervalli_kpi(df, budget=20_000 * 400)  # 400 campioni da 20.000 righe
+    ridotto = intervalli_kpi(df, budget=400_000)  # 200 campioni da 2.000 righe, dispersione riscalata
+    for chiave, _ in COLONNE_KPI:
+        ampiezza = np.diff(completo[f"avg_{chiave}"])[0]
+        assert np.diff(ridotto[f"avg_{chiave}"])[0] == pytest.approx(ampiezza, rel=0.2)
+
+
+def test_risultato_riproducibile_e_dati_insufficienti():
+    df = _dataset(500)
+    assert intervalli_kpi(df) == intervalli_kpi(df)
+    assert intervalli_kpi(df, seme=1) != intervalli_kpi(df)
+    assert intervalli_kpi(df.iloc[:3]) is None
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import spearmanr
+
+from e_lithium_correlazioni import (
+    colonne_numeriche, correlazione_ritardata, matrice_correlazione, serie_giornaliere,
+)
+
+
+def ritardata_diretta(x, y, ritardo):
+    """corr(x[t], y[t+k]) sulle coppie valide, con medie e scale dell'intera serie"""
+    x0, y0 = x - np.nanmean(x), y - np.nanmean(y)
+    if ritardo >= 0:
+        a, b = x0[:len(x0) - ritardo], y0[ritardo:]
+    else:
+        a, b = x0[-ritardo:], y0[:len(y0) + ritardo]
+    validi = ~np.isnan(a) & ~np.isnan(b)
+    scala = np.sqrt(np.nanmean(x0 ** 2) * np.nanmean(y0 ** 2))
+    return np.sum(a[validi] * b[validi]) / (validi.sum() * scala), validi.sum()
+
+
+@pytest.fixture
+def dati():
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({
+        "data": pd.date_range("2024-01-01", periods=n, freq="6h"),
+        "a": rng.normal(size=n),
+        "guasti": rng.poisson(1.0, n),
+    })
+    df["b"] = 2 * df["a"] + rng.normal(size=n)
+    df["c"] = np.exp(df["a"]) + rng.normal(0, 0.1, n)
+    return df
+
+
+def test_pearson_e_spearman_come_numpy_e_scipy(dati):
+    colonne = colonne_numeriche(dati)
+    assert colonne == ["a", "guasti", "b", "c"]
+    valori = dati[colonne].to_numpy(dtype=np.float64)
+    np.testing.assert_allclose(matrice_correlazione(dati).to_numpy(), np.corrcoef(valori, rowvar=False),
+                               atol=1e-12)
+    # Spearman con ranghi medi sulle parità (guasti)
+    np.testing.assert_allclose(matrice_correlazione(dati, "spearman").to_numpy(),
+                               spearmanr(valori).statistic, atol=1e-12)
+
+
+def test_valori_mancanti_e_variabili_costanti(dati):
+    dati.loc[::7, "b"] = np.nan
+    dati["costante"] = 3.0
+    matrice = matrice_correlazione(dati, colonne=["a", "b", "costante"])
+    attesa = dati[["a", "b"]].dropna().corr()
+    np.testing.assert_allclose(matrice.loc[["a", "b"], ["a", "b"]], attesa, atol=1e-12)
+    assert matrice.loc[["a", "b", "costante"], "costante"].isna().all()
+    assert matrice.loc["a", "a"] == 1.0
+
+    assert matrice_correlazione(dati.iloc[:1], colonne=["a", "b"]).isna().all().all()
+
+
+@pytest.mark.parametrize("ritardo_vero", [0, 5, -3])
+def test_ritardata_come_corrcoef_sulle_serie_traslate(ritardo_vero):
+    rng = np.random.default_rng(1)
+    n = 5000
+    x = rng.normal(size=n)
+    y = np.roll(x, ritardo_vero) + rng.normal(0, 0.5, n)  # y[t] ~ x[t - ritardo]
+    ritardi, correlazioni, coppie = correlazione_ritardata(x, y, 10)
+    np.testing.assert_array_equal(ritardi, np.arange(-10, 11))
+    np.testing.assert_array_equal(coppie, n - np.abs(ritardi))
+    assert ritardi[np.argmax(correlazioni)] == ritardo_vero
+
+    for ritardo, r in zip(ritardi, correlazioni):
+        assert r == pytest.approx(ritardata_diretta(x, y, ritardo)[0], abs=1e-10)
+        a, b = (x[:n - ritardo], y[ritardo:]) if ritardo >= 0 else (x[-ritardo:], y[:n + ritardo])
+        # Medie e scale globali: su serie stazionarie lunghe coincide con corrcoef dei tratti sovrapposti
+        assert r == pytest.approx(np.corrcoef(a, b)[0, 1], abs=0.01)
+
+
+def test_ritardata_esclude_i_valori_mancanti():
+    rng = np.random.default_rng(2)
+    x = rng.normal(size=600)
+    y = np.roll(x, 2) + rng.normal(0, 0.3, 600)
+    x[rng.choice(600, 60, replace=False)] = np.nan
+    y[rng.choice(600, 90, replace=False)] = np.nan
+    ritardi, correlazioni, coppie = correlazione_ritardata(x, y, 20)
+    for ritardo, r, numero in zip(ritardi, correlazioni, coppie):
+        atteso, coppie_attese = ritardata_diretta(x, y, ritardo)
+        assert numero == coppie_attese
+        assert r == pytest.approx(atteso, abs=1e-10)
+    assert ritardi[np.nanargmax(correlazioni)] == 2
+
+
+def test_ritardata_con_dati_insufficienti():
+    ritardi, correlazioni, coppie = correlazione_ritardata([1.0, np.nan, np.nan], [1.0, 2.0, 3.0], 5)
+    np.testing.assert_array_equal(ritardi, np.arange(-2, 3))
+    assert np.isnan(correlazioni).all() and (coppie == 0).all()
+    # Ritardi con una sola coppia valida restano NaN
+    ritardi, correlazioni, _ = correlazione_ritardata(np.arange(5.0), np.arange(5.0) ** 2, 4)
+    assert np.isnan(correlazioni[[0, -1]]).all() and not np.isnan(correlazioni[1:-1]).any()
+
+
+def test_serie_giornaliere_su_calendario_continuo(dati):
+    dati = dati[~dati["data"].dt.day.isin([5, 6])].sample(frac=1.0, random_state=0)
+    primo, calendario = serie_giornaliere(dati, ["a", "b"])
+    attese = dati.set_index("data")[["a", "b"]].sort_index().resample("D").mean()
+    assert primo == attese.index[0]
+    np.testing.assert_allclose(calendario, attese.to_numpy(), atol=1e-12)
+    assert np.isnan(calendario[4]).all()
+
+    primo, calendario = serie_giornaliere(dati.iloc[:0], ["a", "b"])
+    assert primo is None and calendario.shape == (0, 2)
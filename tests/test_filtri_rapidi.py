@@ -0,0 +1,73 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def dashboard():
+    import e_lithium_dashboard as dash
+    from e_lithium_simulatore import generate_dataset
+
+    np.random.seed(0)
+    dash.imposta_dataset(generate_dataset(num_days=200, data_inizio=datetime(2024, 1, 1)))
+    return dash
+
+
+@pytest.mark.parametrize("filtro", ["all", "7d", "30d", "best", "alerts"])
+def test_viste_come_filtro_diretto(dashboard, filtro):
+    df = dashboard.load_data()
+    media, std = df["profitto_eur"].mean(), df["profitto_eur"].std()
+    attese = {
+        "all": df,
+        "7d": df[df["data"] >= df["data"].max() - timedelta(days=6)],
+        "30d": df[df["data"] >= df["data"].max() - timedelta(days=29)],
+        "best": df[df["profitto_eur"] > media + 0.5 * std],
+        "alerts": df[(df["profitto_eur"] < media - 0.5 * std) | (df["purezza_%"] < 97)],
+    }
+    vista = dashboard.get_quick_filter_view(filtro)
+    assert vista.index.equals(attese[filtro].index)
+
+
+def test_tipo_filtro_dallo_store(dashboard):
+    assert dashboard.get_quick_filter_type({"filter": "best"}) == "best"
+    for selezione in (None, {}, {"filter": "sconosciuto"}):
+        assert dashboard.get_quick_filter_type(selezione) == "all"
+
+
+def test_vista_condivisa_e_invalidata_alla_nuova_versione(dashboard):
+    vista = dashboard.get_quick_filter_view("30d")
+    assert dashboard.get_quick_filter_view("30d") is vista
+
+    df = dashboard.load_data()
+    dashboard.imposta_dataset(df.iloc[:-10].copy())
+    try:
+        nuova = dashboard.get_quick_filter_view("30d")
+        assert nuova is not vista
+        assert nuova["data"].max() == df["data"].iloc[-11]
+    finally:
+        dashboard.imposta_dataset(df)
+
+
+def test_chiamate_concorrenti_calcolano_una_volta(dashboard):
+    chiamate = []
+
+    @dashboard.cache_per_versione(maxsize=4)
+    def lenta(chiave):
+        chiamate.append(chiave)
+        time.sleep(0.05)
+        return object()
+
+    risultati = []
+    thread = [threading.Thread(target=lambda c=c: risultati.append((c, lenta(c))))
+              for c in ["a"] * 4 + ["b"] * 4]
+    for t in thread:
+        t.start()
+    for t in thread:
+        t.join()
+
+    assert sorted(chiamate) == ["a", "b"]
+    for chiave in ("a", "b"):
+        assert len({id(r) for c, r in risultati if c == chiave}) == 1
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from e_lithium_guasti import COVARIATE, RischioGuasti, regressione_poisson
+
+
+def _dataset(righe=3000, seme=0):
+    rng = np.random.default_rng(seme)
+    df = pd.DataFrame({"data": pd.date_range("2020-01-01", periods=righe, freq="D")})
+    for k, (colonna, _) in enumerate(COVARIATE):
+        df[colonna] = rng.normal(10 * (k + 1), k + 1, righe)
+    z = (df["temperatura_C"] - 10) + 0.5 * (df["polveri_ug_m3"] - 40) / 4
+    df["guasti"] = rng.poisson(np.exp(-1.0 + 0.4 * z)).astype(float)
+    df.loc[rng.random(righe) < 0.01, "umidita_%"] = np.nan
+    return df
+
+
+def test_regressione_poisson_stima_di_massima_verosimiglianza():
+    rng = np.random.default_rng(1)
+    X = np.column_stack((np.ones(20000), rng.normal(size=(20000, 2))))
+    beta_vero = np.array([0.3, 0.5, -0.2])
+    y = rng.poisson(np.exp(X @ beta_vero)).astype(float)
+    beta, covarianza, iterazioni = regressione_poisson(X, y)
+    # Equazioni di verosimiglianza X' (y - mu) = 0 e stima vicina ai coefficienti veri
+    np.testing.assert_allclose(X.T @ (y - np.exp(X @ beta)), 0, atol=1e-6)
+    assert (np.abs(beta - beta_vero) < 4 * np.sqrt(np.diag(covarianza))).all()
+    assert iterazioni < 25
+    # Partendo dalla soluzione bastano pochissime iterazioni
+    assert regressione_poisson(X, y, beta)[2] <= 2
+
+
+def test_accodamento_con_nuova_stima_come_calcolo_completo():
+    df = _dataset()
+    incrementale = RischioGuasti()
+    incrementale.aggiorna(df.iloc[:2000])
+    incrementale.aggiorna(df)  # +50%: il modello viene stimato di nuovo su tutto lo storico
+    completo = RischioGuasti()
+    completo.aggiorna(df)
+    np.testing.assert_allclose(incrementale.modello.beta, completo.modello.beta, rtol=1e-6)
+    np.testing.assert_allclose(incrementale._tassi.vista(), completo._tassi.vista(), rtol=1e-6)
+    assert incrementale.tasso_giornaliero() == pytest.approx(completo.tasso_giornaliero(), rel=1e-6)
+
+
+def test_accodamento_sotto_soglia_valuta_solo_le_righe_nuove():
+    df = _dataset()
+    rischio = RischioGuasti()
+    rischio.aggiorna(df.iloc[:2900])
+    modello, tassi = rischio.modello, rischio._tassi.vista().copy()
+    rischio.aggiorna(df)
+    assert rischio.modello is modello and len(rischio) == len(df)
+    np.testing.assert_array_equal(rischio._tassi.vista()[:2900], tassi)
+    np.testing.assert_allclose(rischio._tassi.vista()[2900:], modello.tassi(df.iloc[2900:]))
+
+
+def test_storico_cambiato_riparte_da_zero():
+    df = _dataset()
+    rischio = RischioGuasti()
+    rischio.aggiorna(df)
+    assert not rischio.estende(df.iloc[1:])
+    rischio.aggiorna(df.iloc[1:])
+    completo = RischioGuasti()
+    completo.aggiorna(df.iloc[1:])
+    np.testing.assert_allclose(rischio._tassi.vista(), completo._tassi.vista())
+
+
+def test_tassi_giornalieri_e_previsione():
+    df = _dataset()
+    rischio = RischioGuasti()
+    rischio.aggiorna(df)
+    # Una riga al giorno: il tasso è la media dei tassi degli ultimi 30 giorni
+    assert rischio.tasso_giornaliero() == pytest.approx(rischio._tassi.vista()[-30:].mean())
+    attesi, inferiore, superiore, almeno_uno = rischio.prevedi(30)
+    assert attesi == pytest.approx(30 * rischio.tasso_giornaliero())
+    assert inferiore <= attesi <= superiore and 0 < almeno_uno < 1
+
+    giorni, osservati, previsti = rischio.giornaliero()
+    assert len(giorni) == len(df) and giorni[0] == np.datetime64("2020-01-01")
+    assert osservati.sum() == df["guasti"].sum()
+    # Il modello di Poisson con intercetta riproduce il totale dei guasti
+    assert previsti.sum() == pytest.approx(osservati.sum(), rel=1e-6)
+    coefficienti = rischio.modello.coefficienti()
+    assert coefficienti.set_index("covariata").loc["Temperatura", "z"] > 10
+
+
+def test_valori_riscritti_con_gli_stessi_estremi():
+    df = _dataset()
+    rischio = RischioGuasti()
+    rischio.aggiorna(df.iloc[:2900])
+    assert rischio.estende(df)
+    riscritto = df.copy()
+    riscritto.loc[100:200, "temperatura_C"] += 5  # date invariate, prima e ultima riga intatte
+    assert not rischio.estende(riscritto)
+
+    rischio.aggiorna(riscritto)
+    completo = RischioGuasti()
+    completo.aggiorna(riscritto)
+    np.testing.assert_allclose(rischio._tassi.vista(), completo._tassi.vista())
+
+    assert rischio.estende(riscritto)
+    riscritto = riscritto.copy()
+    riscritto.loc[50, "guasti"] += 1
+    assert not rischio.estende(riscritto)
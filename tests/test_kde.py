@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from e_lithium_kde import banda_scott, kde_binned, kde_logaritmica
+
+
+@pytest.mark.parametrize("righe", [50, 5000])
+def test_kde_come_gaussian_kde(righe):
+    valori = np.random.default_rng(0).normal(10, 2, righe)
+    griglia, densita = kde_binned(valori)
+    esatta = stats.gaussian_kde(valori)(griglia)
+    np.testing.assert_allclose(densita, esatta, atol=1e-4 * esatta.max())
+    assert banda_scott(valori) == pytest.approx(stats.gaussian_kde(valori).factor * valori.std(ddof=1))
+
+
+def test_densita_integra_a_uno_e_copre_le_code():
+    valori = np.random.default_rng(1).exponential(3, 2000)
+    griglia, densita = kde_binned(valori)
+    assert np.trapezoid(densita, griglia) == pytest.approx(1, abs=1e-3)
+    assert griglia[0] < valori.min() and griglia[-1] > valori.max()
+    assert (densita >= 0).all() and max(densita[0], densita[-1]) < 1e-2 * densita.max()
+
+
+def test_kde_logaritmica_sulla_scala_originale():
+    valori = np.random.default_rng(2).lognormal(1, 0.4, 3000)
+    x, densita = kde_logaritmica(np.r_[valori, 0.0, -1.0])
+    assert (x > 0).all()
+    assert np.trapezoid(densita, x) == pytest.approx(1, abs=1e-2)
+    # La moda della log-normale è exp(mu - sigma^2)
+    assert x[np.argmax(densita)] == pytest.approx(np.exp(1 - 0.4 ** 2), rel=0.1)
+
+
+def test_dati_insufficienti():
+    assert kde_binned([1.0]) is None
+    assert kde_binned([2.0, 2.0, 2.0]) is None
+    assert kde_binned([1.0, np.nan, np.inf]) is None
+    assert kde_logaritmica([-1.0, 0.0, 5.0]) is None
@@ -0,0 +1,60 @@
+import random
+import threading
+from datetime import datetime
+
+import numpy as np
+import pytest
+from werkzeug.serving import make_server
+
+import e_lithium_loadtest as loadtest
+
+
+@pytest.fixture(scope="module")
+def server():
+    """Dashboard servita da un server WSGI locale in un thread"""
+    import e_lithium_dashboard as dash
+    from e_lithium_simulatore import generate_dataset
+
+    np.random.seed(0)
+    dash.imposta_dataset(generate_dataset(num_days=200, data_inizio=datetime(2024, 1, 1)))
+    wsgi = make_server("127.0.0.1", loadtest.porta_libera(), dash.app.server, threaded=True)
+    thread = threading.Thread(target=wsgi.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{wsgi.server_port}"
+    wsgi.shutdown()
+    thread.join()
+
+
+@pytest.mark.parametrize("righe", [1, 2, 7, 100])
+def test_percentile_come_numpy(righe):
+    valori = sorted(np.random.default_rng(righe).exponential(size=righe))
+    for p in (0, 50, 95, 99, 100):
+        assert loadtest._percentile(valori, p) == pytest.approx(np.percentile(valori, p))
+    assert loadtest._percentile([], 50) == 0.0
+
+
+def test_report_delle_latenze():
+    registro = loadtest.RegistroLatenze()
+    for i in range(1, 101):
+        registro.registra("update_whatif", i / 1000, 200 if i % 10 else 204, 2048)
+    report = registro.report(durata_test=10.0)["update_whatif"]
+    assert report["richieste"] == 100 and report["rps"] == 10.0
+    assert report["p50_ms"] == 50.5 and report["max_ms"] == 100.0
+    assert report["kb_medi"] == 2.0
+    assert report["esiti"] == {"200": 90, "204": 10}
+
+
+def test_azioni_delle_sessioni_contro_la_dashboard(server):
+    registro = loadtest.RegistroLatenze()
+    client = loadtest.ClientDash(server, timeout=30, registro=registro)
+    client.carica_pagina()
+    rnd = random.Random(0)
+    for azione, _ in loadtest.AZIONI:
+        azione(client, rnd)
+
+    report = registro.report(durata_test=1.0)
+    assert {"page_load", "render_tab_content", "update_dashboard_graphs",
+            "update_whatif", "update_whatif_date_info"} <= set(report)
+    for nome, voce in report.items():
+        assert set(voce["esiti"]) <= {"200", "204"}, (nome, voce["esiti"])
+    assert report["update_whatif"]["kb_medi"] > 0
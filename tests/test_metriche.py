@@ -0,0 +1,113 @@
+import re
+import time
+
+import pytest
+
+from e_lithium_metriche import RegistroMetriche, fase, registra_righe, registro, strumenta_callback
+
+# Riga di campione del formato testuale Prometheus: nome{etichette} valore
+CAMPIONE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*",?)*\})? (\S+)$')
+
+
+class Interrotta(Exception):
+    pass
+
+
+def _campioni(testo):
+    """Campioni esportati come {(nome, etichette): valore}, controllando la sintassi di ogni riga"""
+    campioni = {}
+    dichiarati = []
+    for riga in testo.splitlines():
+        if riga.startswith("# TYPE "):
+            dichiarati.append(riga.split()[2])
+            continue
+        if riga.startswith("# HELP "):
+            continue
+        corrispondenza = CAMPIONE.match(riga)
+        assert corrispondenza, riga
+        nome, etichette, valore = corrispondenza.groups()
+        campioni[(nome, etichette or "")] = float(valore)
+    assert len(dichiarati) == len(set(dichiarati))
+    return campioni
+
+
+def test_formato_prometheus_degli_istogrammi():
+    registro_prova = RegistroMetriche()
+    for valore in (0.003, 0.02, 0.02, 7.0, 20.0):
+        registro_prova.osserva("e_lithium_callback_duration_seconds", valore, callback="update_spc")
+    registro_prova.incrementa("e_lithium_callback_total", callback="update_spc", status="ok")
+    registro_prova.incrementa("e_lithium_callback_total", 2, callback='a"b\\c', status="error")
+    testo = registro_prova.esporta_prometheus()
+    campioni = _campioni(testo)
+
+    assert testo.endswith("\n")
+    assert "# TYPE e_lithium_callback_duration_seconds histogram" in testo
+    assert "# TYPE e_lithium_callback_total counter" in testo
+    bucket = [(float(re.search(r'le="([^"]+)"', e).group(1)), v) for (n, e), v in campioni.items()
+              if n == "e_lithium_callback_duration_seconds_bucket"]
+    limiti = [limite for limite, _ in bucket]
+    assert limiti == sorted(limiti) and limiti[-1] == float("inf")
+    conteggi = [conteggio for _, conteggio in bucket]
+    assert conteggi == sorted(conteggi)  # bucket cumulativi
+    assert dict(bucket)[0.005] == 1 and dict(bucket)[0.025] == 3 and dict(bucket)[10.0] == 4
+    assert dict(bucket)[float("inf")] == 5
+    etichetta = '{callback="update_spc"}'
+    assert campioni[("e_lithium_callback_duration_seconds_count", etichetta)] == 5
+    assert campioni[("e_lithium_callback_duration_seconds_sum", etichetta)] == pytest.approx(27.043)
+    # Virgolette e backslash nelle etichette sono escapati
+    assert campioni[("e_lithium_callback_total", '{callback="a\\"b\\\\c",status="error"}')] == 2
+    assert ("process_cpu_seconds_total", "") in campioni
+
+
+def test_strumenta_fasi_righe_ed_esiti():
+    registro.azzera()
+
+    @strumenta_callback(interruzioni=(Interrotta,))
+    def callback_prova(interrompi=False):
+        with fase("load"):
+            time.sleep(0.02)
+            with fase("filter"):
+                time.sleep(0.02)
+                registra_righe(1500)
+        if interrompi:
+            raise Interrotta
+        return "ok"
+
+    assert callback_prova() == "ok"
+    with pytest.raises(Interrotta):
+        callback_prova(interrompi=True)
+    campioni = _campioni(registro.esporta_prometheus())
+
+    def valore(nome, **etichette):
+        testo = "{" + ",".join(f'{k}="{v}"' for k, v in etichette.items()) + "}"
+        return campioni[(nome, testo)]
+
+    assert valore("e_lithium_callback_total", callback="callback_prova", status="ok") == 1
+    assert valore("e_lithium_callback_total", callback="callback_prova", status="prevented") == 1
+    assert valore("e_lithium_callback_rows_sum", callback="callback_prova") == 3000
+    # Tempi esclusivi: la fase annidata non è contata due volte
+    load = valore("e_lithium_callback_phase_seconds_sum", callback="callback_prova", phase="load")
+    filtro = valore("e_lithium_callback_phase_seconds_sum", callback="callback_prova", phase="filter")
+    totale = valore("e_lithium_callback_duration_seconds_sum", callback="callback_prova")
+    assert load >= 0.02 and filtro >= 0.02
+    assert load + filtro <= totale
+
+
+def test_fasi_fuori_da_una_callback_non_registrano():
+    registro.azzera()
+    with fase("load"):
+        registra_righe(10)
+    assert "e_lithium_callback" not in registro.esporta_prometheus()
+
+
+def test_endpoint_metrics():
+    import e_lithium_dashboard as dash
+
+    registro.azzera()
+    dash.render_tab_content("tab-source", None)
+    risposta = dash.app.server.test_client().get("/metrics")
+    assert risposta.status_code == 200
+    assert risposta.mimetype == "text/plain"
+    assert "version=0.0.4" in risposta.headers["Content-Type"]
+    campioni = _campioni(risposta.get_data(as_text=True))
+    assert campioni[("e_lithium_callback_total", '{callback="render_tab_content",status="ok"}')] == 1
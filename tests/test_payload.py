@@ -0,0 +1,60 @@
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+import pytest
+
+
+@pytest.fixture(scope="module")
+def dashboard():
+    import e_lithium_dashboard as dash
+    return dash
+
+
+def test_arrotondamento_a_cifre_significative(dashboard):
+    valori = np.array([123456.789, -0.000123456789, 0.0, np.nan, np.inf])
+    arrotondati = dashboard.arrotonda_cifre_significative(valori, 3)
+    np.testing.assert_array_equal(arrotondati[:3], [123000.0, -0.000123, 0.0])
+    assert np.isnan(arrotondati[3]) and np.isinf(arrotondati[4])
+
+
+def test_ottimizza_figura_solo_coordinate_delle_linee(dashboard):
+    valori = np.random.default_rng(0).normal(100, 1, 1000)
+    fig = go.Figure([
+        go.Scatter(x=np.arange(1000), y=valori, customdata=valori),
+        go.Histogram(x=valori),
+        go.Box(y=valori),
+    ])
+    dashboard.ottimizza_figura(fig, cifre=4)
+    linea, istogramma, scatola = fig.data
+    np.testing.assert_array_equal(linea.y, dashboard.arrotonda_cifre_significative(valori, 4))
+    np.testing.assert_array_equal(linea.x, np.arange(1000))  # interi invariati
+    # customdata e campioni aggregati dal browser restano a precisione piena
+    np.testing.assert_array_equal(linea.customdata, valori)
+    np.testing.assert_array_equal(istogramma.x, valori)
+    np.testing.assert_array_equal(scatola.y, valori)
+
+    fig = go.Figure(go.Scatter(y=valori))
+    np.testing.assert_array_equal(dashboard.ottimizza_figura(fig, cifre=0).data[0].y, valori)
+
+
+def test_statistiche_payload_per_callback(dashboard):
+    client = dashboard.app.server.test_client()
+    corpo = {
+        "output": "purezza-display.children",
+        "outputs": {"id": "purezza-display", "property": "children"},
+        "inputs": [{"id": "purezza-range", "property": "drag_value", "value": [99.1, 99.9]}],
+        "state": [{"id": "purezza-range", "property": "value", "value": [99.0, 100.0]}],
+        "changedPropIds": ["purezza-range.drag_value"],
+    }
+    prima = dashboard.get_statistiche_payload().get("purezza-display.children", {"richieste": 0})
+    for _ in range(2):
+        risposta = client.post("/_dash-update-component", json=corpo)
+        assert risposta.status_code == 200
+        assert "99.1000 - 99.9000" in risposta.get_data(as_text=True)
+
+    report = json.loads(client.get("/_e-lithium/payload").get_data(as_text=True))
+    voce = report["purezza-display.children"]
+    assert voce["richieste"] == prima["richieste"] + 2
+    assert voce["byte_json"] > 0 and voce["byte_inviati"] > 0
+    assert voce["media_json"] == pytest.approx(voce["byte_json"] / voce["richieste"])
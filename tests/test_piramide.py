@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from e_lithium_piramide import GREZZI, PiramideAggregazioni, interseca_intervalli
+
+
+def _dataset(righe=5000, seme=0):
+    rng = np.random.default_rng(seme)
+    date = pd.Timestamp("2023-01-01") + pd.to_timedelta(np.sort(rng.uniform(0, 400, righe)), unit="D")
+    df = pd.DataFrame({"data": date, "a": rng.normal(10, 2, righe), "b": rng.poisson(3, righe).astype(float)})
+    df.loc[rng.random(righe) < 0.1, "a"] = np.nan
+    return df
+
+
+def test_livelli_come_groupby():
+    df = _dataset()
+    piramide = PiramideAggregazioni(df)
+    for codice, periodo in (("D", "D"), ("W", "W-SUN"), ("M", "M"), ("Q", "Q-DEC")):
+        atteso = df.groupby(df["data"].dt.to_period(periodo))["a"].agg(["sum", "mean", "min", "max", "count"])
+        livello = piramide.livelli[codice]
+        np.testing.assert_array_equal(livello["data"], atteso.index.start_time)
+        np.testing.assert_allclose(livello["a_sum"], atteso["sum"])
+        np.testing.assert_allclose(livello["a_mean"], atteso["mean"])
+        np.testing.assert_allclose(livello["a_min"], atteso["min"])
+        np.testing.assert_allclose(livello["a_max"], atteso["max"])
+        np.testing.assert_array_equal(livello["a_count"], atteso["count"])
+        assert livello["conteggio"].sum() == len(df)
+        assert "b_count" not in livello  # nessun valore mancante: bastano i conteggi delle righe
+
+
+def test_derivate_e_intervalli():
+    df = _dataset()
+    piramide = PiramideAggregazioni(df, derivate={"doppio_b": lambda d: 2 * d["b"]})
+    np.testing.assert_allclose(piramide.livelli["M"]["doppio_b_sum"], 2 * piramide.livelli["M"]["b_sum"])
+
+    inizio, fine = pd.Timestamp("2023-03-01"), pd.Timestamp("2023-03-31")
+    righe = piramide.righe(GREZZI, inizio, fine)
+    assert len(righe) == ((df["data"] >= inizio) & (df["data"] <= fine)).sum()
+    assert piramide.conta("D", inizio, None) == (piramide.livelli["D"]["data"] >= inizio).sum()
+    assert piramide.conta(GREZZI, fine, inizio) == 0
+
+
+def test_seleziona_livello_per_punti_disegnabili():
+    piramide = PiramideAggregazioni(_dataset())
+    assert piramide.seleziona(None, None, 2000)[0] == GREZZI
+    livello, righe = piramide.seleziona(None, None, 100)
+    assert livello == "W" and len(righe) <= 100
+    assert piramide.seleziona(None, None, 2)[0] == "Q"
+
+
+def test_dataset_vuoto_e_non_ordinato():
+    vuota = PiramideAggregazioni(_dataset().iloc[:0])
+    assert vuota.livelli == {} and vuota.data_min is None
+    assert vuota.seleziona(None, None, 10)[0] == GREZZI
+
+    df = _dataset()
+    mescolato = PiramideAggregazioni(df.sample(frac=1, random_state=0))
+    pd.testing.assert_frame_equal(mescolato.livelli["W"], PiramideAggregazioni(df).livelli["W"])
+
+
+def test_interseca_intervalli_con_estremi_aperti():
+    gen, mar = pd.Timestamp("2024-01-01"), pd.Timestamp("2024-03-01")
+    feb, apr = pd.Timestamp("2024-02-01"), pd.Timestamp("2024-04-01")
+    assert interseca_intervalli(None, (gen, mar)) == (gen, mar)
+    assert interseca_intervalli((gen, mar), None) == (gen, mar)
+    assert interseca_intervalli((gen, mar), (feb, apr)) == (feb, mar)
+    assert interseca_intervalli((feb, None), (gen, mar)) == (feb, mar)
+    assert interseca_intervalli((None, mar), (feb, apr)) == (feb, mar)
+    assert interseca_intervalli((None, None), (feb, apr)) == (feb, apr)
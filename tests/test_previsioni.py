@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from e_lithium_previsioni import PrevisoreHolt, serie_da_livello_giornaliero
+
+PRIMO_GIORNO = pd.Timestamp("2024-01-01")
+
+
+def _storico(giorni=120, seme=0):
+    rng = np.random.default_rng(seme)
+    tempo = np.arange(giorni)[:, None]
+    valori = 1000 + 2.0 * tempo + rng.normal(0, 20, (giorni, 4)) * [1, 0.05, 30, 30]
+    valori[rng.random(valori.shape) < 0.05] = np.nan  # giorni senza rilevazioni
+    return valori
+
+
+def _previsione_da_zero(valori, orizzonte=30):
+    previsore = PrevisoreHolt()
+    previsore.aggiorna(PRIMO_GIORNO, valori)
+    return previsore.prevedi(orizzonte)
+
+
+def _uguali(a, b):
+    date_a, *matrici_a = a
+    date_b, *matrici_b = b
+    assert (date_a == date_b).all()
+    for x, y in zip(matrici_a, matrici_b):
+        np.testing.assert_allclose(x, y, rtol=1e-12)
+
+
+def test_aggiornamento_incrementale_come_stima_da_zero():
+    valori = _storico()
+    previsore = PrevisoreHolt()
+    for giorni in (1, 2, 40, 41, 90, 120):
+        previsore.aggiorna(PRIMO_GIORNO, valori[:giorni])
+    assert len(previsore) == 120
+    _uguali(previsore.prevedi(30), _previsione_da_zero(valori))
+
+
+def test_ultimo_giorno_provvisorio_rielaborato():
+    valori = _storico()
+    parziale = valori.copy()
+    parziale[-1] = valori[-1] / 2  # l'ultimo giorno riceve altre righe dopo il primo aggiornamento
+    previsore = PrevisoreHolt()
+    previsore.aggiorna(PRIMO_GIORNO, parziale)
+    previsore.aggiorna(PRIMO_GIORNO, valori)
+    _uguali(previsore.prevedi(30), _previsione_da_zero(valori))
+
+
+def test_storico_riscritto_riparte_da_zero():
+    valori = _storico()
+    riscritto = valori.copy()
+    riscritto[10:20] *= 1.5  # giorni già confermati che cambiano, stessa lunghezza e stesso primo giorno
+    previsore = PrevisoreHolt()
+    previsore.aggiorna(PRIMO_GIORNO, valori[:100])
+    previsore.aggiorna(PRIMO_GIORNO, riscritto)
+    _uguali(previsore.prevedi(30), _previsione_da_zero(riscritto))
+
+
+def test_storico_troncato_o_con_altro_inizio():
+    valori = _storico()
+    previsore = PrevisoreHolt()
+    previsore.aggiorna(PRIMO_GIORNO, valori)
+    previsore.aggiorna(PRIMO_GIORNO, valori[:60])
+    _uguali(previsore.prevedi(7), _previsione_da_zero(valori[:60], 7))
+
+    previsore.aggiorna(PRIMO_GIORNO + pd.Timedelta(days=1), valori[1:])
+    date, previsione, _, _ = previsore.prevedi(7)
+    attese = PrevisoreHolt()
+    attese.aggiorna(PRIMO_GIORNO + pd.Timedelta(days=1), valori[1:])
+    np.testing.assert_allclose(previsione, attese.prevedi(7)[1])
+    assert date[0] == PRIMO_GIORNO + pd.Timedelta(days=120)
+
+
+def test_intervallo_contiene_la_previsione_e_si_allarga():
+    _, previsione, inferiore, superiore = _previsione_da_zero(_storico(), 90)
+    assert (inferiore <= previsione).all() and (previsione <= superiore).all()
+    ampiezza = superiore - inferiore
+    assert (np.diff(ampiezza, axis=0) >= -1e-9).all()
+
+
+def test_serie_da_livello_giornaliero_su_calendario_continuo():
+    giornaliero = pd.DataFrame({
+        "data": pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-05"]),
+        "litio_estratto_kg_sum": [1.0, 2.0, 5.0],
+        "prezzo_litio_eur_kg_mean": [10.0, 11.0, 12.0],
+        "costi_eur_sum": [3.0, 4.0, 5.0],
+        "profitto_eur_sum": [7.0, 8.0, 9.0],
+    })
+    primo_giorno, valori = serie_da_livello_giornaliero(giornaliero)
+    assert primo_giorno == PRIMO_GIORNO
+    assert valori.shape == (5, 4)
+    assert np.isnan(valori[2:4]).all()
+    np.testing.assert_array_equal(valori[4], [5.0, 12.0, 5.0, 9.0])
+
+    vuoto, valori = serie_da_livello_giornaliero(giornaliero.iloc[:0])
+    assert vuoto is None and valori.shape == (0, 4)
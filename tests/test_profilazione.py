@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+
+import flask
+import pytest
+
+import e_lithium_profilazione as profilazione
+
+
+def lavoro(n):
+    time.sleep(0.03)
+    return sum(range(n))
+
+
+@pytest.fixture
+def attiva(monkeypatch, tmp_path):
+    """Profilazione attiva nella modalità indicata, con i profili in una cartella temporanea"""
+    def imposta(modalita, callback=()):
+        monkeypatch.setattr(profilazione, "MODALITA", modalita)
+        monkeypatch.setattr(profilazione, "ABILITATA", True)
+        monkeypatch.setattr(profilazione, "CALLBACK_SELEZIONATE", set(callback))
+        monkeypatch.setattr(profilazione, "PROFILE_DIR", str(tmp_path))
+        monkeypatch.setattr(profilazione, "INTERVALLO_CAMPIONAMENTO_S", 0.001)
+        return tmp_path
+    return imposta
+
+
+def _estensioni(cartella):
+    return sorted(os.path.splitext(nome)[1] for nome in os.listdir(cartella)) if cartella.exists() else []
+
+
+def test_disattivata_restituisce_la_funzione(monkeypatch):
+    monkeypatch.setattr(profilazione, "ABILITATA", False)
+    assert profilazione.profila(lavoro) is lavoro
+
+
+def test_callback_non_selezionata_senza_wrapper(attiva):
+    attiva("always", callback=["update_spc"])
+    assert profilazione.profila(lavoro) is lavoro
+
+
+def test_sempre_scrive_profilo_e_stack(attiva):
+    cartella = attiva("always")
+    profilata = profilazione.profila(lavoro)
+    assert profilata is not lavoro and profilata.__name__ == "lavoro"
+    assert profilata(1000) == sum(range(1000))
+    assert _estensioni(cartella) == [".folded", ".prof", ".txt"]
+
+    folded = next(cartella.glob("*.folded")).read_text(encoding="utf-8").splitlines()
+    assert folded
+    for riga in folded:
+        stack, conteggio = riga.rsplit(" ", 1)
+        assert int(conteggio) > 0 and ";" in stack
+    assert any("lavoro (test_profilazione.py:" in riga for riga in folded)
+
+
+def test_eccezioni_propagate_con_profilo_salvato(attiva):
+    cartella = attiva("always")
+
+    @profilazione.profila
+    def fallisce():
+        raise ValueError("errore")
+
+    with pytest.raises(ValueError):
+        fallisce()
+    assert ".prof" in _estensioni(cartella)
+
+
+def test_su_richiesta_solo_con_header_query_o_referer(attiva):
+    cartella = attiva("request")
+    profilata = profilazione.profila(lavoro)
+    app = flask.Flask(__name__)
+
+    profilata(10)  # fuori da una richiesta HTTP
+    with app.test_request_context("/_dash-update-component", method="POST"):
+        profilata(10)
+    assert _estensioni(cartella) == []
+
+    richieste = [
+        {"headers": {profilazione.HEADER_PROFILO: "1"}},
+        {"query_string": {"profile": "1"}},
+        {"headers": {"Referer": "http://localhost:8050/?profile=1"}},
+    ]
+    for numero, richiesta in enumerate(richieste, start=1):
+        with app.test_request_context("/_dash-update-component", method="POST", **richiesta):
+            profilata(10)
+        assert len(list(cartella.glob("*.prof"))) == numero
+
+
+def test_profilazioni_sovrapposte_eseguite_senza_profilo(attiva):
+    cartella = attiva("always")
+    profilata = profilazione.profila(lavoro)
+    assert profilazione._profilo_lock.acquire()
+    try:
+        assert profilata(10) == 45
+    finally:
+        profilazione._profilo_lock.release()
+    assert _estensioni(cartella) == []
+
+
+def test_campionatore_conta_gli_stack(tmp_path):
+    campionatore = profilazione.CampionatoreStack(threading.get_ident(), 0.001)
+    campionatore.start()
+    time.sleep(0.05)
+    campionatore.ferma()
+    assert sum(campionatore.conteggi.values()) > 0
+    campionatore.salva_folded(str(tmp_path / "stack.folded"))
+    righe = (tmp_path / "stack.folded").read_text(encoding="utf-8").splitlines()
+    conteggi = [int(riga.rsplit(" ", 1)[1]) for riga in righe]
+    assert conteggi == sorted(conteggi, reverse=True)
@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from dash import no_update
+
+
+@pytest.fixture(scope="module")
+def dashboard():
+    import e_lithium_dashboard as dash
+    from e_lithium_simulatore import generate_dataset
+
+    np.random.seed(0)
+    dash.imposta_dataset(generate_dataset(num_days=120, data_inizio=datetime(2024, 1, 1)))
+    return dash
+
+
+def _salva(dash, monkeypatch, salvati, nome=None, leve=(10, 5, 5)):
+    monkeypatch.setattr(dash, "componente_scatenante", lambda: "scenario-salva")
+    salvati, _ = dash.gestisci_scenari_salvati(1, None, nome, *leve, [], salvati)
+    return salvati
+
+
+def _elimina(dash, monkeypatch, salvati, nomi):
+    monkeypatch.setattr(dash, "componente_scatenante", lambda: "scenario-elimina")
+    salvati, _ = dash.gestisci_scenari_salvati(None, 1, None, 0, 0, 0, nomi, salvati)
+    return salvati
+
+
+def test_nome_predefinito_non_sovrascrive_dopo_eliminazione(dashboard, monkeypatch):
+    salvati = []
+    for _ in range(3):
+        salvati = _salva(dashboard, monkeypatch, salvati)
+    assert [s["nome"] for s in salvati] == ["Scenario 1", "Scenario 2", "Scenario 3"]
+
+    salvati = _elimina(dashboard, monkeypatch, salvati, ["Scenario 1"])
+    salvati = _salva(dashboard, monkeypatch, salvati, leve=(-10, 0, 20))
+    nomi = [s["nome"] for s in salvati]
+    assert sorted(nomi) == ["Scenario 1", "Scenario 2", "Scenario 3"]
+    # "Scenario 3" conserva le leve con cui era stato salvato
+    assert next(s for s in salvati if s["nome"] == "Scenario 3")["leve"] == [10.0, 5.0, 5.0]
+    assert next(s for s in salvati if s["nome"] == "Scenario 1")["leve"] == [-10.0, 0.0, 20.0]
+
+    # Un nome esplicito già usato continua a sovrascrivere
+    salvati = _salva(dashboard, monkeypatch, salvati, nome="Scenario 2", leve=(1, 1, 1))
+    assert len(salvati) == 3
+    assert next(s for s in salvati if s["nome"] == "Scenario 2")["leve"] == [1.0, 1.0, 1.0]
+
+
+def test_risultati_salvati_con_la_versione(dashboard, monkeypatch):
+    salvati = _salva(dashboard, monkeypatch, [], nome="A", leve=(10, 5, 5))
+    scenario = salvati[0]
+    assert scenario["versione"] == str(dashboard.get_dataset_version())
+    attesi = dashboard.risultati_giornalieri(dashboard.get_giornaliero(), (10, 5, 5))
+    for metrica in dashboard.METRICHE_SCENARIO:
+        np.testing.assert_allclose(scenario["risultati"][metrica], attesi[metrica])
+
+    # Con la versione invariata il confronto usa lo store e non lo riscrive
+    chiamate = []
+    originale = dashboard.risultati_giornalieri
+    monkeypatch.setattr(dashboard, "risultati_giornalieri",
+                        lambda *args, **kwargs: chiamate.append(args) or originale(*args, **kwargs))
+    fig, store = dashboard.update_confronto_scenari(["A"], "profitto", None, 1400, salvati)
+    assert store is no_update and not chiamate
+    assert len(fig.data) == 1
+    np.testing.assert_allclose(fig.data[0].y, attesi["profitto"], rtol=1e-3)
+
+
+def test_scenari_ricalcolati_quando_cambia_la_versione(dashboard, monkeypatch):
+    vecchio_formato = {"nome": "B", "leve": [-10, 0, 20]}
+    salvati = _salva(dashboard, monkeypatch, [vecchio_formato], nome="A", leve=(10, 5, 5))
+    salvati[1] = dict(salvati[1], versione="versione precedente")
+
+    fig, store = dashboard.update_confronto_scenari(["A", "B"], "margine", None, 1400, salvati)
+    assert len(fig.data) == 2
+    versione = str(dashboard.get_dataset_version())
+    assert [s["versione"] for s in store] == [versione, versione]
+    attesi = dashboard.risultati_giornalieri(dashboard.get_giornaliero(), (-10, 0, 20))
+    np.testing.assert_allclose(store[0]["risultati"]["delta_profitto"], attesi["delta_profitto"])
+    # Lo store ricevuto in ingresso non è modificato
+    assert "risultati" not in vecchio_formato
+
+    # Gli scenari aggiornati non sono più ricalcolati
+    _, store = dashboard.update_confronto_scenari(["A", "B"], "margine", None, 1400, store)
+    assert store is no_update
+
+
+def test_lista_scenari_conserva_la_selezione(dashboard):
+    salvati = [{"nome": "A"}, {"nome": "B"}]
+    opzioni, valori = dashboard.update_lista_scenari(salvati, [], [])
+    assert valori == ["A", "B"]
+    # Un nuovo scenario entra nel confronto, "A" resta deselezionato
+    opzioni, valori = dashboard.update_lista_scenari(salvati + [{"nome": "C"}], opzioni, ["B"])
+    assert valori == ["B", "C"]
+    with pytest.raises(dashboard.PreventUpdate):
+        dashboard.update_lista_scenari(salvati + [{"nome": "C"}], opzioni, valori)
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from e_lithium_sensori import ArchivioSensori, stato_valore
+
+
+def _archivio(righe, seme=0):
+    rng = np.random.default_rng(seme)
+    df = pd.DataFrame({
+        "data": pd.date_range("2024-01-01", periods=righe, freq="min"),
+        "temperatura_C": rng.normal(28, 2, righe),
+        "CO2_ppm": np.full(righe, 400.0),
+    })
+    return ArchivioSensori.da_dataframe(df), df
+
+
+@pytest.mark.parametrize("righe, punti", [(1001, 1000), (1500, 1000), (10_007, 300), (100_000, 999)])
+def test_riduzione_senza_duplicati_entro_i_punti(righe, punti):
+    archivio, df = _archivio(righe)
+    tempi, valori = archivio.riduci("temperatura_C", punti=punti)
+    assert len(valori) <= punti
+    assert len(np.unique(tempi)) == len(tempi) and (np.diff(tempi.astype(np.int64)) > 0).all()
+    # Minimo e massimo globali sempre presenti
+    serie = df["temperatura_C"].to_numpy(dtype=np.float32)
+    assert valori.min() == serie.min() and valori.max() == serie.max()
+    # Ogni punto è una rilevazione reale
+    np.testing.assert_array_equal(serie[np.searchsorted(df["data"].to_numpy(), tempi)], valori)
+
+
+def test_riduzione_di_serie_costanti_e_corte():
+    archivio, _ = _archivio(5000)
+    tempi, valori = archivio.riduci("CO2_ppm", punti=100)
+    assert 0 < len(valori) <= 50 and (valori == 400).all()
+    tempi, valori = archivio.riduci("temperatura_C", "2024-01-01 00:10", "2024-01-01 00:19", punti=100)
+    assert len(valori) == 10  # sotto i punti disegnabili: serie completa
+
+
+def test_finestra_accodamento_e_statistiche():
+    archivio, df = _archivio(100)
+    i, j = archivio.finestra("2024-01-01 00:10", "2024-01-01 00:20")
+    assert (i, j) == (10, 21)
+    assert archivio.finestra("2025-01-01") == (100, 100)
+    with pytest.raises(ValueError):
+        archivio.aggiungi(df["data"].iloc[:1], {c: [1.0] for c in archivio.colonne})
+    archivio.aggiungi([archivio.fine + pd.Timedelta(minutes=1)], {"temperatura_C": [40.0], "CO2_ppm": [400.0]})
+    statistiche = archivio.statistiche("temperatura_C")
+    assert statistiche["ultimo"] == 40.0 and statistiche["rilevazioni"] == 101
+    quote = statistiche["quota_ottimale"] + statistiche["quota_attenzione"] + statistiche["quota_critica"]
+    assert quote == pytest.approx(1.0)
+    assert archivio.statistiche("temperatura_C", "2030-01-01") is None
+    assert [stato_valore("temperatura_C", v) for v in (28, 32, 40)] == ["ottimale", "attenzione", "critico"]
@@ -0,0 +1,103 @@
+import math
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from e_lithium_serie import (
+    PUNTI_MINIMI, SOGLIA_MARCATORI, SOGLIA_WEBGL, filtra_finestra, finestra_da_relayout, lttb,
+    punti_disegnabili, traccia_temporale,
+)
+
+
+def lttb_riferimento(x, y, punti):
+    """LTTB punto per punto, come nella descrizione originale dell'algoritmo"""
+    n = len(x)
+    ogni = (n - 2) / (punti - 2)
+    indici, a = [0], 0
+    for i in range(punti - 2):
+        inizio_media = math.floor((i + 1) * ogni) + 1
+        fine_media = min(math.floor((i + 2) * ogni) + 1, n)
+        media_x = sum(x[inizio_media:fine_media]) / (fine_media - inizio_media)
+        media_y = sum(y[inizio_media:fine_media]) / (fine_media - inizio_media)
+        area_massima, scelto = -1.0, None
+        for b in range(math.floor(i * ogni) + 1, math.floor((i + 1) * ogni) + 1):
+            area = abs((x[a] - media_x) * (y[b] - y[a]) - (x[a] - x[b]) * (media_y - y[a]))
+            if area > area_massima:
+                area_massima, scelto = area, b
+        indici.append(scelto)
+        a = scelto
+    return np.array(indici + [n - 1])
+
+
+@pytest.mark.parametrize("n, punti", [(1000, 100), (1003, 37), (50, 49), (10_000, 3)])
+def test_lttb_come_riferimento(n, punti):
+    rng = np.random.default_rng(n)
+    x = np.sort(rng.uniform(0, 1000, n))
+    y = np.cumsum(rng.normal(size=n))
+    indici = lttb(x, y, punti)
+    np.testing.assert_array_equal(indici, lttb_riferimento(list(x), list(y), punti))
+    assert len(indici) == punti
+    assert indici[0] == 0 and indici[-1] == n - 1
+    assert (np.diff(indici) > 0).all()
+
+
+def test_lttb_conserva_i_picchi_e_le_serie_corte():
+    y = np.zeros(5000)
+    y[1234], y[3210] = 50.0, -40.0
+    indici = lttb(np.arange(5000), y, 100)
+    assert {1234, 3210} <= set(indici)
+    np.testing.assert_array_equal(lttb(np.arange(10), np.arange(10), 20), np.arange(10))
+    np.testing.assert_array_equal(lttb(np.arange(10), np.arange(10), 2), np.arange(10))
+
+
+def test_lttb_su_timestamp_in_nanosecondi():
+    date = pd.date_range("2024-01-01", periods=20_000, freq="min")
+    y = np.sin(np.arange(20_000) / 300) + np.random.default_rng(0).normal(0, 0.1, 20_000)
+    # Date equispaziate: stessa scelta che con l'indice delle righe
+    np.testing.assert_array_equal(lttb(date.asi8, y, 500), lttb(np.arange(20_000), y, 500))
+
+
+def test_punti_disegnabili():
+    assert punti_disegnabili(1400) == 1400
+    assert punti_disegnabili(1400, frazione=0.5) == 700
+    assert punti_disegnabili(100) == PUNTI_MINIMI
+    assert punti_disegnabili(None) == 1200
+
+
+def test_finestra_da_relayout():
+    attesa = (pd.Timestamp("2024-01-01"), pd.Timestamp("2024-02-01"))
+    assert finestra_da_relayout({"xaxis.range[0]": "2024-01-01", "xaxis.range[1]": "2024-02-01"}) == attesa
+    assert finestra_da_relayout({"xaxis.range": ["2024-02-01", "2024-01-01"]}) == attesa
+    assert finestra_da_relayout({"xaxis.autorange": True}) == "auto"
+    assert finestra_da_relayout({"xaxis2.range[0]": "2024-01-01", "xaxis2.range[1]": "2024-02-01"},
+                                asse="xaxis2") == attesa
+    for evento in (None, {}, {"autosize": True}, {"xaxis.range[0]": "2024-01-01"},
+                   {"xaxis.range": ["non una data", "2024-01-01"]}):
+        assert finestra_da_relayout(evento) is None
+
+
+def test_filtra_finestra():
+    df = pd.DataFrame({"data": pd.date_range("2024-01-01", periods=60), "valore": range(60)})
+    finestra = (pd.Timestamp("2024-01-10"), pd.Timestamp("2024-01-19"))
+    assert list(filtra_finestra(df, finestra)["valore"]) == list(range(9, 19))
+    assert filtra_finestra(df, "auto") is df and filtra_finestra(df, None) is df
+
+
+def test_traccia_temporale_ridotta_e_webgl():
+    date = pd.date_range("2024-01-01", periods=5000, freq="h")
+    y = np.random.default_rng(1).normal(size=5000)
+    customdata = np.arange(5000)
+
+    traccia, ridotta = traccia_temporale(date, y, 1500, customdata=customdata, name="serie")
+    assert ridotta and isinstance(traccia, go.Scattergl)
+    assert len(traccia.x) == 1500 and traccia.mode == "lines" and traccia.name == "serie"
+    assert pd.Timestamp(traccia.x[0]) == date[0] and pd.Timestamp(traccia.x[-1]) == date[-1]
+    # customdata segue i punti scelti
+    np.testing.assert_array_equal(y[traccia.customdata], traccia.y)
+
+    traccia, ridotta = traccia_temporale(date[:SOGLIA_MARCATORI], y[:SOGLIA_MARCATORI], 1500)
+    assert not ridotta and isinstance(traccia, go.Scatter) and traccia.mode == "lines+markers"
+    traccia, _ = traccia_temporale(date[:SOGLIA_WEBGL + 1], y[:SOGLIA_WEBGL + 1], 5000, mode="markers+lines")
+    assert isinstance(traccia, go.Scattergl) and traccia.mode == "lines"
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from e_lithium_spc import CARTE, MonitorSPC, cusum_lindley
+
+
+def _dataset(righe=2000, seme=0):
+    rng = np.random.default_rng(seme)
+    purezza = rng.normal(99.5, 0.1, righe)
+    purezza[1500:1600] += 0.3  # deriva da rilevare
+    purezza[rng.random(righe) < 0.02] = np.nan
+    return pd.DataFrame({
+        "data": pd.date_range("2020-01-01", periods=righe, freq="D"),
+        "purezza_%": purezza,
+        "guasti": rng.poisson(0.4, righe).astype(float),
+    })
+
+
+def _uguali(a, b):
+    for carta in CARTE:
+        x, y = a.carta(carta), b.carta(carta)
+        np.testing.assert_array_equal(x["tempi"], y["tempi"])
+        np.testing.assert_allclose(np.asarray(x["valori"]), np.asarray(y["valori"]), rtol=1e-12)
+        np.testing.assert_array_equal(x["allarmi"], y["allarmi"])
+    assert a.riepilogo() == b.riepilogo()
+
+
+def test_cusum_lindley_come_ricorsione():
+    incrementi = np.random.default_rng(1).normal(0, 1, 500)
+    attesi, c = [], 2.0
+    for y in incrementi:
+        c = max(0.0, c + y)
+        attesi.append(c)
+    np.testing.assert_allclose(cusum_lindley(incrementi, 2.0), attesi)
+
+
+def test_accodamento_come_calcolo_completo():
+    df = _dataset()
+    completo = MonitorSPC.da_dataframe(df)
+    incrementale = MonitorSPC.da_dataframe(df.iloc[:333])
+    for inizio, fine in ((333, 334), (334, 1001), (1001, len(df))):
+        assert incrementale.estende(df)
+        incrementale.aggiungi_righe(df.iloc[inizio:fine])
+    assert len(incrementale) == len(df)
+    _uguali(incrementale, completo)
+
+
+def test_ewma_e_sottogruppi():
+    df = _dataset()
+    monitor = MonitorSPC.da_dataframe(df)
+    x = df["purezza_%"].dropna().to_numpy()
+    z, attesi = monitor.parametri["centro"], []
+    for valore in x:
+        z = 0.2 * valore + 0.8 * z
+        attesi.append(z)
+    np.testing.assert_allclose(monitor.carta("ewma")["valori"], attesi)
+
+    completi = len(x) // 5 * 5
+    np.testing.assert_allclose(monitor.carta("xbar")["valori"], x[:completi].reshape(-1, 5).mean(axis=1))
+    assert len(monitor.carta("c")["valori"]) == len(df) // 7
+
+
+def test_deriva_rilevata_nella_finestra():
+    monitor = MonitorSPC.da_dataframe(_dataset())
+    riepilogo = monitor.riepilogo("2024-01-01", "2024-06-30")  # righe 1461-1642
+    assert riepilogo["cusum"]["allarmi"] > 0
+    assert riepilogo["ewma"]["allarmi"] > 0
+    finestra = monitor.carta("ewma", "2024-01-01", "2024-06-30")
+    assert finestra["tempi"][0] >= np.datetime64("2024-01-01")
+    assert (finestra["allarmi"] < len(finestra["tempi"])).all()
+    assert monitor.riepilogo("2030-01-01")["xbar"]["punti"] == 0
+
+
+def test_storico_diverso_e_righe_non_successive():
+    df = _dataset()
+    monitor = MonitorSPC.da_dataframe(df.iloc[:500])
+    assert not monitor.estende(df.iloc[:400])
+    assert not monitor.estende(df.iloc[1:])
+    assert not MonitorSPC().estende(df)
+    with pytest.raises(ValueError):
+        monitor.aggiungi_righe(df.iloc[100:200])
+    with pytest.raises(ValueError):
+        MonitorSPC(dimensione_sottogruppo=11)
+
+
+def test_valori_riscritti_con_gli_stessi_estremi():
+    df = _dataset()
+    monitor = MonitorSPC.da_dataframe(df.iloc[:1000])
+    riscritto = df.copy()
+    riscritto.loc[200:300, "purezza_%"] += 0.5  # date invariate, prima e ultima riga intatte
+    assert monitor.estende(df)
+    assert not monitor.estende(riscritto)
+    riscritto = df.copy()
+    riscritto.loc[500, "guasti"] += 1
+    assert not monitor.estende(riscritto)
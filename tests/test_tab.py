@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+TAB = ["tab-summary", "tab-dashboard", "tab-ambiente", "tab-spc", "tab-about", "tab-whatif", "tab-source"]
+
+
+@pytest.fixture(scope="module")
+def dashboard():
+    import e_lithium_dashboard as dash
+    from e_lithium_simulatore import generate_dataset
+
+    np.random.seed(0)
+    dash.imposta_dataset(generate_dataset(num_days=200, data_inizio=datetime(2024, 1, 1)))
+    return dash
+
+
+@pytest.mark.parametrize("tab", TAB)
+def test_tab_serviti_dalla_cache(dashboard, tab):
+    albero = dashboard.render_tab_content(tab, {"filter": "all"})
+    assert dashboard.render_tab_content(tab, {"filter": "all"}) is albero
+
+
+def test_riepilogo_per_filtro_rapido(dashboard):
+    tutti = dashboard.render_tab_content("tab-summary", {"filter": "all"})
+    settimana = dashboard.render_tab_content("tab-summary", {"filter": "7d"})
+    assert settimana is not tutti
+    assert dashboard.render_tab_content("tab-summary", None) is tutti
+    # Il filtro non riguarda gli altri tab
+    assert dashboard.render_tab_content("tab-whatif", {"filter": "7d"}) is \
+        dashboard.render_tab_content("tab-whatif", {"filter": "all"})
+
+
+def test_nuova_versione_ricostruisce_solo_i_tab_dei_dati(dashboard):
+    prima = {tab: dashboard.render_tab_content(tab, None) for tab in TAB}
+    df = dashboard.load_data()
+    dashboard.imposta_dataset(df.iloc[:-10].copy())
+    try:
+        dopo = {tab: dashboard.render_tab_content(tab, None) for tab in TAB}
+    finally:
+        dashboard.imposta_dataset(df)
+    for tab in ("tab-summary", "tab-dashboard", "tab-ambiente", "tab-about", "tab-whatif"):
+        assert dopo[tab] is not prima[tab]
+    for tab in ("tab-spc", "tab-source"):
+        assert dopo[tab] is prima[tab]
+
+
+def test_tab_info_ricostruito_al_cambio_di_mese(dashboard, monkeypatch):
+    albero = dashboard.render_tab_content("tab-about", None)
+    monkeypatch.setattr(dashboard, "get_current_month_year_it", lambda: "Gennaio 2099")
+    assert dashboard.render_tab_content("tab-about", None) is not albero
+
+
+def test_tab_sconosciuto(dashboard):
+    assert dashboard.render_tab_content("tab-sconosciuto", None).children == "Tab non trovato"
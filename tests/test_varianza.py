@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from e_lithium_varianza import EFFETTI, confronta_periodi, confronta_righe, scomponi_varianza
+from e_lithium_whatif import SommeCumulate
+
+
+def _dataset(righe=730, seme=0):
+    rng = np.random.default_rng(seme)
+    litio = rng.uniform(500, 1500, righe)
+    prezzo = rng.uniform(15, 25, righe)
+    costi = rng.uniform(5000, 15000, righe)
+    rettifiche = rng.normal(0, 100, righe)
+    return pd.DataFrame({
+        "data": pd.date_range("2022-01-01", periods=righe, freq="D"),
+        "litio_estratto_kg": litio,
+        "prezzo_litio_eur_kg": prezzo,
+        "costi_eur": costi,
+        "profitto_eur": litio * prezzo - costi + rettifiche,
+    })
+
+
+def _somma_effetti(risultato):
+    return sum(risultato[chiave] for chiave, _ in EFFETTI)
+
+
+def test_effetti_sommano_alla_variazione():
+    df = _dataset()
+    somme = SommeCumulate(df)
+    risultato = confronta_periodi(somme, ["2022-01-01", "2022-01-01"], ["2022-06-30", "2022-12-31"],
+                                  ["2023-01-01", "2023-07-01"], ["2023-06-30", "2023-12-31"])
+    np.testing.assert_allclose(_somma_effetti(risultato), risultato["variazione"])
+    primo = df[df["data"].between("2023-01-01", "2023-06-30")]["profitto_eur"].sum()
+    assert risultato["profitto_corrente"][0] == pytest.approx(primo)
+    # Le rettifiche del profitto registrato finiscono nell'effetto "altro"
+    assert (risultato["altro"] != 0).all()
+
+
+def test_effetti_di_volume_prezzo_e_costi_separati():
+    base = {"litio": np.array([100.0]), "litio_x_prezzo": np.array([2000.0]), "costi": np.array([1000.0])}
+    # Solo il volume raddoppia (prezzo e costo unitario invariati)
+    doppio = {k: 2 * v for k, v in base.items()}
+    risultato = scomponi_varianza(base, doppio)
+    assert (risultato["volume"][0], risultato["prezzo"][0], risultato["costi"][0]) == (1000.0, 0.0, 0.0)
+    # Solo il prezzo sale di 1 €/kg
+    risultato = scomponi_varianza(base, dict(base, litio_x_prezzo=np.array([2100.0])))
+    assert (risultato["volume"][0], risultato["prezzo"][0], risultato["altro"][0]) == (0.0, 100.0, 0.0)
+    # Nessuna vendita nel periodo di base: prezzi e costi unitari nulli, nessun NaN
+    vuoto = {k: np.zeros(1) for k in base}
+    risultato = scomponi_varianza(vuoto, base)
+    assert np.isfinite([risultato[k][0] for k, _ in EFFETTI]).all()
+    assert _somma_effetti(risultato)[0] == pytest.approx(risultato["variazione"][0])
+
+
+def test_confronto_per_righe_come_per_date():
+    somme = SommeCumulate(_dataset())
+    per_righe = confronta_righe(somme, (np.array([0]), np.array([365])), (np.array([365]), np.array([730])))
+    per_date = confronta_periodi(somme, ["2022-01-01"], ["2022-12-31"], ["2023-01-01"], [None])
+    for chiave in per_righe:
+        np.testing.assert_allclose(per_righe[chiave], per_date[chiave])
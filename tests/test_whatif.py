@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from e_lithium_whatif import (
+    PARAMETRI, IndicePeriodi, SommeCumulate, applica_scenario, margine_medio, risolvi_margine_medio,
+    risolvi_obiettivo, sensibilita, valuta_leve, valuta_scenari,
+)
+
+
+def _dataset(righe=800, seme=0):
+    rng = np.random.default_rng(seme)
+    litio = rng.uniform(500, 1500, righe)
+    prezzo = rng.uniform(15, 25, righe)
+    costi = rng.uniform(5000, 15000, righe)
+    return pd.DataFrame({
+        "data": pd.date_range("2022-01-01", periods=righe, freq="D"),
+        "litio_estratto_kg": litio,
+        "prezzo_litio_eur_kg": prezzo,
+        "costi_eur": costi,
+        "profitto_eur": litio * prezzo - costi,
+    })
+
+
+def test_scenari_come_calcolo_riga_per_riga():
+    df = _dataset()
+    scenari = pd.DataFrame({
+        "produzione_%": [0, 10, -20, 5],
+        "prezzo_delta_eur_kg": [0, -3, 2, np.nan],
+        "costi_%": [0, 5, -10, 0],
+        "inizio": pd.to_datetime([None, "2022-03-01", "2022-06-15", "2030-01-01"]),
+        "fine": pd.to_datetime([None, "2022-05-31", None, None]),
+    })
+    risultato = valuta_scenari(SommeCumulate(df), scenari)
+    for k, scenario in scenari.iterrows():
+        nel_periodo = df
+        if pd.notna(scenario["inizio"]):
+            nel_periodo = nel_periodo[nel_periodo["data"] >= scenario["inizio"]]
+        if pd.notna(scenario["fine"]):
+            nel_periodo = nel_periodo[nel_periodo["data"] <= scenario["fine"]]
+        ricavi, costi, profitto, _ = applica_scenario(
+            nel_periodo["litio_estratto_kg"], nel_periodo["prezzo_litio_eur_kg"], nel_periodo["costi_eur"],
+            *scenario[list(PARAMETRI)].fillna(0))
+        riga = risultato.iloc[k]
+        assert riga["righe"] == len(nel_periodo)
+        assert riga["ricavi_eur"] == pytest.approx(ricavi.sum())
+        assert riga["costi_eur"] == pytest.approx(costi.sum())
+        assert riga["delta_profitto_eur"] == pytest.approx(profitto.sum() - nel_periodo["profitto_eur"].sum())
+    assert np.isnan(risultato["profitto_medio_eur"].iloc[3])
+
+
+def test_indice_periodi():
+    df = _dataset()
+    indice = IndicePeriodi(df["data"])
+    assert indice.num_marker == 13
+    inizio, fine = indice.intervallo([4, 1])
+    i, j = indice.righe([1, 4])
+    periodo = df[(df["data"] >= inizio) & (df["data"] <= fine)]
+    assert (i, j) == (periodo.index[0], periodo.index[-1] + 1)
+    assert indice.intervallo([3]) is None
+    assert indice.righe([-5, 99]) == (0, len(df))
+    with pytest.raises(ValueError):
+        IndicePeriodi([])
+
+
+def test_sensibilita_come_valutazione_diretta():
+    totali = {k: float(v[0]) for k, v in SommeCumulate(_dataset()).totali([pd.NaT], [pd.NaT]).items()}
+    scenario = np.array([10.0, 2.0, 5.0])
+    (profitto, margine), voci = sensibilita(totali, scenario)
+    assert profitto == pytest.approx(valuta_leve(totali, [scenario])[2][0])
+    for voce in voci:
+        k = PARAMETRI.index(voce["parametro"])
+        leve = np.tile(scenario, (2, 1))
+        leve[:, k] = (voce["minimo"], voce["massimo"])
+        _, _, profitti, _ = valuta_leve(totali, leve)
+        assert (voce["profitto_min"], voce["profitto_max"]) == pytest.approx(tuple(profitti))
+    assert [v["escursione"] for v in voci] == sorted((v["escursione"] for v in voci), reverse=True)
+    # Il profitto è lineare nel volume: +1% di volume sposta i ricavi dell'1%
+    produzione = next(v for v in voci if v["parametro"] == "produzione_%")
+    ricavi = valuta_leve(totali, [scenario])[0][0]
+    assert produzione["elasticita_profitto"] == pytest.approx(ricavi / profitto, rel=1e-6)
+
+
+@pytest.mark.parametrize("obiettivo, valore", [("profitto", 2.5e6), ("margine", 40.0)])
+def test_ricerca_obiettivo_raggiunge_il_valore(obiettivo, valore):
+    totali = {k: float(v[0]) for k, v in SommeCumulate(_dataset()).totali([pd.NaT], [pd.NaT]).items()}
+    scenario = np.array([0.0, 0.0, 0.0])
+    soluzioni = risolvi_obiettivo(totali, scenario, obiettivo, valore)
+    for k, soluzione in enumerate(soluzioni):
+        leve = scenario.copy()
+        leve[k] = soluzione
+        _, _, profitto, margini = valuta_leve(totali, [leve])
+        ottenuto = profitto[0] if obiettivo == "profitto" else margini[0]
+        assert ottenuto == pytest.approx(valore)
+    assert np.isnan(risolvi_obiettivo(totali, scenario, "margine", 100)).all()
+
+
+def test_ricerca_margine_medio_giornaliero():
+    df = _dataset()
+    lp = (df["litio_estratto_kg"] * df["prezzo_litio_eur_kg"]).to_numpy()
+    litio, costi = df["litio_estratto_kg"].to_numpy(), df["costi_eur"].to_numpy()
+    scenario = np.array([5.0, 1.0, 0.0])
+    soluzioni = risolvi_margine_medio(lp, litio, costi, scenario, 45.0)
+    leve = np.tile(scenario, (3, 1))
+    leve[np.arange(3), np.arange(3)] = soluzioni
+    np.testing.assert_allclose(margine_medio(lp, litio, costi, leve), 45.0, atol=1e-6)
+    assert np.isnan(risolvi_margine_medio(lp, litio, costi, scenario, 150.0)).all()
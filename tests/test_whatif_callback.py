@@ -0,0 +1,163 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+PERIODO = [2, 9]  # posizioni dello slider del periodo
+
+
+@pytest.fixture(scope="module")
+def dashboard():
+    import e_lithium_dashboard as dash
+    from e_lithium_simulatore import generate_dataset
+
+    np.random.seed(0)
+    dash.imposta_dataset(generate_dataset(num_days=400, data_inizio=datetime(2024, 1, 1)))
+    return dash
+
+
+def _periodo(dash, indici):
+    df = dash.load_data()
+    inizio, fine = dash.intervallo_whatif(indici)
+    return df[(df["data"] >= inizio) & (df["data"] <= fine)]
+
+
+def _risultati(righe, produzione, prezzo_delta, riduzione):
+    """Profitto e margine del periodo calcolati riga per riga"""
+    ricavi = (righe["litio_estratto_kg"] * (1 + produzione / 100) * (righe["prezzo_litio_eur_kg"] + prezzo_delta)).sum()
+    profitto = ricavi - (righe["costi_eur"] * (1 - riduzione / 100)).sum()
+    return profitto, profitto / ricavi * 100
+
+
+def _testi(componente):
+    """Testi di un albero di componenti Dash, in ordine"""
+    if isinstance(componente, (list, tuple)):
+        return [testo for figlio in componente for testo in _testi(figlio)]
+    if isinstance(componente, (str, int, float)):
+        return [str(componente)]
+    return _testi(getattr(componente, "children", None) or [])
+
+
+def test_tornado_come_scenari_con_la_leva_agli_estremi(dashboard):
+    scenario = (10, 5, 5)
+    fig, tabella = dashboard.update_whatif_sensibilita(*scenario, PERIODO)
+    righe = _periodo(dashboard, PERIODO)
+    profitto_base, margine_base = _risultati(righe, *scenario)
+
+    minimi, massimi = fig.data
+    assert minimi.name == "Leva al minimo" and massimi.name == "Leva al massimo"
+    assert minimi.base == pytest.approx(profitto_base)
+    escursioni = []
+    for posizione, nome in enumerate(minimi.y):
+        k, parametro = next((k, p) for k, p in enumerate(dashboard.LEVE_WHATIF)
+                            if dashboard.DESCRIZIONI_LEVE[p][0] == nome)
+        estremi = []
+        for traccia, estremo in zip((minimi, massimi), dashboard.DESCRIZIONI_LEVE[parametro][2]):
+            leve = list(scenario)
+            leve[k] = estremo
+            profitto, margine = _risultati(righe, *leve)
+            valore_leva, _, profitto_traccia, margine_traccia = traccia.customdata[posizione]
+            assert valore_leva == estremo
+            assert profitto_traccia == pytest.approx(profitto)
+            assert margine_traccia == pytest.approx(margine)
+            estremi.append(profitto)
+        escursioni.append(abs(estremi[1] - estremi[0]))
+    # La leva con l'escursione maggiore è in alto (ultima barra)
+    assert escursioni == sorted(escursioni)
+
+    testi = _testi(tabella)
+    assert f"Scenario corrente: profitto € {profitto_base:,.0f}, margine {margine_base:.1f}%" in testi
+    assert sum(testo in testi for testo in (dashboard.DESCRIZIONI_LEVE[p][0] for p in dashboard.LEVE_WHATIF)) == 3
+
+
+def test_elasticita_come_differenza_finita(dashboard):
+    _, tabella = dashboard.update_whatif_sensibilita(0, 0, 0, PERIODO)
+    righe = _periodo(dashboard, PERIODO)
+    profitto, _ = _risultati(righe, 0, 0, 0)
+    testi = _testi(tabella)
+    # +1% di produzione: profitto (1.01 ricavi - costi) / profitto - 1, in percentuale
+    ricavi = (righe["litio_estratto_kg"] * righe["prezzo_litio_eur_kg"]).sum()
+    attesa = (0.01 * ricavi / profitto) * 100
+    riga = testi.index(dashboard.DESCRIZIONI_LEVE["produzione_%"][0])
+    assert testi[riga + 1] == f"{attesa:+.2f}"
+
+
+def test_sensibilita_senza_dati(dashboard, monkeypatch):
+    monkeypatch.setattr(dashboard, "get_somme_cumulate", lambda: [])
+    fig, messaggio = dashboard.update_whatif_sensibilita(0, 0, 0, PERIODO)
+    assert "nessun dato disponibile" in fig.layout.annotations[0].text
+    assert messaggio.children == "Errore: nessun dato disponibile"
+
+
+@pytest.mark.parametrize("obiettivo, valore", [("profitto", 3e6), ("margine", 30.0), ("margine_medio", 32.0)])
+def test_obiettivo_raggiunto_dalle_soluzioni(dashboard, obiettivo, valore):
+    scenario = (10.0, 5.0, 5.0)
+    righe = _periodo(dashboard, PERIODO)
+    soluzioni = dashboard.get_soluzioni_obiettivo(dashboard.intervallo_whatif(PERIODO), scenario, obiettivo, valore)
+    assert not np.isnan(soluzioni).any()
+    for k, soluzione in enumerate(soluzioni):
+        leve = list(scenario)
+        leve[k] = soluzione
+        if obiettivo == "margine_medio":
+            ricavi = righe["litio_estratto_kg"] * (1 + leve[0] / 100) * (righe["prezzo_litio_eur_kg"] + leve[1])
+            raggiunto = ((ricavi - righe["costi_eur"] * (1 - leve[2] / 100)) / ricavi * 100).mean()
+        else:
+            raggiunto = _risultati(righe, *leve)[0 if obiettivo == "profitto" else 1]
+        assert raggiunto == pytest.approx(valore, rel=1e-6)
+
+    testi = _testi(dashboard.update_whatif_obiettivo(obiettivo, valore, *scenario, PERIODO))
+    for parametro, soluzione in zip(dashboard.LEVE_WHATIF, soluzioni):
+        _, unita, (minimo, massimo) = dashboard.DESCRIZIONI_LEVE[parametro]
+        riga = testi.index(f"{soluzione:+.2f} {unita}")
+        assert testi[riga + 2] == ("entro lo slider" if minimo <= soluzione <= massimo else "fuori dallo slider")
+
+
+def test_obiettivo_non_raggiungibile_o_mancante(dashboard):
+    testi = _testi(dashboard.update_whatif_obiettivo("margine", 100.0, 0, 0, 0, PERIODO))
+    assert testi[0] == "Margine del periodo: 100.0%"
+    assert testi.count("non raggiungibile") == 3
+    for obiettivo, valore in (("profitto", None), ("sconosciuto", 10)):
+        risultato = dashboard.update_whatif_obiettivo(obiettivo, valore, 0, 0, 0, PERIODO)
+        assert risultato.children == "Inserisci un valore obiettivo"
+
+
+def _componente(albero, id_componente):
+    """Componente con l'id indicato in un albero Dash (None se assente)"""
+    if getattr(albero, "id", None) == id_componente:
+        return albero
+    figli = albero if isinstance(albero, (list, tuple)) else getattr(albero, "children", None)
+    if figli is None or isinstance(figli, str):
+        return None
+    for figlio in figli if isinstance(figli, (list, tuple)) else [figli]:
+        trovato = _componente(figlio, id_componente)
+        if trovato is not None:
+            return trovato
+    return None
+
+
+def test_slider_e_callback_usano_lo_stesso_indice_dei_periodi(dashboard):
+    indice = dashboard.get_indice_periodi()
+    assert dashboard.get_indice_periodi() is indice
+    slider = _componente(dashboard.get_whatif_tab(), "whatif-date-range")
+    assert slider.max == indice.num_marker - 1 == 12
+    assert slider.marks == indice.etichette()
+
+    inizio, fine = dashboard.intervallo_whatif(PERIODO)
+    assert (inizio, fine) == (indice.date_marker[PERIODO[0]], indice.date_marker[PERIODO[1]])
+    righe = _periodo(dashboard, PERIODO)
+    assert dashboard.update_whatif_date_info(PERIODO) == (
+        f"📅 Periodo: {inizio.strftime('%d %b %Y')} - {fine.strftime('%d %b %Y')} | {len(righe)} giorni di dati")
+    # Posizioni invertite o fuori scala sono ricondotte ai marker
+    assert dashboard.intervallo_whatif([PERIODO[1], PERIODO[0]]) == (inizio, fine)
+    assert dashboard.intervallo_whatif([-3, 40]) == (indice.date_marker[0], indice.date_marker[-1])
+    assert dashboard.update_whatif_date_info(None) == "📅 Seleziona un periodo per iniziare"
+
+
+def test_grafici_whatif_limitati_al_periodo(dashboard):
+    righe = _periodo(dashboard, PERIODO)
+    profitto, margine = dashboard.update_whatif(10, 5, 5, PERIODO, 1400)
+    for fig in (profitto, margine):
+        date = np.asarray(fig.data[0].x, dtype="datetime64[ns]")
+        np.testing.assert_array_equal(date, righe["data"].to_numpy())
+    attesi = (righe["litio_estratto_kg"] * 1.1 * (righe["prezzo_litio_eur_kg"] + 5) - righe["costi_eur"] * 0.95)
+    np.testing.assert_allclose(profitto.data[0].customdata, attesi.to_numpy() / 1000)